@@ -1,24 +1,33 @@
 import os
 from flask import Flask, jsonify
-from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from dotenv import load_dotenv
-from .config import Config
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from .config import Config  # also loads .env
 import logging
 
-# Load environment variables
-load_dotenv()
-
 # Initialize extensions
 from .database import db
-migrate = Migrate()
 jwt = JWTManager()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def init_migrations(app):
+    """
+    Register Flask-Migrate on an application.
+    
+    Flask-Migrate imports Alembic, which is about half of the package's
+    import time, so the serving path skips it. It is registered for the
+    ``flask`` CLI (``flask db ...``) and by init_db.py.
+    
+    Returns:
+        The Flask-Migrate extension state
+    """
+    from flask_migrate import Migrate
+    if 'migrate' not in app.extensions:
+        Migrate(app, db)
+    return app.extensions['migrate']
+
 def create_app(config_class=Config):
     # Create and configure the app
     app = Flask(__name__, instance_relative_config=True)
@@ -42,15 +51,36 @@ def create_app(config_class=Config):
         # Load the test config if passed in
         app.config.from_object(config_class)
 
+    # Client address from the X-Forwarded-For hop our own proxies appended
+    if app.config.get('TRUSTED_PROXY_COUNT'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+
     # Ensure the instance folder exists
     try:
         os.makedirs(app.instance_path)
     except OSError:
         pass
 
+    # orjson (when installed) for jsonify and request parsing; datetimes as ISO 8601
+    from .utils.json_provider import init_json
+    init_json(app)
+
+    # Connection pool settings for client/server databases
+    from .utils.db_pool import engine_options
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    
     # Initialize extensions with app
     db.init_app(app)
-    migrate.init_app(app, db)
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        init_migrations(app)
+    
+    # WAL, busy timeout and reader/writer transactions for SQLite
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') and app.config.get('SQLITE_TUNING', True):
+        from .utils.sqlite import configure_sqlite
+        with app.app_context():
+            configure_sqlite(db.engine, app.config)
     
     # Configure CORS to allow requests from GitHub Pages and localhost
     CORS(app, resources={r"/api/*": {"origins": [
@@ -61,44 +91,76 @@ def create_app(config_class=Config):
     
     jwt.init_app(app)
     
-    # Setup logging
-    logging.basicConfig(level=logging.INFO,
-                       format='%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    # gzip/brotli for responses the client accepts compressed
+    if app.config.get('COMPRESSION_ENABLED', True):
+        from .utils.compression import init_compression
+        init_compression(app)
+    
+    # Setup logging (no-op if the process already configured it)
+    from .utils.log import configure_logging
+    configure_logging(app.config)
+    
+    with app.app_context():
+        # Request latency, per-request DB queries and SMTP time; serves /metrics
+        if app.config.get('METRICS_ENABLED', True):
+            from .utils.metrics import init_metrics
+            init_metrics(app, db.engine)
+        
+        # Slow-query log, plus N+1 detection while profiling is switched on
+        from .utils.sql_profiler import init_sql_profiler
+        init_sql_profiler(app, db.engine)
     
     # Register blueprints
     from .api.auth import auth_bp
     from .api.test import test_bp
+    from .api.admin import admin_bp
+    from .api.exam import exam_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(test_bp, url_prefix='/api/test')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(exam_bp, url_prefix='/api/exams')
 
     # Setup error handlers
     @app.errorhandler(422)
     def handle_validation_error(e):
-        logger.error(f"Validation error: {str(e)}")
+        logger.error("Validation error: %s", e)
         return jsonify({"error": "Validation error", "message": str(e)}), 422
     
+    @app.errorhandler(PoolTimeoutError)
+    def handle_pool_timeout(e):
+        logger.error("Database connection pool exhausted: %s", e)
+        return jsonify({"error": "Service unavailable", "message": "Server busy, please try again."}), 503, {"Retry-After": "1"}
+    
     @jwt.expired_token_loader
     def handle_expired_token(jwt_header, jwt_payload):
-        logger.warning(f"Expired token: {jwt_payload.get('sub')}")
+        logger.warning("Expired token: %s", jwt_payload.get('sub'))
         return jsonify({"error": "Token expired", "message": "Your session has expired. Please log in again."}), 401
     
     @jwt.invalid_token_loader
     def handle_invalid_token(error_string):
-        logger.warning(f"Invalid token: {error_string}")
+        logger.warning("Invalid token: %s", error_string)
         return jsonify({"error": "Invalid token", "message": "Your token is invalid. Please log in again."}), 401
     
+    @jwt.revoked_token_loader
+    def handle_revoked_token(jwt_header, jwt_payload):
+        logger.warning("Revoked token: %s", jwt_payload.get('sub'))
+        return jsonify({"error": "Token revoked", "message": "Your session has been revoked. Please log in again."}), 401
+    
+    if app.config.get('JWT_REVOCATION_ENABLED', True):
+        from .utils.revocation import get_revocation_list
+        
+        @jwt.token_in_blocklist_loader
+        def check_token_revoked(jwt_header, jwt_payload):
+            return get_revocation_list().is_revoked(jwt_payload)
+    
     @jwt.unauthorized_loader
     def handle_missing_token(error_string):
-        logger.warning(f"Missing token: {error_string}")
+        logger.warning("Missing token: %s", error_string)
         return jsonify({"error": "Missing token", "message": "Authorization token is missing."}), 401
     
     @app.route('/api/ping', methods=['GET'])
     def ping():
         return jsonify({"status": "success", "message": "pong"})
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
 
     return app 
\ No newline at end of file
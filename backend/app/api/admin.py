@@ -0,0 +1,235 @@
+import tempfile
+from functools import wraps
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .. import db
+from ..models import get_model
+from ..models.user import User
+from ..utils.columnar_export import COLUMNAR_FORMATS, TABLES, write_columnar
+from ..utils.export import stream_results_response
+from ..utils.grading import grade_exam
+from ..utils.health import get_health_monitor
+from ..utils.invitations import check_exam_url_template, invite_cohort
+from ..utils.revocation import revoke_token, revoke_user_tokens
+from ..utils.stats import ACTIVITY_MAX_DAYS, dashboard_stats, rebuild_stats, recent_activity
+import logging
+
+# Create admin blueprint
+admin_bp = Blueprint('admin', __name__)
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+def _is_int(value):
+    # JSON true/false arrive as bool, a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def admin_required(fn):
+    """Require a valid JWT that belongs to an admin user."""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str) and user_id.isdigit():
+            user_id = int(user_id)
+
+        user = db.session.get(User, user_id)
+        if not user or not user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@admin_bp.route('/stats', methods=['GET'])
+@admin_required
+def stats():
+    """
+    Dashboard totals and per-exam counters (invited, started, completed,
+    passed, average score), read from the stats rollup tables.
+
+    Query parameters:
+        limit: Number of exams to list, most recently active first (default 50, max 500)
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    data = dashboard_stats(limit=limit)
+    # Counted in the background by the health monitor
+    data['users'] = get_health_monitor().snapshot()['stats'].get('users')
+    return jsonify(data), 200
+
+
+@admin_bp.route('/activity', methods=['GET'])
+@admin_required
+def activity():
+    """
+    Invitations sent, exams started and exams submitted per day.
+
+    Query parameters:
+        days: Number of days up to today, UTC (default 30, max
+            ``ACTIVITY_MAX_DAYS``); ``limit`` is accepted as an alias
+    """
+    try:
+        days = int(request.args.get('days', request.args.get('limit', 30)))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    days = min(max(days, 1), ACTIVITY_MAX_DAYS)
+
+    return jsonify({'days': days, 'activities': recent_activity(days)}), 200
+
+
+@admin_bp.route('/stats/rebuild', methods=['POST'])
+@admin_required
+def rebuild_dashboard_stats():
+    """Recompute the stats rollups from the candidates and results tables."""
+    if get_model('Exam') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+
+    summary = rebuild_stats()
+    logger.info("Rebuilt stats (by %s)", get_jwt_identity())
+    return jsonify({'message': 'Stats rebuilt', 'rebuilt': summary}), 200
+
+
+@admin_bp.route('/users/<int:user_id>/revoke-tokens', methods=['POST'])
+@admin_required
+def revoke_user_sessions(user_id):
+    """Revoke every access token issued to a user so far (sign them out everywhere)."""
+    if db.session.get(User, user_id) is None:
+        return jsonify({'error': 'User not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    revocation = revoke_user_tokens(user_id, reason=data.get('reason'))
+    logger.info("Revoked all tokens of user %s (by %s)", user_id, get_jwt_identity())
+    return jsonify({'message': 'Tokens revoked', 'revocation': revocation.to_dict()}), 200
+
+
+@admin_bp.route('/tokens/revoke', methods=['POST'])
+@admin_required
+def revoke_single_token():
+    """Revoke one access token by its ``jti``."""
+    data = request.get_json(silent=True) or {}
+    jti = data.get('jti')
+    if not isinstance(jti, str) or not jti:
+        return jsonify({'error': 'jti is required'}), 400
+
+    user_id = data.get('user_id')
+    if user_id is not None:
+        if not _is_int(user_id):
+            return jsonify({'error': 'user_id must be an integer'}), 400
+        if db.session.get(User, user_id) is None:
+            return jsonify({'error': 'User not found'}), 404
+
+    revocation = revoke_token(jti, user_id=user_id, reason=data.get('reason'))
+    logger.info("Revoked token %s (by %s)", jti, get_jwt_identity())
+    return jsonify({'message': 'Token revoked', 'revocation': revocation.to_dict()}), 200
+
+
+@admin_bp.route('/exams/<int:exam_id>/invitations', methods=['POST'])
+@admin_required
+def invite_candidates(exam_id):
+    """Invite a cohort of candidates to an exam, streaming progress as NDJSON."""
+    Exam = get_model('Exam')
+    if Exam is None or get_model('Candidate') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+
+    exam = db.session.get(Exam, exam_id)
+    if not exam:
+        return jsonify({'error': 'Exam not found'}), 404
+
+    # Checked up front: errors inside the stream would cut it off after the 200
+    data = request.get_json(silent=True) or {}
+    candidate_ids = data.get('candidate_ids')
+    if candidate_ids is not None and not (
+            isinstance(candidate_ids, list) and all(_is_int(value) for value in candidate_ids)):
+        return jsonify({'error': 'candidate_ids must be a list of integers'}), 400
+    batch_size = data.get('batch_size')
+    if batch_size is not None and not (_is_int(batch_size) and batch_size > 0):
+        return jsonify({'error': 'batch_size must be a positive integer'}), 400
+    exam_url_template = data.get('exam_url_template')
+    if exam_url_template is not None:
+        if not isinstance(exam_url_template, str):
+            return jsonify({'error': 'exam_url_template must be a string'}), 400
+        try:
+            check_exam_url_template(exam_url_template)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    progress = invite_cohort(
+        exam,
+        candidate_ids=candidate_ids,
+        exam_url_template=exam_url_template,
+        resend=bool(data.get('resend', False)),
+        batch_size=batch_size
+    )
+    logger.info("Inviting candidates to exam %s", exam_id)
+
+    def generate():
+        for update in progress:
+            yield current_app.json.dumps(update) + '\n'
+
+    # Progress must reach the client line by line, so keep it out of response compression
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-transform'})
+
+
+@admin_bp.route('/exams/<int:exam_id>/regrade', methods=['POST'])
+@admin_required
+def regrade_exam(exam_id):
+    """Re-grade every result of an exam against its current answer key."""
+    Exam = get_model('Exam')
+    if Exam is None or get_model('Result') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+
+    exam = db.session.get(Exam, exam_id)
+    if not exam:
+        return jsonify({'error': 'Exam not found'}), 404
+
+    summary = grade_exam(exam)
+    return jsonify({'message': 'Exam re-graded', 'grading': summary}), 200
+
+
+@admin_bp.route('/exams/<int:exam_id>/results/export', methods=['GET'])
+@admin_required
+def export_results(exam_id):
+    """
+    Export every result of an exam.
+
+    ``format=csv`` or ``ndjson`` streams the results; ``format=parquet`` or
+    ``arrow`` returns a typed columnar file of either the ``results`` or the
+    ``answers`` table (``table`` parameter).
+    """
+    Exam = get_model('Exam')
+    if Exam is None or get_model('Result') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+
+    exam = db.session.get(Exam, exam_id)
+    if not exam:
+        return jsonify({'error': 'Exam not found'}), 404
+
+    export_format = request.args.get('format', 'csv')
+    if export_format in ('csv', 'ndjson'):
+        return stream_results_response(exam, export_format, filename=f'exam-{exam_id}-results')
+    if export_format not in COLUMNAR_FORMATS:
+        return jsonify({'error': 'format must be csv, ndjson, parquet or arrow'}), 400
+
+    table = request.args.get('table', 'results')
+    if table not in TABLES:
+        return jsonify({'error': 'table must be results or answers'}), 400
+
+    output = tempfile.TemporaryFile()
+    try:
+        write_columnar(exam, table, output, export_format)
+    except RuntimeError as e:
+        output.close()
+        return jsonify({'error': str(e)}), 501
+    output.seek(0)
+
+    return send_file(
+        output,
+        mimetype='application/vnd.apache.parquet' if export_format == 'parquet'
+        else 'application/vnd.apache.arrow.file',
+        as_attachment=True,
+        download_name=f'exam-{exam_id}-{table}.{COLUMNAR_FORMATS[export_format]}'
+    )
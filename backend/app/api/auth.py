@@ -1,6 +1,11 @@
-from flask import request, jsonify, Blueprint
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from datetime import datetime
+from flask import current_app, request, jsonify, Blueprint
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
 from ..models.user import User
+from ..utils.passwords import PasswordHasherBusy
+from ..utils.rate_limit import client_ip, get_limiter, limit_by_ip, parse_limit, rate_limited_response
+from ..utils.revocation import revoke_token, revoke_user_tokens
+from ..utils.user_cache import get_cached_user
 from .. import db
 import logging
 
@@ -10,7 +15,47 @@ auth_bp = Blueprint('auth', __name__)
 # Configure logger
 logger = logging.getLogger(__name__)
 
+def create_user_token(user):
+    """
+    Create an access token for a user.
+    
+    The serialized user is embedded as the ``usr`` claim so that, with
+    ``JWT_TRUST_USER_CLAIMS`` enabled, token validation can answer without
+    touching the database.
+    """
+    # Identity must be a string
+    logger.debug("Creating token for user ID: %s", user.id)
+    return create_access_token(identity=str(user.id), additional_claims={'usr': user.to_dict()})
+
+def login_limit_key(data):
+    """
+    Return the key that repeated login failures are counted under.
+    
+    Failures count per account, by the lowercased email; a request whose
+    email isn't a string falls back to the client IP.
+    """
+    email = data.get('email')
+    return email.lower() if isinstance(email, str) else f'ip:{client_ip()}'
+
+def current_user_data():
+    """
+    Return the serialized user for the current JWT.
+    
+    Uses the ``usr`` claim when ``JWT_TRUST_USER_CLAIMS`` is enabled, and the
+    per-process user cache otherwise.
+    
+    Returns:
+        dict: User data, or None if the user no longer exists
+    """
+    if current_app.config.get('JWT_TRUST_USER_CLAIMS'):
+        claims = get_jwt().get('usr')
+        if claims:
+            return claims
+    
+    return get_cached_user(get_jwt_identity())
+
 @auth_bp.route('/register', methods=['POST'])
+@limit_by_ip('register_ip', 'RATELIMIT_REGISTER_IP')
 def register():
     """Register a new user."""
     data = request.get_json()
@@ -29,20 +74,21 @@ def register():
         return jsonify({'error': 'Username already taken'}), 400
     
     # Create new user
-    user = User(
-        email=data['email'],
-        username=data['username'],
-        password=data['password'],
-        is_admin=data.get('is_admin', False)
-    )
+    try:
+        user = User(
+            email=data['email'],
+            username=data['username'],
+            password=data['password'],
+            is_admin=data.get('is_admin', False)
+        )
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
     
     db.session.add(user)
     db.session.commit()
     
-    # Generate access token - ensure identity is a string
-    user_id_str = str(user.id)
-    logger.info(f"Creating token for user ID: {user_id_str} (type: {type(user_id_str)})")
-    access_token = create_access_token(identity=user_id_str)
+    # Generate access token
+    access_token = create_user_token(user)
     
     return jsonify({
         'message': 'User registered successfully',
@@ -52,6 +98,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
+@limit_by_ip('login_ip', 'RATELIMIT_LOGIN_IP')
 def login():
     """Login a user."""
     data = request.get_json()
@@ -60,17 +107,42 @@ def login():
     if 'email' not in data or 'password' not in data:
         return jsonify({'error': 'Email and password are required'}), 400
     
+    # Throttle repeated failures for the same account before doing any work
+    email_limit = None
+    limit_key = login_limit_key(data)
+    if current_app.config.get('RATELIMIT_ENABLED', True):
+        email_limit = parse_limit(current_app.config['RATELIMIT_LOGIN_EMAIL'])
+        allowed, retry_after = get_limiter().check('login_email', limit_key, email_limit)
+        if not allowed:
+            return rate_limited_response(retry_after)
+    
     # Find user by email
-    user = User.query.filter_by(email=data['email']).first()
+    user = User.query.filter_by(email=data['email']).first() if isinstance(data['email'], str) else None
+    
+    # Return the connection to the pool before the slow password check;
+    # the loaded user stays usable as a detached object
+    db.session.close()
     
     # Check if user exists and password is correct
-    if not user or not user.check_password(data['password']):
-        return jsonify({'error': 'Invalid email or password'}), 401
+    try:
+        if not user or not user.check_password(data['password']):
+            if email_limit:
+                get_limiter().hit('login_email', limit_key, email_limit)
+            return jsonify({'error': 'Invalid email or password'}), 401
+        
+        # Transparently upgrade hashes made with outdated parameters
+        if user.password_needs_rehash():
+            db.session.add(user)
+            user.set_password(data['password'])
+            db.session.commit()
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
     
-    # Generate access token - ensure identity is a string
-    user_id_str = str(user.id)
-    logger.info(f"Creating token for user ID: {user_id_str} (type: {type(user_id_str)})")
-    access_token = create_access_token(identity=user_id_str)
+    if email_limit:
+        get_limiter().reset('login_email', limit_key, email_limit)
+    
+    # Generate access token
+    access_token = create_user_token(user)
     
     return jsonify({
         'message': 'Login successful',
@@ -79,24 +151,40 @@ def login():
     }), 200
 
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """
+    Revoke the current access token.
+    
+    With ``{"all": true}`` every token issued to the user so far is revoked
+    (sign out on all devices).
+    """
+    claims = get_jwt()
+    user_id = int(claims['sub']) if str(claims['sub']).isdigit() else None
+    data = request.get_json(silent=True) or {}
+    
+    if data.get('all') and user_id is not None:
+        revoke_user_tokens(user_id, reason='logout (all sessions)')
+    # Always revoke this token too: the user cut-off has whole-second
+    # resolution and spares tokens issued in the second it was made
+    expires_at = datetime.utcfromtimestamp(claims['exp']) if 'exp' in claims else None
+    revoke_token(claims['jti'], user_id=user_id, expires_at=expires_at, reason='logout')
+    
+    return jsonify({'message': 'Logged out'}), 200
+
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     """Get the current authenticated user."""
-    user_id = get_jwt_identity()
-    logger.info(f"JWT identity: {user_id} (type: {type(user_id)})")
-    
-    # Convert to int if the identity is a string (which it should be)
-    if isinstance(user_id, str) and user_id.isdigit():
-        user_id = int(user_id)
-    
-    user = User.query.get(user_id)
+    user = current_user_data()
     
     if not user:
-        logger.warning(f"User not found with ID: {user_id}")
+        logger.warning("User not found with ID: %s", get_jwt_identity())
         return jsonify({'error': 'User not found'}), 404
     
-    return jsonify(user.to_dict()), 200
+    return jsonify(user), 200
 
 
 @auth_bp.route('/validate-token', methods=['GET'])
@@ -104,26 +192,19 @@ def get_current_user():
 def validate_token():
     """Validate the JWT token and return user details."""
     try:
-        user_id = get_jwt_identity()
-        logger.info(f"Validating token with identity: {user_id} (type: {type(user_id)})")
-        
-        # Convert to int if the identity is a string (which it should be)
-        if isinstance(user_id, str) and user_id.isdigit():
-            user_id = int(user_id)
-        
-        user = User.query.get(user_id)
+        user = current_user_data()
         
         if not user:
-            logger.warning(f"Token validation failed: User not found with ID {user_id}")
+            logger.warning("Token validation failed: User not found with ID %s", get_jwt_identity())
             return jsonify({'valid': False, 'error': 'User not found'}), 404
             
-        logger.info(f"Token validation successful for user: {user.username}")
+        logger.debug("Token validation successful for user: %s", user['username'])
         return jsonify({
             'valid': True,
-            'user': user.to_dict()
+            'user': user
         }), 200
     except Exception as e:
-        logger.error(f"Token validation error: {str(e)}")
+        logger.error("Token validation error: %s", e)
         return jsonify({'valid': False, 'error': str(e)}), 401
 
 
@@ -0,0 +1,219 @@
+from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from .. import db
+from ..models import get_model
+from ..utils.autosave import get_autosave_buffer, write_answers
+from ..utils.exam_snapshot import get_exam_snapshot
+from ..utils.grading import grade_result
+from ..utils.sqlite import read_intent
+from ..utils.stats import record_activity, record_exam_stats
+import logging
+
+# Create exam blueprint
+exam_bp = Blueprint('exam', __name__)
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Clients may keep the content but must revalidate it (a cheap 304) before use
+CONTENT_CACHE_CONTROL = 'private, no-cache'
+
+def _candidate_token():
+    return request.headers.get('X-Candidate-Token') or request.args.get('token')
+
+def _candidate(exam_id):
+    """Return the candidate the request's access token invites to this exam, or None."""
+    token = _candidate_token()
+    if not token:
+        return None
+    Candidate = get_model('Candidate')
+    return db.session.execute(
+        db.select(Candidate).where(Candidate.access_token == token, Candidate.exam_id == exam_id)
+    ).scalar_one_or_none()
+
+def _can_view(exam_id):
+    """Allow candidates invited to the exam (by access token) and signed-in users."""
+    if _candidate_token():
+        return _candidate(exam_id) is not None
+    verify_jwt_in_request(optional=True)
+    return get_jwt_identity() is not None
+
+def _parse_answers(items, snapshot):
+    """
+    Validate submitted answers against the exam's questions and options.
+
+    Returns:
+        list: ``(question_id, selected_option_id, text_response)`` tuples
+
+    Raises:
+        ValueError: If an answer is malformed or doesn't belong to the exam
+    """
+    if not isinstance(items, list):
+        raise ValueError('answers must be a list')
+    answers = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('Each answer must be an object')
+        question_id = item.get('question_id')
+        option_id = item.get('selected_option_id')
+        text = item.get('text_response')
+        if question_id not in snapshot.choices:
+            raise ValueError(f'Unknown question: {question_id}')
+        if option_id is not None and option_id not in snapshot.choices[question_id]:
+            raise ValueError(f'Unknown option {option_id} for question {question_id}')
+        if text is not None and not isinstance(text, str):
+            raise ValueError('text_response must be a string')
+        answers.append((question_id, option_id, text))
+    return answers
+
+
+@exam_bp.route('/<int:exam_id>/content', methods=['GET'])
+def exam_content(exam_id):
+    """
+    Serve an exam's questions and options for taking it.
+
+    The document comes from the exam snapshot cache, gzip-compressed when the
+    client accepts it, with a strong ETag; a matching ``If-None-Match``
+    gets an empty 304.
+    """
+    if get_model('Exam') is None or get_model('Candidate') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+    if not _can_view(exam_id):
+        return jsonify({'error': 'Access denied'}), 403
+
+    snapshot = get_exam_snapshot(exam_id)
+    if snapshot is None:
+        return jsonify({'error': 'Exam not found'}), 404
+
+    use_gzip = snapshot.gzipped is not None and request.accept_encodings['gzip'] > 0
+    etag = snapshot.gzip_etag if use_gzip else snapshot.etag
+    headers = {'Cache-Control': CONTENT_CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+
+    # Every encoding's tag (``<etag>`` or ``<etag>-<encoding>``) identifies the same version
+    if any(tag.startswith(snapshot.etag) for tag in request.if_none_match.as_set(include_weak=True)):
+        response = Response(status=304, headers=headers)
+    elif use_gzip:
+        response = Response(snapshot.gzipped, mimetype='application/json',
+                            headers=dict(headers, **{'Content-Encoding': 'gzip'}))
+    else:
+        response = Response(snapshot.body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    return response
+
+
+@exam_bp.route('/<int:exam_id>/answers', methods=['PUT'])
+def autosave_answers(exam_id):
+    """
+    Autosave one answer (``question_id`` plus ``selected_option_id`` and/or
+    ``text_response``) or several (``{"answers": [...]}``) of an exam in progress.
+
+    Answers go to the write-behind autosave buffer and the request returns
+    202 without writing to the database. With ``AUTOSAVE_BUFFERED`` off
+    they are written before responding (200).
+    """
+    if get_model('Exam') is None or get_model('Candidate') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+
+    # Only reads here; the buffer writes on its own thread
+    with read_intent():
+        candidate = _candidate(exam_id)
+        if candidate is None:
+            return jsonify({'error': 'Access denied'}), 403
+        if candidate.test_end_time is not None:
+            return jsonify({'error': 'Exam already submitted'}), 409
+        candidate_id = candidate.id
+        snapshot = get_exam_snapshot(exam_id)
+    if snapshot is None:
+        return jsonify({'error': 'Exam not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        answers = _parse_answers(data['answers'] if 'answers' in data else [data], snapshot)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    buffer = get_autosave_buffer()
+    for question_id, option_id, text in answers:
+        buffer.save(candidate_id, question_id, option_id, text)
+    if not current_app.config.get('AUTOSAVE_BUFFERED', True):
+        db.session.commit()
+        buffer.flush(candidate_id)
+        return jsonify({'message': 'Answers saved', 'saved': len(answers)}), 200
+    return jsonify({'message': 'Answers accepted', 'saved': len(answers)}), 202
+
+
+@exam_bp.route('/<int:exam_id>/submit', methods=['POST'])
+def submit_exam(exam_id):
+    """
+    Submit an exam: persist the candidate's answers, create the result and grade it.
+
+    The request carries the client's full final answers
+    (``{"answers": [...]}``, an empty list for a blank exam). Autosaves are
+    acknowledged before they reach the database and may still sit in
+    another worker's buffer, so they can't be relied on here: the final
+    answers are written in the same transaction that closes the exam, on
+    top of whatever autosaves were already written. Everything is written
+    before the response, so a 201 means the submission is durable.
+    """
+    if get_model('Exam') is None or get_model('Result') is None:
+        return jsonify({'error': 'Exam models are not available'}), 501
+
+    candidate = _candidate(exam_id)
+    if candidate is None:
+        return jsonify({'error': 'Access denied'}), 403
+    if candidate.test_end_time is not None:
+        return jsonify({'error': 'Exam already submitted'}), 409
+    candidate_id = candidate.id
+    snapshot = get_exam_snapshot(exam_id)
+    if snapshot is None:
+        return jsonify({'error': 'Exam not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    if 'answers' not in data:
+        return jsonify({'error': 'answers (the final answers) are required'}), 400
+    try:
+        answers = _parse_answers(data['answers'], snapshot)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    Candidate, Result, Answer = get_model('Candidate'), get_model('Result'), get_model('Answer')
+    # Claim the submission so a concurrent (double) submit gets a 409. The
+    # row stays locked until commit, so another worker's flush either wrote
+    # before this or waits and then skips the candidate.
+    claimed = db.session.execute(
+        db.update(Candidate)
+        .where(Candidate.id == candidate_id, Candidate.test_end_time.is_(None))
+        .values(test_end_time=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        return jsonify({'error': 'Exam already submitted'}), 409
+
+    # This worker's pending autosaves, overridden by the final answers
+    buffer = get_autosave_buffer()
+    final = buffer.take(candidate_id)
+    final.update(((candidate_id, question_id), (option_id, text)) for question_id, option_id, text in answers)
+    write_answers(list(final.items()))
+    record_exam_stats(exam_id, completed=1)
+    record_activity(completed=1)
+
+    result = Result(exam_id=exam_id, candidate_id=candidate_id)
+    db.session.add(result)
+    db.session.flush()
+    db.session.execute(
+        db.update(Answer)
+        .where(Answer.candidate_id == candidate_id, Answer.result_id.is_(None))
+        .values(result_id=result.id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    try:
+        grade_result(result)
+    except Exception:
+        # The submission is saved; the exam can be re-graded later
+        logger.exception("Failed to grade result %s", result.id)
+    logger.info("Candidate %s submitted exam %s (result %s)", candidate_id, exam_id, result.id)
+    return jsonify({'message': 'Exam submitted', 'result_id': result.id}), 201
@@ -1,14 +1,40 @@
-from flask import Blueprint, jsonify
-import platform
-import sys
-import flask
-import sqlalchemy
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+import base64
+import json
+from datetime import datetime
 from .. import db
 from ..models.user import User
+from ..utils.db_pool import pool_stats
+from ..utils.health import get_health_monitor
+from ..utils.rate_limit import get_limiter
+from ..utils.sql_profiler import get_sql_profiler
+from .admin import admin_required
 
 # Create test blueprint
 test_bp = Blueprint('test', __name__)
 
+# Fields that can be requested from the user listing
+USER_FIELDS = ('id', 'email', 'username', 'is_admin', 'created_at', 'updated_at')
+
+def encode_cursor(created_at, user_id):
+    """Encode a keyset pagination position as an opaque URL-safe string."""
+    raw = json.dumps([created_at.isoformat(), user_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor created by ``encode_cursor``.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, user_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 @test_bp.route('/ping', methods=['GET'])
 def ping():
     """Simple endpoint to test API connectivity."""
@@ -25,56 +51,32 @@ def version():
         'status': 'success'
     }), 200
 
-@test_bp.route('/system-info', methods=['GET'])
-def system_info():
-    """Return system information for debugging"""
-    # Check database connection
-    db_connected = True
-    db_type = None
-    db_version = None
-    
+@test_bp.route('/live', methods=['GET'])
+def live():
+    """Liveness probe: the process is up and serving requests. Never touches the database."""
+    return jsonify({'status': 'ok'}), 200
+
+@test_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness probe: the database answers a trivial query."""
     try:
-        # Execute a simple query to check connection
-        result = db.session.execute(db.text("SELECT 1"))
-        
-        # Get database info
-        engine = db.session.get_bind()
-        db_type = engine.dialect.name
-        
-        # Get version
-        if db_type == 'sqlite':
-            version = db.session.execute(db.text("SELECT sqlite_version()")).scalar()
-            db_version = f"SQLite {version}"
-        elif db_type == 'postgresql':
-            version = db.session.execute(db.text("SHOW server_version")).scalar()
-            db_version = f"PostgreSQL {version}"
-        elif db_type == 'mysql':
-            version = db.session.execute(db.text("SELECT VERSION()")).scalar()
-            db_version = f"MySQL {version}"
+        db.session.execute(db.text("SELECT 1"))
     except Exception as e:
-        db_connected = False
-        print(f"Database connection error: {e}")
-    
-    # Get application stats
-    stats = {
-        'users': User.query.count()
-    }
-    
-    # System information
-    info = {
-        'python_version': platform.python_version(),
-        'platform': platform.platform(),
-        'flask_version': flask.__version__,
-        'sqlalchemy_version': sqlalchemy.__version__,
-        'environment': 'development' if flask.current_app.debug else 'production',
-        'database': {
-            'connected': db_connected,
-            'type': db_type,
-            'version': db_version
-        },
-        'stats': stats
-    }
+        current_app.logger.warning("Readiness check failed: %s", e)
+        return jsonify({'status': 'unavailable', 'database': False}), 503
+    return jsonify({'status': 'ok', 'database': True}), 200
+
+@test_bp.route('/system-info', methods=['GET'])
+def system_info():
+    """
+    Return system information for debugging.
     
+    Served from the health monitor's cache: versions and platform are
+    collected once, while database status and stats are refreshed in the
+    background every ``HEALTH_REFRESH_INTERVAL`` seconds.
+    """
+    info = get_health_monitor().snapshot()
+    info['environment'] = 'development' if current_app.debug else 'production'
     return jsonify(info)
 
 @test_bp.route('/error-test/<int:code>', methods=['GET'])
@@ -101,9 +103,113 @@ def error_test(code):
 
 @test_bp.route('/users', methods=['GET'])
 def get_users():
-    """Return a list of all users (for debugging only)."""
-    users = User.query.all()
+    """
+    Return a page of users, newest first (for debugging only).
+    
+    Query parameters:
+        limit: Page size (default 100, max ``USER_LIST_MAX_LIMIT``)
+        cursor: ``next_cursor`` from the previous page
+        fields: Comma-separated subset of user fields to return
+        is_admin: ``true`` or ``false`` to filter by role
+    
+    Pages are fetched with a keyset condition on ``(created_at, id)``, so
+    every page costs one index range scan regardless of its position, and
+    the response body is streamed row by row. Users without ``created_at``
+    are not listed.
+    """
+    max_limit = current_app.config.get('USER_LIST_MAX_LIMIT', 500)
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), max_limit)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'limit must be an integer'}), 400
+    
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(USER_FIELDS)
+    unknown = set(fields) - set(USER_FIELDS)
+    if unknown:
+        return jsonify({'status': 'error', 'message': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    
+    columns = [getattr(User, field) for field in fields]
+    for key in ('created_at', 'id'):
+        if key not in fields:
+            columns.append(getattr(User, key))
+    # Rows without a creation time have no keyset position, so they are left out
+    query = (db.select(*columns)
+             .where(User.created_at.isnot(None))
+             .order_by(User.created_at.desc(), User.id.desc())
+             .limit(limit + 1))
+    
+    is_admin = request.args.get('is_admin')
+    if is_admin is not None:
+        query = query.where(User.is_admin == (is_admin.lower() in ('1', 'true', 'yes')))
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, user_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+        query = query.where(db.tuple_(User.created_at, User.id) < (created_at, user_id))
+    
+    rows = db.session.execute(query)
+    dumps = current_app.json.dumps
+    
+    def generate():
+        yield '{"status": "success", "users": ['
+        last = None
+        for count, row in enumerate(rows):
+            if count == limit:
+                break
+            user = row._mapping
+            yield (',' if count else '') + dumps({field: user[field] for field in fields})
+            last = user
+        next_cursor = encode_cursor(last['created_at'], last['id']) if last and count == limit else None
+        yield '], "next_cursor": %s}' % dumps(next_cursor)
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@test_bp.route('/db-pool', methods=['GET'])
+def db_pool():
+    """Return database connection pool metrics (checked-out, overflow, checkout wait times)."""
     return jsonify({
         'status': 'success',
-        'users': [user.to_dict() for user in users]
-    }), 200 
\ No newline at end of file
+        'pool': pool_stats(db.engine)
+    }), 200
+
+@test_bp.route('/rate-limits', methods=['GET'])
+def rate_limits():
+    """Return rate limiter counters (allowed and rejected requests per limit)."""
+    return jsonify({
+        'status': 'success',
+        'rate_limits': get_limiter().stats()
+    }), 200
+
+@test_bp.route('/sql-profiler', methods=['GET', 'PUT'])
+@admin_required
+def sql_profiler():
+    """
+    Inspect or reconfigure the SQL profiler (admin only).
+    
+    GET returns the current settings, recent slow queries and recent
+    requests flagged for slow or repeated (N+1) statements. PUT accepts any
+    of ``enabled``, ``slow_query_ms``, ``n_plus_one_threshold`` and
+    ``clear``; changes apply to this worker process only.
+    """
+    profiler = get_sql_profiler()
+    if request.method == 'PUT':
+        data = request.get_json(silent=True) or {}
+        try:
+            profiler.configure(
+                enabled=data.get('enabled'),
+                slow_query_ms=data.get('slow_query_ms'),
+                n_plus_one_threshold=data.get('n_plus_one_threshold')
+            )
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'Invalid profiler settings'}), 400
+        if data.get('clear'):
+            profiler.clear()
+    
+    return jsonify({
+        'status': 'success',
+        'profiler': profiler.state()
+    }), 200
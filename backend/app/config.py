@@ -9,7 +9,77 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///exam_system.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool (ignored for SQLite); see app/utils/db_pool.py
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'True') == 'True'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    # SQLite concurrency settings; see app/utils/sqlite.py
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'True') == 'True'
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'True') == 'True'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
+    # Answer /me and /validate-token from the user embedded in the token (no DB lookup)
+    JWT_TRUST_USER_CLAIMS = os.environ.get('JWT_TRUST_USER_CLAIMS', 'False') == 'True'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_MAX_SIZE = int(os.environ.get('USER_CACHE_MAX_SIZE', 1024))
+    # Token revocation: each worker syncs revoked tokens into an in-memory
+    # Bloom filter every JWT_REVOCATION_SYNC_INTERVAL seconds; see app/utils/revocation.py
+    JWT_REVOCATION_ENABLED = os.environ.get('JWT_REVOCATION_ENABLED', 'True') == 'True'
+    JWT_REVOCATION_SYNC_INTERVAL = int(os.environ.get('JWT_REVOCATION_SYNC_INTERVAL', 10))
+    JWT_REVOCATION_REBUILD_INTERVAL = int(os.environ.get('JWT_REVOCATION_REBUILD_INTERVAL', 3600))
+    JWT_REVOCATION_CAPACITY = int(os.environ.get('JWT_REVOCATION_CAPACITY', 100000))
+    JWT_REVOCATION_ERROR_RATE = float(os.environ.get('JWT_REVOCATION_ERROR_RATE', 0.001))
+    
+    # Rate limiting ('<count>/<seconds>'); storage is memory:// or a redis:// URL
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True') == 'True'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
+    RATELIMIT_LOGIN_IP = os.environ.get('RATELIMIT_LOGIN_IP', '30/60')
+    RATELIMIT_LOGIN_EMAIL = os.environ.get('RATELIMIT_LOGIN_EMAIL', '5/300')
+    RATELIMIT_REGISTER_IP = os.environ.get('RATELIMIT_REGISTER_IP', '10/3600')
+    
+    # Reverse proxies in front of the app, each appending to X-Forwarded-For.
+    # The client address is the entry the outermost one added; anything to
+    # its left is client-supplied. RATELIMIT_TRUST_PROXY=True means one.
+    TRUSTED_PROXY_COUNT = int(os.environ.get(
+        'TRUSTED_PROXY_COUNT', 1 if os.environ.get('RATELIMIT_TRUST_PROXY', 'False') == 'True' else 0))
+    
+    # User listing page size cap
+    USER_LIST_MAX_LIMIT = int(os.environ.get('USER_LIST_MAX_LIMIT', 500))
+    
+    # Logging: LOG_FORMAT is 'text' or 'json'. Access logs are sampled at
+    # LOG_SAMPLE_RATE; errors and requests slower than LOG_SLOW_REQUEST_MS are always logged.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.01))
+    LOG_SLOW_REQUEST_MS = int(os.environ.get('LOG_SLOW_REQUEST_MS', 1000))
+    
+    # Request/query/SMTP metrics, exposed in Prometheus format at METRICS_PATH
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+    METRICS_PATH = os.environ.get('METRICS_PATH', '/metrics')
+    
+    # SQL profiling: slow queries are always logged; per-request profiling and
+    # N+1 detection run while SQL_PROFILER_ENABLED (switchable at /api/test/sql-profiler)
+    SQL_PROFILER_ENABLED = os.environ.get('SQL_PROFILER_ENABLED', 'False') == 'True'
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SQL_PROFILER_HISTORY = int(os.environ.get('SQL_PROFILER_HISTORY', 50))
+    
+    # Seconds between background refreshes of /api/test/system-info data
+    HEALTH_REFRESH_INTERVAL = int(os.environ.get('HEALTH_REFRESH_INTERVAL', 30))
+    
+    # Password hashing: a werkzeug method ('scrypt:N:r:p', 'pbkdf2:sha256:iterations') or 'argon2'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+    PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+    PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 19456))
+    PASSWORD_ARGON2_PARALLELISM = int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1))
     
     # Email config
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -18,10 +88,60 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+    MAIL_USE_SSL = os.environ.get('MAIL_USE_SSL', str(not MAIL_USE_TLS)) == 'True'
+    MAIL_TIMEOUT = int(os.environ.get('MAIL_TIMEOUT', 30))
+    
+    # SMTP connection pool
+    MAIL_POOL_SIZE = int(os.environ.get('MAIL_POOL_SIZE', 4))
+    MAIL_POOL_MAX_MESSAGES = int(os.environ.get('MAIL_POOL_MAX_MESSAGES', 100))
+    MAIL_POOL_IDLE_TIMEOUT = int(os.environ.get('MAIL_POOL_IDLE_TIMEOUT', 30))
+    
+    # Email outbox (background delivery)
+    MAIL_USE_OUTBOX = os.environ.get('MAIL_USE_OUTBOX', 'True') == 'True'
+    MAIL_OUTBOX_CONCURRENCY = int(os.environ.get('MAIL_OUTBOX_CONCURRENCY', 4))
+    MAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('MAIL_OUTBOX_BATCH_SIZE', 50))
+    MAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get('MAIL_OUTBOX_POLL_INTERVAL', 1.0))
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('MAIL_OUTBOX_MAX_ATTEMPTS', 5))
+    MAIL_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('MAIL_OUTBOX_BACKOFF_SECONDS', 30))
+    MAIL_OUTBOX_LEASE_SECONDS = int(os.environ.get('MAIL_OUTBOX_LEASE_SECONDS', 300))
+    
+    # Candidate invitations
+    EXAM_URL_TEMPLATE = os.environ.get('EXAM_URL_TEMPLATE', 'http://localhost:3000/exam/{candidate_id}')
+    INVITATION_BATCH_SIZE = int(os.environ.get('INVITATION_BATCH_SIZE', 500))
+    
+    # Compiled email template bytecode (defaults to <instance>/email_template_cache)
+    EMAIL_TEMPLATE_CACHE_DIR = os.environ.get('EMAIL_TEMPLATE_CACHE_DIR')
+    
+    # JSON provider ('auto' uses orjson when installed, else the stdlib) and response compression
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'True') == 'True'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    
+    # Serialized exam content served to candidates (per worker; a gzip level of 0 disables pre-compression)
+    EXAM_SNAPSHOT_CACHE_SIZE = int(os.environ.get('EXAM_SNAPSHOT_CACHE_SIZE', 128))
+    EXAM_SNAPSHOT_TTL = int(os.environ.get('EXAM_SNAPSHOT_TTL', 60))
+    EXAM_SNAPSHOT_GZIP_LEVEL = int(os.environ.get('EXAM_SNAPSHOT_GZIP_LEVEL', 6))
+    
+    # Write-behind buffer for answers autosaved during an exam (per worker process)
+    AUTOSAVE_BUFFERED = os.environ.get('AUTOSAVE_BUFFERED', 'True') == 'True'
+    AUTOSAVE_FLUSH_INTERVAL = float(os.environ.get('AUTOSAVE_FLUSH_INTERVAL', 2.0))
+    AUTOSAVE_MAX_PENDING = int(os.environ.get('AUTOSAVE_MAX_PENDING', 1000))
+    AUTOSAVE_BATCH_SIZE = int(os.environ.get('AUTOSAVE_BATCH_SIZE', 500))
+    
+    # Results graded per batch (one read and one write transaction each)
+    GRADING_BATCH_SIZE = int(os.environ.get('GRADING_BATCH_SIZE', 2000))
+    
+    # Result exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+    COLUMNAR_EXPORT_BATCH_SIZE = int(os.environ.get('COLUMNAR_EXPORT_BATCH_SIZE', 50000))
 
 class DevelopmentConfig(Config):
     """Development config."""
     DEBUG = True
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 2))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 3))
 
 class TestingConfig(Config):
     """Testing config."""
@@ -30,4 +150,21 @@ class TestingConfig(Config):
 
 class ProductionConfig(Config):
     """Production config."""
-    DEBUG = False 
\ No newline at end of file
+    DEBUG = False
+    # Per worker process: keep workers * (size + overflow) below the server's max_connections
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 300))
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+ 
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig
+}
+
+def get_config():
+    """Return the config class for ``FLASK_ENV`` (the base Config when unset or unknown)."""
+    return config_by_name.get(os.environ.get('FLASK_ENV', ''), Config)
@@ -1,5 +1,22 @@
 # Import models to make them available when importing the models package
+from .. import db
 from .user import User
+from .email_outbox import EmailOutbox
+from .token_revocation import TokenRevocation
+from .exam_stats import DailyActivity, ExamStats
 
 # Define all models here
-__all__ = ['User'] 
\ No newline at end of file
+__all__ = ['User', 'EmailOutbox', 'TokenRevocation', 'ExamStats', 'DailyActivity', 'get_model']
+
+def get_model(name):
+    """
+    Return the mapped model class called ``name``, or None if it isn't registered.
+
+    The exam models (Candidate, Exam, Result, ...) are defined by the
+    application built on top of this boilerplate, so helpers that query
+    them look the classes up lazily instead of importing them.
+    """
+    for mapper in db.Model.registry.mappers:
+        if mapper.class_.__name__ == name:
+            return mapper.class_
+    return None
\ No newline at end of file
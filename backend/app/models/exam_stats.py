@@ -0,0 +1,72 @@
+from datetime import datetime
+from .. import db
+
+class ExamStats(db.Model):
+    """
+    Running totals of an exam's candidates and results for the admin dashboard.
+
+    Rows are kept up to date incrementally, in the same transaction as the
+    change they count (see ``app.utils.stats``), so reading them never
+    scans candidates or results. ``graded`` counts results with a score
+    and ``score_total`` sums those scores, for the average.
+    """
+    __tablename__ = 'exam_stats'
+
+    # Not a foreign key: the exams table belongs to the application's models
+    exam_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    candidates = db.Column(db.Integer, nullable=False, default=0)
+    invited = db.Column(db.Integer, nullable=False, default=0)
+    started = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    graded = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    score_total = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def average_score(self):
+        return round(self.score_total / self.graded, 2) if self.graded else None
+
+    @property
+    def pass_rate(self):
+        return round(self.passed / self.graded * 100, 2) if self.graded else None
+
+    def to_dict(self):
+        """Convert exam stats to dictionary."""
+        return {
+            'exam_id': self.exam_id,
+            'candidates': self.candidates,
+            'invited': self.invited,
+            'started': self.started,
+            'completed': self.completed,
+            'graded': self.graded,
+            'passed': self.passed,
+            'average_score': self.average_score,
+            'pass_rate': self.pass_rate,
+            'updated_at': self.updated_at
+        }
+
+    def __repr__(self):
+        return f'<ExamStats {self.exam_id}>'
+
+
+class DailyActivity(db.Model):
+    """Invitations sent, exams started and exams submitted per day (UTC), across all exams."""
+    __tablename__ = 'daily_activity'
+
+    day = db.Column(db.Date, primary_key=True)
+    invited = db.Column(db.Integer, nullable=False, default=0)
+    started = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert daily activity to dictionary."""
+        return {
+            'day': self.day,
+            'invited': self.invited,
+            'started': self.started,
+            'completed': self.completed
+        }
+
+    def __repr__(self):
+        return f'<DailyActivity {self.day}>'
@@ -0,0 +1,38 @@
+from datetime import datetime
+from .. import db
+
+class TokenRevocation(db.Model):
+    """
+    A revoked access token, or a cut-off for all of a user's tokens.
+
+    Rows with a ``jti`` revoke that single token. Rows with only a
+    ``user_id`` revoke every token of that user issued before
+    ``revoked_at`` (e.g. "sign out everywhere"). Rows are only needed until
+    ``expires_at``, after which the tokens they cover have expired anyway.
+    """
+    __tablename__ = 'token_revocations'
+    __table_args__ = (
+        db.Index('ix_token_revocations_revoked_at', 'revoked_at'),
+        db.Index('ix_token_revocations_expires_at', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=True, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    reason = db.Column(db.String(255), nullable=True)
+
+    def to_dict(self):
+        """Convert revocation to dictionary."""
+        return {
+            'id': self.id,
+            'jti': self.jti,
+            'user_id': self.user_id,
+            'revoked_at': self.revoked_at,
+            'expires_at': self.expires_at,
+            'reason': self.reason
+        }
+
+    def __repr__(self):
+        return f'<TokenRevocation {self.jti or f"user {self.user_id}"}>'
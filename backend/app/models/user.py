@@ -1,10 +1,15 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from .. import db
+from ..utils.passwords import hash_password, needs_rehash, verify_password
 
 class User(db.Model):
     """User model for administrators."""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pagination of user listings, optionally filtered by role
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_is_admin_created_at_id', 'is_admin', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -17,12 +22,20 @@ class User(db.Model):
     def __init__(self, email, username, password, is_admin=False):
         self.email = email
         self.username = username
-        self.password_hash = generate_password_hash(password)
+        self.set_password(password)
         self.is_admin = is_admin
 
+    def set_password(self, password):
+        """Hash and store a new password with the configured hashing method."""
+        self.password_hash = hash_password(password)
+
     def check_password(self, password):
         """Check if the provided password matches the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Check if the stored hash uses outdated hashing parameters."""
+        return needs_rehash(self.password_hash)
 
     def to_dict(self):
         """Convert user object to dictionary."""
@@ -31,8 +44,8 @@ class User(db.Model):
             'email': self.email,
             'username': self.username,
             'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
     def __repr__(self):
@@ -0,0 +1,255 @@
+import atexit
+import logging
+import threading
+from flask import current_app
+from .. import db
+from ..models import get_model
+from .sqlite import write_intent
+
+logger = logging.getLogger(__name__)
+
+class AutosaveBuffer:
+    """
+    Write-behind buffer for answers saved while an exam is in progress.
+
+    Saves are kept in memory keyed by ``(candidate_id, question_id)``, so a
+    candidate changing an answer ten times between flushes costs one row
+    write. A background thread flushes the buffer every ``flush_interval``
+    seconds, or as soon as ``max_pending`` answers are waiting, writing up
+    to ``batch_size`` answers per transaction: one query locks the rows of
+    candidates still taking the exam, one finds the answers that already
+    exist, then one executemany UPDATE and one executemany INSERT write them.
+
+    Saves not yet flushed live only in this worker's memory, so a crash
+    loses at most ``flush_interval`` seconds of autosaves, and a save
+    buffered by one worker is invisible to the others. Autosaves are
+    therefore best effort: exam submission carries the candidate's full
+    final answers and writes them itself. Saves for candidates who have
+    already submitted are dropped.
+    """
+
+    def __init__(self, app, flush_interval=2.0, max_pending=1000, batch_size=500):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Held while writing, so flush(candidate_id) also waits for a
+        # background batch that already took the candidate's answers
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.saves = 0
+        self.coalesced = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.failures = 0
+        # Write what is still pending when the worker process exits
+        atexit.register(self.stop)
+
+    def save(self, candidate_id, question_id, selected_option_id=None, text_response=None):
+        """Buffer an answer, replacing any pending answer to the same question."""
+        with self._lock:
+            key = (candidate_id, question_id)
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (selected_option_id, text_response)
+            self.saves += 1
+            pending = len(self._pending)
+        if pending >= self.max_pending:
+            self._wake.set()
+        self.start()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _take(self, candidate_id=None):
+        with self._lock:
+            if candidate_id is None:
+                taken, self._pending = self._pending, {}
+            else:
+                taken = {key: value for key, value in self._pending.items() if key[0] == candidate_id}
+                for key in taken:
+                    del self._pending[key]
+        return taken
+
+    def take(self, candidate_id):
+        """Remove and return a candidate's pending answers, keyed by ``(candidate_id, question_id)``."""
+        return self._take(candidate_id)
+
+    def _restore(self, entries):
+        # Put back answers that failed to write unless a newer save replaced them
+        with self._lock:
+            for key, value in entries.items():
+                self._pending.setdefault(key, value)
+
+    def flush(self, candidate_id=None):
+        """
+        Write pending answers to the database.
+
+        Args:
+            candidate_id (int, optional): Only flush this candidate's answers
+
+        Returns:
+            int: Number of answers written (saves of candidates who have
+            already submitted are discarded)
+
+        Raises:
+            Exception: Database errors are re-raised after the unwritten
+                answers are put back in the buffer
+        """
+        with self._flush_lock:
+            entries = self._take(candidate_id)
+            if not entries:
+                return 0
+            items = list(entries.items())
+            done = written = 0
+            try:
+                with self.app.app_context():
+                    for start in range(0, len(items), self.batch_size):
+                        batch = items[start:start + self.batch_size]
+                        with write_intent():
+                            written += self._write(batch)
+                        done = start + len(batch)
+            except Exception:
+                self.failures += 1
+                self._restore(dict(items[done:]))
+                raise
+            finally:
+                self.rows_written += written
+                self.flushes += 1
+        return written
+
+    def _write(self, batch):
+        """Upsert one batch of answers in a single transaction and return the rows written."""
+        Candidate = get_model('Candidate')
+        try:
+            # Lock the rows of candidates still taking the exam until commit, so a
+            # submission can't land between this check and the writes below.
+            # Selecting the open ones (not the submitted ones) matters: a row
+            # submitted while we waited for its lock is re-checked and dropped.
+            # SQLite ignores FOR UPDATE; write_intent() already holds its write lock.
+            in_progress = set(db.session.execute(
+                db.select(Candidate.id)
+                .where(Candidate.id.in_({candidate_id for (candidate_id, _), _ in batch}),
+                       Candidate.test_end_time.is_(None))
+                .order_by(Candidate.id)
+                .with_for_update()
+            ).scalars())
+            written = write_answers([entry for entry in batch if entry[0][0] in in_progress])
+            db.session.commit()
+            return written
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush %d autosaved answers", self.pending())
+                # Don't spin on a database that is down
+                self._stop.wait(self.flush_interval)
+
+    def start(self):
+        """Start the flush thread unless it is already running in this process."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='autosave-flusher', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Lost %d autosaved answers on shutdown", self.pending())
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'saves': self.saves,
+            'coalesced': self.coalesced,
+            'rows_written': self.rows_written,
+            'flushes': self.flushes,
+            'failures': self.failures
+        }
+
+
+def write_answers(entries):
+    """
+    Upsert in-progress answers in the session's transaction, without committing.
+
+    One query finds the rows that already exist, then one executemany
+    UPDATE and one executemany INSERT write them.
+
+    Args:
+        entries (list): ``((candidate_id, question_id), (selected_option_id,
+            text_response))`` pairs, at most one per question and candidate
+
+    Returns:
+        int: Number of answers written
+    """
+    if not entries:
+        return 0
+    Answer = get_model('Answer')
+    existing = {
+        (candidate_id, question_id): answer_id
+        for answer_id, candidate_id, question_id in db.session.execute(
+            db.select(Answer.id, Answer.candidate_id, Answer.question_id)
+            .where(Answer.candidate_id.in_({candidate_id for (candidate_id, _), _ in entries}),
+                   Answer.question_id.in_({question_id for (_, question_id), _ in entries}),
+                   Answer.result_id.is_(None))
+        )
+    }
+
+    updates, inserts = [], []
+    for (candidate_id, question_id), (option_id, text) in entries:
+        answer_id = existing.get((candidate_id, question_id))
+        if answer_id is not None:
+            updates.append({'id': answer_id, 'selected_option_id': option_id, 'text_response': text})
+        else:
+            inserts.append({'candidate_id': candidate_id, 'question_id': question_id,
+                            'selected_option_id': option_id, 'text_response': text})
+    if updates:
+        db.session.execute(db.update(Answer), updates)
+    if inserts:
+        db.session.execute(db.insert(Answer), inserts)
+    return len(updates) + len(inserts)
+
+
+def get_autosave_buffer(app=None):
+    """
+    Return the application's autosave buffer, creating it on first use.
+
+    The flush thread starts with the first save rather than in create_app,
+    so each gunicorn worker runs its own thread after forking.
+    """
+    app = app or current_app._get_current_object()
+    buffer = app.extensions.get('autosave_buffer')
+    if buffer is None:
+        buffer = app.extensions.setdefault('autosave_buffer', AutosaveBuffer(
+            app,
+            flush_interval=app.config.get('AUTOSAVE_FLUSH_INTERVAL', 2.0),
+            max_pending=app.config.get('AUTOSAVE_MAX_PENDING', 1000),
+            batch_size=app.config.get('AUTOSAVE_BATCH_SIZE', 500)
+        ))
+    return buffer
@@ -0,0 +1,143 @@
+from flask import current_app
+from sqlalchemy.orm import Query
+from .. import db
+from ..models import get_model
+
+# Supported columnar formats and their file extensions
+COLUMNAR_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Columnar exports require pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def _models():
+    Result = get_model('Result')
+    Answer = Result.answers.property.mapper.class_
+    return {
+        'Result': Result,
+        'Answer': Answer,
+        'Candidate': Result.candidate.property.mapper.class_,
+        'Exam': Result.exam.property.mapper.class_,
+        'Question': Answer.question.property.mapper.class_,
+        'Option': Answer.selected_option.property.mapper.class_
+    }
+
+def _result_filter(results, Result):
+    """Turn an Exam instance or a query of results into a WHERE clause on Result.id."""
+    if isinstance(results, Query):
+        return Result.id.in_(results.with_entities(Result.id).scalar_subquery())
+    return Result.exam == results
+
+def _results_table(pa, models, where):
+    Result, Candidate, Exam = models['Result'], models['Candidate'], models['Exam']
+    schema = pa.schema([
+        ('result_id', pa.int64()),
+        ('exam_id', pa.int64()),
+        ('exam_title', pa.string()),
+        ('candidate_id', pa.int64()),
+        ('candidate_name', pa.string()),
+        ('candidate_email', pa.string()),
+        ('test_start_time', pa.timestamp('us')),
+        ('test_end_time', pa.timestamp('us')),
+        ('score', pa.float64()),
+        ('passed', pa.bool_()),
+        ('feedback', pa.string()),
+        ('created_at', pa.timestamp('us'))
+    ])
+    query = (
+        db.select(Result.id, Exam.id, Exam.title, Candidate.id, Candidate.name, Candidate.email,
+                  Candidate.test_start_time, Candidate.test_end_time, Result.score,
+                  Result.passed, Result.feedback, Result.created_at)
+        .join(Result.exam)
+        .join(Result.candidate)
+        .where(where)
+        .order_by(Result.id)
+    )
+    return schema, query
+
+def _answers_table(pa, models, where):
+    Result, Answer = models['Result'], models['Answer']
+    Question, Option = models['Question'], models['Option']
+    schema = pa.schema([
+        ('answer_id', pa.int64()),
+        ('result_id', pa.int64()),
+        ('question_id', pa.int64()),
+        ('question_type', pa.string()),
+        ('question_text', pa.string()),
+        ('points_possible', pa.float64()),
+        ('selected_option_id', pa.int64()),
+        ('selected_option_text', pa.string()),
+        ('text_response', pa.string()),
+        ('is_correct', pa.bool_()),
+        ('earned_points', pa.float64())
+    ])
+    query = (
+        db.select(Answer.id, Result.id, Question.id, Question.question_type, Question.text,
+                  Question.points, Option.id, Option.text, Answer.text_response,
+                  Answer.is_correct, Answer.earned_points)
+        .select_from(Result)
+        .join(Result.answers)
+        .join(Answer.question)
+        .outerjoin(Answer.selected_option)
+        .where(where)
+        .order_by(Result.id, Answer.id)
+    )
+    return schema, query
+
+TABLES = {'results': _results_table, 'answers': _answers_table}
+
+def write_columnar(results, table, sink, export_format='parquet', batch_size=None):
+    """
+    Write results or answers of an exam as a typed, columnar Parquet or Arrow file.
+
+    Rows are read straight from the database with ``yield_per`` and converted
+    column-wise into Arrow record batches, one Parquet row group (or IPC
+    record batch) per database batch, so memory is bounded by the batch
+    size. Numbers, booleans and timestamps keep their native types.
+
+    Args:
+        results: An Exam model instance or a query of Result model instances
+        table (str): ``results`` (one row per result) or ``answers`` (one row
+            per answer, keyed by ``result_id``)
+        sink: Path or writable binary file object
+        export_format (str): ``parquet`` or ``arrow`` (Arrow IPC file)
+        batch_size (int, optional): Rows per batch. Defaults to
+            ``COLUMNAR_EXPORT_BATCH_SIZE``.
+
+    Returns:
+        int: Number of rows written
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    pa = _require_pyarrow()
+    batch_size = batch_size or current_app.config.get('COLUMNAR_EXPORT_BATCH_SIZE', 50000)
+
+    models = _models()
+    schema, query = TABLES[table](pa, models, _result_filter(results, models['Result']))
+
+    if export_format == 'parquet':
+        writer = pa.parquet.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+
+    rows_written = 0
+    try:
+        rows = db.session.execute(query.execution_options(yield_per=batch_size))
+        for partition in rows.partitions():
+            columns = list(zip(*partition))
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            )
+            writer.write_batch(batch)
+            rows_written += len(partition)
+    finally:
+        writer.close()
+
+    return rows_written
@@ -0,0 +1,145 @@
+import gzip
+import logging
+import zlib
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'text/csv', 'text/html', 'text/plain', 'text/css', 'text/javascript', 'text/xml'
+))
+
+# Streamed bodies are flushed to the client after this much input, so a
+# long export keeps arriving in pieces instead of all at the end
+STREAM_FLUSH_BYTES = 64 * 1024
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class Compressor:
+    """
+    Compresses responses with the best encoding the client accepts.
+
+    Brotli is offered when the ``brotli`` package is installed, gzip always.
+    Responses are left alone when they are small (under ``min_size``), of a
+    type that doesn't compress, already encoded, files sent with
+    ``send_file``, or marked ``Cache-Control: no-transform`` (which is how
+    a stream that must reach the client line by line, like a progress
+    feed, opts out). Streamed responses are compressed as they are sent.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def _skip(self, response):
+        return (
+            response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'no-transform' in response.cache_control
+            or request.method == 'HEAD'
+        )
+
+    def _stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_iter(self, encoding, chunks, close):
+        stream = self._stream(encoding)
+        pending = 0
+        try:
+            for chunk in chunks:
+                data = stream.compress(chunk)
+                pending += len(chunk)
+                if pending >= STREAM_FLUSH_BYTES:
+                    data += stream.flush()
+                    pending = 0
+                if data:
+                    yield data
+            yield stream.finish()
+        finally:
+            if close is not None:
+                close()
+
+    def after_request(self, response):
+        if self._skip(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            original = response.response
+            response.response = self._compress_iter(encoding, response.iter_encoded(),
+                                                    getattr(original, 'close', None))
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressed = self.compress(data, encoding)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag names one exact byte sequence, so each encoding gets its own
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
+
+
+def init_compression(app):
+    """Compress responses according to the ``COMPRESSION_*`` settings."""
+    compressor = Compressor(
+        min_size=app.config.get('COMPRESSION_MIN_SIZE', 1024),
+        gzip_level=app.config.get('COMPRESSION_GZIP_LEVEL', 6),
+        brotli_quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 4)
+    )
+    app.extensions['compressor'] = compressor
+    app.after_request(compressor.after_request)
+    return compressor
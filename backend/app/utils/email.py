@@ -1,8 +1,276 @@
 import os
+import logging
 import smtplib
+import threading
+import time
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
+from sqlalchemy.orm import with_parent
+from .. import db
+from .metrics import observe_smtp
+from .results import answers_loaded
+from .templates import EmailTemplate
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a pooled session went away underneath us. The message is
+# retried once on a freshly connected session when one of these is raised.
+STALE_SESSION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class _PooledSession:
+    """An authenticated SMTP connection together with its usage bookkeeping."""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of persistent, already-authenticated SMTP sessions.
+
+    Each session is reused for up to ``max_messages`` deliveries, so the TCP,
+    TLS and AUTH handshakes are paid once per session instead of once per
+    message. Sessions idle for longer than ``idle_timeout`` seconds are probed
+    with ``NOOP`` before reuse, and a session that turns out to be stale is
+    replaced transparently.
+
+    The pool works against any SMTP server, including a local ``aiosmtpd`` or
+    ``python -m smtpd`` debugging server (set ``MAIL_USE_TLS=False``,
+    ``MAIL_USE_SSL=False`` and leave ``MAIL_USERNAME`` empty).
+    """
+
+    def __init__(self, server, port, username=None, password=None, use_tls=True,
+                 use_ssl=False, size=4, max_messages=100, idle_timeout=30, timeout=30):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._send_times = deque(maxlen=1000)
+
+        self.handshakes = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+        self.failures = 0
+
+    def _connect(self):
+        """Open, secure and authenticate a new SMTP session."""
+        if self.use_tls:
+            smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+            smtp.starttls()
+        elif self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+
+        if self.username:
+            smtp.login(self.username, self.password)
+
+        with self._lock:
+            self.handshakes += 1
+        return _PooledSession(smtp)
+
+    def _is_alive(self, session):
+        """Check an idle session with NOOP if it has not been used recently."""
+        if time.monotonic() - session.last_used < self.idle_timeout:
+            return True
+        try:
+            return session.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is not None and not self._is_alive(session):
+                session.close()
+                with self._lock:
+                    self.reconnects += 1
+                session = None
+            return session or self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, session, broken=False):
+        try:
+            if broken or session.messages >= self.max_messages:
+                session.close()
+            else:
+                session.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(session)
+        finally:
+            self._slots.release()
+
+    def send(self, sender, recipients, message):
+        """
+        Deliver a single message over a pooled session.
+
+        Args:
+            sender (str): Envelope sender address
+            recipients (list): Envelope recipient addresses
+            message (str): Fully rendered message
+
+        Raises:
+            smtplib.SMTPException: If the server rejects the message
+            OSError: If the server cannot be reached
+        """
+        for attempt in range(2):
+            session = self._acquire()
+            reused = session.messages > 0
+            try:
+                session.smtp.sendmail(sender, recipients, message)
+            except STALE_SESSION_ERRORS:
+                self._release(session, broken=True)
+                if reused and attempt == 0:
+                    with self._lock:
+                        self.reconnects += 1
+                    continue
+                with self._lock:
+                    self.failures += 1
+                raise
+            except smtplib.SMTPRecipientsRefused:
+                # The session itself is still healthy
+                self._release(session)
+                with self._lock:
+                    self.failures += 1
+                raise
+            except Exception:
+                self._release(session, broken=True)
+                with self._lock:
+                    self.failures += 1
+                raise
+
+            session.messages += 1
+            self._release(session)
+            with self._lock:
+                self.messages_sent += 1
+                self._send_times.append(time.monotonic())
+            return
+
+    def stats(self):
+        """Return delivery counters and the recent send rate."""
+        with self._lock:
+            times = list(self._send_times)
+            stats = {
+                'size': self.size,
+                'idle_sessions': len(self._idle),
+                'handshakes': self.handshakes,
+                'reconnects': self.reconnects,
+                'messages_sent': self.messages_sent,
+                'failures': self.failures,
+            }
+
+        elapsed = times[-1] - times[0] if len(times) > 1 else 0
+        stats['sends_per_second'] = (len(times) - 1) / elapsed if elapsed else 0.0
+        stats['messages_per_handshake'] = (
+            stats['messages_sent'] / stats['handshakes'] if stats['handshakes'] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Close every idle session."""
+        with self._lock:
+            sessions = list(self._idle)
+            self._idle.clear()
+        for session in sessions:
+            session.close()
+
+
+_pool_lock = threading.Lock()
+
+def get_smtp_pool(app=None):
+    """
+    Return the SMTP connection pool for the application, creating it on first use.
+
+    The pool is created lazily so that each gunicorn worker opens its own
+    sessions after forking.
+    """
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('smtp_pool')
+    if pool is not None:
+        return pool
+
+    with _pool_lock:
+        pool = app.extensions.get('smtp_pool')
+        if pool is None:
+            config = app.config
+            pool = SMTPConnectionPool(
+                server=config.get('MAIL_SERVER'),
+                port=config.get('MAIL_PORT'),
+                username=config.get('MAIL_USERNAME'),
+                password=config.get('MAIL_PASSWORD'),
+                use_tls=config.get('MAIL_USE_TLS'),
+                use_ssl=config.get('MAIL_USE_SSL', not config.get('MAIL_USE_TLS')),
+                size=config.get('MAIL_POOL_SIZE', 4),
+                max_messages=config.get('MAIL_POOL_MAX_MESSAGES', 100),
+                idle_timeout=config.get('MAIL_POOL_IDLE_TIMEOUT', 30),
+                timeout=config.get('MAIL_TIMEOUT', 30),
+            )
+            app.extensions['smtp_pool'] = pool
+    return pool
+
+def deliver_email(recipient, subject, body, html=None):
+    """
+    Deliver an email immediately over a pooled SMTP session.
+    
+    Args:
+        recipient (str): Email address of the recipient
+        subject (str): Subject of the email
+        body (str): Plain text body of the email
+        html (str, optional): HTML body of the email
+    
+    Raises:
+        smtplib.SMTPException: If the server rejects the message
+        OSError: If the server cannot be reached
+    """
+    mail_default_sender = current_app.config.get('MAIL_DEFAULT_SENDER')
+    
+    # Create message
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = mail_default_sender
+    msg['To'] = recipient
+    
+    # Attach plain text and HTML parts
+    msg.attach(MIMEText(body, 'plain'))
+    if html:
+        msg.attach(MIMEText(html, 'html'))
+    
+    # Send over a pooled, already-authenticated session
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        get_smtp_pool().send(mail_default_sender, [recipient], msg.as_string())
+        outcome = 'sent'
+    finally:
+        observe_smtp(time.perf_counter() - started, outcome)
 
 def send_email(recipient, subject, body, html=None):
     """
@@ -18,83 +286,109 @@ def send_email(recipient, subject, body, html=None):
         bool: True if email was sent successfully, False otherwise
     """
     try:
-        # Get email configuration from app config
-        mail_server = current_app.config.get('MAIL_SERVER')
-        mail_port = current_app.config.get('MAIL_PORT')
-        mail_username = current_app.config.get('MAIL_USERNAME')
-        mail_password = current_app.config.get('MAIL_PASSWORD')
-        mail_use_tls = current_app.config.get('MAIL_USE_TLS')
-        mail_default_sender = current_app.config.get('MAIL_DEFAULT_SENDER')
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = mail_default_sender
-        msg['To'] = recipient
-        
-        # Attach plain text and HTML parts
-        msg.attach(MIMEText(body, 'plain'))
-        if html:
-            msg.attach(MIMEText(html, 'html'))
-        
-        # Connect to server and send
-        if mail_use_tls:
-            server = smtplib.SMTP(mail_server, mail_port)
-            server.starttls()
-        else:
-            server = smtplib.SMTP_SSL(mail_server, mail_port)
-        
-        server.login(mail_username, mail_password)
-        server.sendmail(mail_default_sender, recipient, msg.as_string())
-        server.quit()
-        
+        deliver_email(recipient, subject, body, html)
         return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
+    except Exception:
+        logger.exception("Error sending email to %s", recipient)
         return False
 
-def send_candidate_invitation(candidate, exam_url):
+def dispatch_email(recipient, subject, body, html=None, dedupe_key=None):
     """
-    Send an invitation email to a candidate with their unique exam link.
+    Queue an email on the outbox, or send it inline when the outbox is disabled.
+    
+    With ``MAIL_USE_OUTBOX`` enabled (the default) the calling request only
+    pays for one INSERT; delivery, retries and status tracking are handled
+    by the outbox worker. The entry is only added to the session, not
+    committed: the email is queued when the caller commits, and dropped if
+    the caller rolls back.
     
     Args:
-        candidate: Candidate model instance
-        exam_url: URL to access the exam
+        recipient (str): Email address of the recipient
+        subject (str): Subject of the email
+        body (str): Plain text body of the email
+        html (str, optional): HTML body of the email
+        dedupe_key (str, optional): Key that prevents the same logical
+            message from being queued twice
+    
+    Returns:
+        EmailOutbox or bool: The uncommitted outbox entry when queued (the
+        caller must commit it), otherwise whether ``send_email`` sent it
     """
-    subject = f"Invitation to Complete Online Assessment"
+    if not current_app.config.get('MAIL_USE_OUTBOX', True):
+        return send_email(recipient, subject, body, html)
     
-    body = f"""
-    Hello {candidate.name},
+    from .outbox import enqueue_email
+    return enqueue_email(recipient, subject, body, html, dedupe_key=dedupe_key)
+
+class InvitationTemplate(EmailTemplate):
+    """
+    Invitation email prepared for a single exam.
     
-    You have been invited to complete an online assessment.
+    The compiled template is rendered once with the exam-level details;
+    ``render`` only substitutes the candidate's name and link, so inviting
+    a whole cohort does not repeat the per-exam work.
+    """
+    subject = "Invitation to Complete Online Assessment"
     
-    Please click the link below to access your assessment:
-    {exam_url}
+    def __init__(self, exam):
+        super().__init__('invitation', {'duration_minutes': exam.duration_minutes})
+        self._prerendered = self.prerender('name', 'exam_url')
     
-    This link is unique to you and should not be shared with others.
+    def render(self, name, exam_url):
+        """
+        Render the invitation for one candidate.
+        
+        Returns:
+            tuple: (plain text body, HTML body)
+        """
+        return self._prerendered.render(name=name, exam_url=exam_url)
+
+def result_has_open_ended(result):
+    """
+    Check whether a result contains open-ended questions.
     
-    The assessment will take approximately {candidate.exam.duration_minutes} minutes to complete.
-    Once you start the assessment, you must complete it in one session.
+    Answers loaded up front (see ``load_result``) are checked in memory;
+    otherwise a single EXISTS query is issued instead of lazy-loading every
+    answer's question.
+    
+    Args:
+        result: Result model instance
     
-    Good luck!
+    Returns:
+        bool: True if any answered question is open-ended
     """
+    if answers_loaded(result):
+        return any(a.question.question_type == 'open_ended' for a in result.answers)
+    
+    Result = type(result)
+    Answer = Result.answers.property.mapper.class_
+    Question = Answer.question.property.mapper.class_
     
-    html = f"""
-    <html>
-      <body>
-        <p>Hello {candidate.name},</p>
-        <p>You have been invited to complete an online assessment.</p>
-        <p>Please click the link below to access your assessment:</p>
-        <p><a href="{exam_url}">{exam_url}</a></p>
-        <p>This link is unique to you and should not be shared with others.</p>
-        <p>The assessment will take approximately {candidate.exam.duration_minutes} minutes to complete.
-        Once you start the assessment, you must complete it in one session.</p>
-        <p>Good luck!</p>
-      </body>
-    </html>
+    query = (
+        db.select(Answer.id)
+        .join(Answer.question)
+        .where(with_parent(result, Result.answers))
+        .where(Question.question_type == 'open_ended')
+    )
+    return bool(db.session.execute(db.select(query.exists())).scalar())
+
+def send_candidate_invitation(candidate, exam_url, dedupe_key=None):
     """
+    Send an invitation email to a candidate with their unique exam link.
     
-    return send_email(candidate.email, subject, body, html)
+    Args:
+        candidate: Candidate model instance
+        exam_url: URL to access the exam
+        dedupe_key (str, optional): Key that prevents a duplicate invitation
+    
+    Returns:
+        EmailOutbox or bool: See ``dispatch_email``; a queued entry is
+        only sent once the caller commits
+    """
+    template = InvitationTemplate(candidate.exam)
+    body, html = template.render(candidate.name, exam_url)
+    
+    return dispatch_email(candidate.email, template.subject, body, html, dedupe_key=dedupe_key)
 
 def send_result_notification(result):
     """
@@ -102,41 +396,23 @@ def send_result_notification(result):
     
     Args:
         result: Result model instance
-    """
-    candidate = result.candidate
-    exam = result.exam
-    
-    subject = f"Your Assessment Results"
-    
-    body = f"""
-    Hello {candidate.name},
-    
-    Thank you for completing the online assessment.
-    
-    Your results:
-    Score: {result.score:.2f}%
-    Status: {"Passed" if result.passed else "Failed"}
-    
-    {result.feedback if result.feedback else ""}
     
-    Thank you for your participation.
+    Returns:
+        EmailOutbox or bool: See ``dispatch_email``; a queued entry is
+        only sent once the caller commits
     """
+    candidate = result.candidate
     
-    html = f"""
-    <html>
-      <body>
-        <p>Hello {candidate.name},</p>
-        <p>Thank you for completing the online assessment.</p>
-        <h3>Your results:</h3>
-        <p>Score: <strong>{result.score:.2f}%</strong></p>
-        <p>Status: <strong>{"Passed" if result.passed else "Failed"}</strong></p>
-        {f"<p>{result.feedback}</p>" if result.feedback else ""}
-        <p>Thank you for your participation.</p>
-      </body>
-    </html>
-    """
+    subject = "Your Assessment Results"
+    body, html = EmailTemplate('result_notification').render(
+        candidate_name=candidate.name,
+        score=result.score,
+        passed=result.passed,
+        feedback=result.feedback
+    )
     
-    return send_email(candidate.email, subject, body, html)
+    return dispatch_email(candidate.email, subject, body, html,
+                          dedupe_key=f"result:{result.id}")
 
 def send_admin_notification(result):
     """
@@ -144,39 +420,24 @@ def send_admin_notification(result):
     
     Args:
         result: Result model instance
+    
+    Returns:
+        EmailOutbox or bool: See ``dispatch_email``; a queued entry is
+        only sent once the caller commits
     """
     candidate = result.candidate
     exam = result.exam
     admin_email = exam.creator.email
     
     subject = f"Assessment Completed: {candidate.name}"
+    body, html = EmailTemplate('admin_notification').render(
+        candidate_name=candidate.name,
+        candidate_email=candidate.email,
+        exam_title=exam.title,
+        score=result.score,
+        passed=result.passed,
+        has_open_ended=result_has_open_ended(result)
+    )
     
-    body = f"""
-    Hello,
-    
-    {candidate.name} ({candidate.email}) has completed the assessment: {exam.title}.
-    
-    Results:
-    Score: {result.score:.2f}%
-    Status: {"Passed" if result.passed else "Failed"}
-    
-    {"This assessment contains open-ended questions that require manual evaluation." if any(a.question.question_type == 'open_ended' for a in result.answers) else ""}
-    
-    Please log in to the admin panel to view the complete results.
-    """
-    
-    html = f"""
-    <html>
-      <body>
-        <p>Hello,</p>
-        <p><strong>{candidate.name}</strong> ({candidate.email}) has completed the assessment: <strong>{exam.title}</strong>.</p>
-        <h3>Results:</h3>
-        <p>Score: <strong>{result.score:.2f}%</strong></p>
-        <p>Status: <strong>{"Passed" if result.passed else "Failed"}</strong></p>
-        {f"<p><em>This assessment contains open-ended questions that require manual evaluation.</em></p>" if any(a.question.question_type == 'open_ended' for a in result.answers) else ""}
-        <p>Please log in to the admin panel to view the complete results.</p>
-      </body>
-    </html>
-    """
-    
-    return send_email(admin_email, subject, body, html) 
\ No newline at end of file
+    return dispatch_email(admin_email, subject, body, html,
+                          dedupe_key=f"admin-result:{result.id}")
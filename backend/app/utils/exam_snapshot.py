@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .. import db
+from ..models import get_model
+from .sqlite import read_intent
+
+class ExamSnapshot:
+    """
+    An exam's candidate-facing content, serialized once.
+
+    ``body`` is the JSON document (exam, questions and options, without
+    which option is correct) and ``gzipped`` the same bytes gzip-compressed
+    ahead of time, or None when pre-compression is disabled. Each encoding
+    has its own strong ETag derived from the content, so an unchanged exam
+    keeps its ETag across rebuilds and worker processes. ``choices`` maps
+    each question ID to its option IDs, for validating answers without a
+    query.
+    """
+    __slots__ = ('exam_id', 'body', 'gzipped', 'etag', 'gzip_etag', 'choices')
+
+    def __init__(self, exam_id, body, gzip_level=6, choices=None):
+        self.exam_id = exam_id
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        # mtime=0 keeps the compressed bytes identical between builds
+        self.gzipped = gzip.compress(body, compresslevel=gzip_level, mtime=0) if gzip_level else None
+        self.gzip_etag = self.etag + '-gzip'
+        self.choices = choices or {}
+
+
+class ExamSnapshotCache:
+    """
+    Thread-safe TTL + LRU cache of exam snapshots keyed by exam ID.
+
+    When many requests miss the same exam at once (the start of an exam
+    window), one of them builds the snapshot and the others wait for it
+    instead of running the same queries. Changes committed through the ORM
+    in this process invalidate the exam immediately; the TTL bounds how long
+    other worker processes (or bulk UPDATEs) can serve a stale copy.
+    """
+
+    def __init__(self, maxsize=128, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._question_exams = {}
+        self._generations = {}
+        self._building = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    def get(self, exam_id, build):
+        """
+        Return the snapshot of an exam, calling ``build(exam_id)`` on a miss.
+
+        Args:
+            exam_id (int): Exam ID
+            build (callable): Returns an ``ExamSnapshot``, or None if the
+                exam doesn't exist (which is not cached)
+
+        Returns:
+            ExamSnapshot: The snapshot, or None
+        """
+        snapshot = self._lookup(exam_id)
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            lock = self._building.setdefault(exam_id, threading.Lock())
+        with lock:
+            # Whoever held the lock may just have built it
+            snapshot = self._lookup(exam_id, count=False)
+            if snapshot is not None:
+                return snapshot
+            with self._lock:
+                generation = self._generations.get(exam_id, 0)
+            snapshot = build(exam_id)
+            if snapshot is not None:
+                self._store(snapshot, generation)
+        with self._lock:
+            if self._building.get(exam_id) is lock and not lock.locked():
+                del self._building[exam_id]
+        return snapshot
+
+    def _lookup(self, exam_id, count=True):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(exam_id)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    self._drop(exam_id)
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(exam_id)
+            if count:
+                self.hits += 1
+            return entry[1]
+
+    def _store(self, snapshot, generation):
+        with self._lock:
+            # An invalidation committed while the snapshot was being built
+            # means it may already be stale
+            if self._generations.get(snapshot.exam_id, 0) != generation:
+                return
+            self._drop(snapshot.exam_id)
+            self._entries[snapshot.exam_id] = (time.monotonic() + self.ttl, snapshot)
+            for question_id in snapshot.choices:
+                self._question_exams[question_id] = snapshot.exam_id
+            self.builds += 1
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, exam_id):
+        entry = self._entries.pop(exam_id, None)
+        if entry is not None:
+            for question_id in entry[1].choices:
+                self._question_exams.pop(question_id, None)
+
+    def invalidate(self, exam_ids=(), question_ids=()):
+        """Drop the snapshots of these exams and of the exams these questions belong to."""
+        with self._lock:
+            exam_ids = set(exam_ids)
+            exam_ids.update(self._question_exams[q] for q in question_ids if q in self._question_exams)
+            for exam_id in exam_ids:
+                self._generations[exam_id] = self._generations.get(exam_id, 0) + 1
+                self._drop(exam_id)
+
+    def clear(self):
+        with self._lock:
+            for exam_id in list(self._entries):
+                self._generations[exam_id] = self._generations.get(exam_id, 0) + 1
+            self._entries.clear()
+            self._question_exams.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'builds': self.builds}
+
+
+def get_snapshot_cache(app=None):
+    """Return the application's exam snapshot cache, creating it on first use."""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('exam_snapshots')
+    if cache is None:
+        cache = app.extensions.setdefault('exam_snapshots', ExamSnapshotCache(
+            maxsize=app.config.get('EXAM_SNAPSHOT_CACHE_SIZE', 128),
+            ttl=app.config.get('EXAM_SNAPSHOT_TTL', 60)
+        ))
+    return cache
+
+def _foreign_key(relationship):
+    """The mapped attribute name of a many-to-one relationship's foreign key column."""
+    column = next(iter(relationship.property.local_columns))
+    return relationship.property.parent.get_property_by_column(column).key
+
+def build_snapshot(exam_id):
+    """
+    Load an exam's questions and options in two queries and serialize them.
+
+    Returns:
+        ExamSnapshot: The snapshot, or None if the exam doesn't exist
+    """
+    Exam, Question, Option = get_model('Exam'), get_model('Question'), get_model('Option')
+    # A short-lived session on its own connection, so building on a cache
+    # miss neither reads in nor ends the caller's transaction
+    with read_intent(), Session(db.engine) as session:
+        exam = session.get(Exam, exam_id)
+        if exam is None:
+            return None
+
+        questions = session.execute(
+            db.select(Question.id, Question.text, Question.question_type, Question.points, Question.explanation)
+            .where(Question.exam == exam)
+            .order_by(Question.id)
+        ).all()
+        option_question = getattr(Option, _foreign_key(Option.question))
+        options = {}
+        for option_id, question_id, text in session.execute(
+            db.select(Option.id, option_question, Option.text)
+            .join(Option.question)
+            .where(Question.exam == exam)
+            .order_by(Option.id)
+        ):
+            options.setdefault(question_id, []).append({'id': option_id, 'text': text})
+
+        payload = {
+            'id': exam.id,
+            'title': exam.title,
+            'description': exam.description,
+            'duration_minutes': exam.duration_minutes,
+            'questions': [
+                {
+                    'id': question_id,
+                    'text': text,
+                    'question_type': question_type,
+                    'points': points,
+                    'explanation': explanation,
+                    'options': options.get(question_id, [])
+                }
+                for question_id, text, question_type, points, explanation in questions
+            ]
+        }
+
+    body = current_app.json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    choices = {row[0]: frozenset(option['id'] for option in options.get(row[0], ())) for row in questions}
+    return ExamSnapshot(exam_id, body, current_app.config.get('EXAM_SNAPSHOT_GZIP_LEVEL', 6), choices)
+
+def get_exam_snapshot(exam_id):
+    """Return the cached snapshot of an exam, building it on a miss (None if it doesn't exist)."""
+    return get_snapshot_cache().get(exam_id, build_snapshot)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_content_changes(session, flush_context):
+    """
+    Note which exams (or questions) the flushed Exam/Question/Option changes touch.
+
+    Runs after the flush so the foreign keys of rows attached through a
+    relationship (``Question(exam=exam)``, ``question.options.append(...)``)
+    are filled in; ``session.new``/``dirty``/``deleted`` still list them.
+    """
+    if not has_app_context() or 'exam_snapshots' not in current_app.extensions:
+        return
+    exam_ids, question_ids = session.info.setdefault('exam_snapshot_changes', (set(), set()))
+    for obj in chain(session.new, session.dirty, session.deleted):
+        name = type(obj).__name__
+        if name == 'Exam':
+            exam_ids.add(obj.id)
+        elif name == 'Question':
+            exam_ids.add(getattr(obj, _foreign_key(type(obj).exam)))
+            # Covers a question moved out of a cached exam
+            question_ids.add(obj.id)
+        elif name == 'Option':
+            question_ids.add(getattr(obj, _foreign_key(type(obj).question)))
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_snapshots(session):
+    changes = session.info.pop('exam_snapshot_changes', None)
+    if changes and has_app_context() and 'exam_snapshots' in current_app.extensions:
+        current_app.extensions['exam_snapshots'].invalidate(*changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_content_changes(session):
+    session.info.pop('exam_snapshot_changes', None)
@@ -1,12 +1,23 @@
 import csv
 import io
-import json
 from datetime import datetime
+from flask import Response, current_app, stream_with_context
+from sqlalchemy.orm import Query
+from ..models import get_model
+from .results import result_load_options
+
+# Header of the flat, one-row-per-answer CSV produced by stream_results_csv
+STREAM_CSV_HEADER = [
+    'Result ID', 'Exam Title', 'Candidate Name', 'Candidate Email', 'Date Completed',
+    'Score', 'Status', 'Question', 'Answer', 'Correct', 'Points Earned', 'Points Possible'
+]
 
 def export_to_csv(result):
     """
     Export a result to CSV format.
     
+    Load the result with ``load_result`` to avoid one lazy load per answer.
+    
     Args:
         result: Result model instance
     
@@ -34,13 +45,7 @@ def export_to_csv(result):
     
     for answer in result.answers:
         question = answer.question
-        
-        if question.question_type == 'multiple_choice':
-            answer_text = answer.selected_option.text if answer.selected_option else 'No answer'
-            is_correct = 'Yes' if answer.is_correct else 'No'
-        else:  # open_ended
-            answer_text = answer.text_response or 'No answer'
-            is_correct = 'N/A'
+        answer_text, is_correct = _answer_text(answer, question)
         
         writer.writerow([
             question.text,
@@ -62,11 +67,26 @@ def export_to_json(result):
     """
     Export a result to JSON format.
     
+    Load the result with ``load_result`` to avoid one lazy load per answer.
+    
+    Args:
+        result: Result model instance
+    
+    Returns:
+        str: Compact JSON data as a string
+    """
+    return current_app.json.dumps(result_to_dict(result), separators=(',', ':'))
+
+def result_to_dict(result):
+    """
+    Convert a result, its candidate, exam and answers to a dictionary.
+    
     Args:
         result: Result model instance
     
     Returns:
-        str: JSON data as a string
+        dict: The structure used by the JSON and NDJSON exports (datetimes
+        are left to the app's JSON provider)
     """
     data = {
         'exam': {
@@ -79,15 +99,15 @@ def export_to_json(result):
             'id': result.candidate.id,
             'name': result.candidate.name,
             'email': result.candidate.email,
-            'test_start_time': result.candidate.test_start_time.isoformat() if result.candidate.test_start_time else None,
-            'test_end_time': result.candidate.test_end_time.isoformat() if result.candidate.test_end_time else None
+            'test_start_time': result.candidate.test_start_time,
+            'test_end_time': result.candidate.test_end_time
         },
         'result': {
             'id': result.id,
             'score': result.score,
             'passed': result.passed,
             'feedback': result.feedback,
-            'created_at': result.created_at.isoformat()
+            'created_at': result.created_at
         },
         'answers': []
     }
@@ -122,4 +142,127 @@ def export_to_json(result):
         
         data['answers'].append(answer_data)
     
-    return json.dumps(data, indent=2) 
\ No newline at end of file
+    return data
+
+class _Echo:
+    """File-like object that hands back whatever is written to it."""
+    def write(self, value):
+        return value
+
+def _answer_text(answer, question):
+    if question.question_type == 'multiple_choice':
+        answer_text = answer.selected_option.text if answer.selected_option else 'No answer'
+        is_correct = 'Yes' if answer.is_correct else 'No'
+    else:  # open_ended
+        answer_text = answer.text_response or 'No answer'
+        is_correct = 'N/A'
+    return answer_text, is_correct
+
+def iter_results(results, batch_size=None):
+    """
+    Iterate over results in fixed-size batches with their related rows eager-loaded.
+    
+    Results are fetched with ``yield_per`` (a server-side cursor on
+    PostgreSQL), and each batch loads its candidates, exams, answers,
+    questions and selected options together (``result_load_options``), so
+    memory stays bounded by the batch size no matter how many results are
+    exported.
+    
+    Args:
+        results: An Exam model instance (all of its results) or a query of
+            Result model instances
+        batch_size (int, optional): Results per batch. Defaults to
+            ``EXPORT_BATCH_SIZE``.
+    
+    Yields:
+        Result model instances
+    """
+    batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 500)
+    
+    if isinstance(results, Query):
+        Result = results.column_descriptions[0]['entity']
+        query = results
+    else:
+        Result = get_model('Result')
+        query = Result.query.filter(Result.exam_id == results.id).order_by(Result.id)
+    
+    query = query.options(*result_load_options(Result))
+    
+    for result in query.yield_per(batch_size):
+        yield result
+
+def stream_results_csv(results, batch_size=None):
+    """
+    Export results as CSV, one row per answer, without building the document in memory.
+    
+    Args:
+        results: An Exam model instance or a query of Result model instances
+        batch_size (int, optional): Results fetched per batch
+    
+    Yields:
+        str: CSV lines, starting with the header
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(STREAM_CSV_HEADER)
+    
+    for result in iter_results(results, batch_size):
+        candidate = result.candidate
+        completed = candidate.test_end_time.strftime('%Y-%m-%d %H:%M:%S') if candidate.test_end_time else ''
+        result_columns = [
+            result.id,
+            result.exam.title,
+            candidate.name,
+            candidate.email,
+            completed,
+            f"{result.score:.2f}%",
+            "Passed" if result.passed else "Failed"
+        ]
+        
+        for answer in result.answers:
+            question = answer.question
+            answer_text, is_correct = _answer_text(answer, question)
+            yield writer.writerow(result_columns + [
+                question.text,
+                answer_text,
+                is_correct,
+                f"{answer.earned_points or 0:.2f}",
+                f"{question.points:.2f}"
+            ])
+
+def stream_results_ndjson(results, batch_size=None):
+    """
+    Export results as newline-delimited JSON, one record per result.
+    
+    Args:
+        results: An Exam model instance or a query of Result model instances
+        batch_size (int, optional): Results fetched per batch
+    
+    Yields:
+        str: One JSON document per line
+    """
+    dumps = current_app.json.dumps
+    for result in iter_results(results, batch_size):
+        yield dumps(result_to_dict(result), separators=(',', ':')) + '\n'
+
+def stream_results_response(results, export_format='csv', filename='results'):
+    """
+    Build a streaming Flask response for a results export.
+    
+    Args:
+        results: An Exam model instance or a query of Result model instances
+        export_format (str): ``csv`` or ``ndjson``
+        filename (str): Download name without extension
+    
+    Returns:
+        Response: Streaming response with a download disposition
+    """
+    if export_format == 'ndjson':
+        generator, mimetype = stream_results_ndjson(results), 'application/x-ndjson'
+    else:
+        generator, mimetype = stream_results_csv(results), 'text/csv'
+    
+    return Response(
+        stream_with_context(generator),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
\ No newline at end of file
@@ -0,0 +1,291 @@
+import logging
+import time
+from flask import current_app
+from .. import db
+from ..models import get_model
+from .stats import record_exam_stats
+
+logger = logging.getLogger(__name__)
+
+# Ids per ``... WHERE id IN (...)``; stays under SQLite's historical limit
+# of 999 bound parameters
+UPDATE_CHUNK_SIZE = 900
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _models():
+    Result = get_model('Result')
+    Answer = Result.answers.property.mapper.class_
+    return {
+        'Result': Result,
+        'Answer': Answer,
+        'Question': Answer.question.property.mapper.class_,
+        'Option': Answer.selected_option.property.mapper.class_
+    }
+
+def _answer_columns(models):
+    """Answer id, result id, question id, option id, is_correct and earned_points columns."""
+    Result, Answer = models['Result'], models['Answer']
+    # Foreign keys are read straight off the answers table, whatever the
+    # models call them
+    return (
+        Answer.id,
+        next(iter(Result.answers.property.remote_side)),
+        next(iter(Answer.question.property.local_columns)),
+        next(iter(Answer.selected_option.property.local_columns)),
+        Answer.is_correct,
+        Answer.earned_points
+    )
+
+
+class AnswerKey:
+    """
+    Points and correct options of every question of an exam.
+
+    A question is graded automatically when it has at least one correct
+    option; answers to other questions (e.g. open-ended) keep the points
+    they were given by hand.
+    """
+
+    def __init__(self, questions, correct_options):
+        self.points = {question_id: float(points or 0) for question_id, points in questions}
+        self.correct = set(correct_options)
+        self.auto = {question_id for _, question_id in self.correct}
+        self.possible = sum(self.points.values())
+
+    @classmethod
+    def load(cls, exam, models):
+        Question, Option = models['Question'], models['Option']
+        questions = db.session.execute(
+            db.select(Question.id, Question.points).where(Question.exam == exam).order_by(Question.id)
+        ).all()
+        correct_options = db.session.execute(
+            db.select(Option.id, Question.id)
+            .join(Option.question)
+            .where(Question.exam == exam, Option.is_correct.is_(True))
+        ).all()
+        return cls(questions, correct_options)
+
+
+def _score(earned, possible):
+    return round(earned / possible * 100, 2) if possible else 0.0
+
+def _grade_chunk_python(key, answers, results, passing_score):
+    """Reference implementation of ``_grade_chunk_numpy`` for installs without NumPy."""
+    answer_updates = {}
+    totals = {result_id: 0.0 for result_id, _, _ in results}
+    for answer_id, result_id, question_id, option_id, is_correct, earned in answers:
+        if result_id not in totals:
+            continue
+        if question_id in key.auto:
+            correct = (option_id, question_id) in key.correct
+            points = key.points[question_id] if correct else 0.0
+            if is_correct is None or bool(is_correct) != correct or earned != points:
+                answer_updates.setdefault((correct, points), []).append(answer_id)
+            earned = points
+        totals[result_id] += earned or 0.0
+
+    result_updates = {}
+    for result_id, score, passed in results:
+        new_score = _score(totals[result_id], key.possible)
+        new_passed = new_score >= passing_score
+        if score is None or abs(score - new_score) > 1e-9 or passed is None or bool(passed) != new_passed:
+            result_updates.setdefault((new_score, new_passed), []).append(result_id)
+    return answer_updates, result_updates
+
+def _group_ids(np, ids, columns, types):
+    # Answers only take a few distinct (is_correct, points) values and
+    # results a few distinct scores, so ids are grouped by their new values:
+    # each row gets one integer code for its combination of values
+    if not len(ids):
+        return {}
+    codes = np.zeros(len(ids), dtype=np.int64)
+    uniques = []
+    for column in columns:
+        values, inverse = np.unique(column, return_inverse=True)
+        codes = codes * len(values) + inverse.reshape(-1)
+        uniques.append(values.tolist())
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    bounds = [0] + (np.flatnonzero(np.diff(codes)) + 1).tolist() + [len(codes)]
+
+    groups = {}
+    for start, end in zip(bounds, bounds[1:]):
+        code, key = int(codes[start]), []
+        for values in reversed(uniques):
+            code, index = divmod(code, len(values))
+            key.append(values[index])
+        groups[tuple(cast(value) for cast, value in zip(types, reversed(key)))] = ids[order[start:end]].tolist()
+    return groups
+
+def _grade_chunk_numpy(np, key, answers, results, passing_score):
+    """
+    Grade a batch of results with array operations.
+
+    Every answer is checked against the key in one ``isin`` call on packed
+    ``(question_id, option_id)`` pairs and summed per result with
+    ``bincount``; only answers and results whose stored values differ are
+    returned, grouped by their new values.
+    """
+    # A sentinel question keeps the lookups valid for an empty key
+    key_questions = np.array(sorted(key.points) or [-1], dtype=np.int64)
+    key_points = np.array([key.points.get(q, 0.0) for q in key_questions.tolist()])
+    key_auto = np.array([q in key.auto for q in key_questions.tolist()], dtype=bool)
+    correct_pairs = np.array([(q << 32) | o for o, q in key.correct], dtype=np.int64)
+
+    # One conversion of all rows (from plain tuples: NumPy reads Row objects
+    # element by element, many times slower). None becomes NaN, which
+    # compares unequal to everything, so ungraded answers and results
+    # always count as changed
+    rows = np.array(list(map(tuple, results)), dtype=np.float64).reshape(-1, 3)
+    result_ids = rows[:, 0].astype(np.int64)
+    old_scores, old_passed = rows[:, 1], rows[:, 2]
+
+    rows = np.array(list(map(tuple, answers)), dtype=np.float64).reshape(-1, 6)
+    answer_ids = rows[:, 0].astype(np.int64)
+    answer_results = rows[:, 1].astype(np.int64)
+    question_ids = rows[:, 2].astype(np.int64)
+    option_ids = np.nan_to_num(rows[:, 3]).astype(np.int64)
+    is_correct, earned = rows[:, 4], rows[:, 5]
+
+    # Answers whose result isn't in the batch don't count (as in the Python version)
+    result_position = np.minimum(np.searchsorted(result_ids, answer_results), len(result_ids) - 1)
+    in_batch = result_ids[result_position] == answer_results
+
+    position = np.minimum(np.searchsorted(key_questions, question_ids), len(key_questions) - 1)
+    auto = (key_questions[position] == question_ids) & key_auto[position]
+    correct = np.isin((question_ids << 32) | option_ids, correct_pairs)
+    new_earned = np.where(auto, np.where(correct, key_points[position], 0.0), np.nan_to_num(earned))
+
+    changed = in_batch & auto & ((is_correct != correct) | (earned != new_earned))
+    answer_updates = _group_ids(np, answer_ids[changed], (correct[changed], new_earned[changed]), (bool, float))
+
+    totals = np.bincount(result_position[in_batch], weights=new_earned[in_batch], minlength=len(result_ids))
+    scores = np.round(totals / key.possible * 100, 2) if key.possible else np.zeros(len(result_ids))
+    passed = scores >= passing_score
+
+    changed = ~np.isclose(old_scores, scores) | (old_passed != passed)
+    result_updates = _group_ids(np, result_ids[changed], (scores[changed], passed[changed]), (float, bool))
+    return answer_updates, result_updates
+
+def _write(model, columns, updates):
+    """Apply ``{values: [ids]}`` updates as one ``UPDATE ... WHERE id IN`` per group."""
+    count = 0
+    for values, ids in updates.items():
+        for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+            db.session.execute(
+                db.update(model)
+                .where(model.id.in_(ids[start:start + UPDATE_CHUNK_SIZE]))
+                .values(dict(zip(columns, values)))
+                .execution_options(synchronize_session=False)
+            )
+        count += len(ids)
+    return count
+
+def _record_score_changes(exam_id, results, updates):
+    """Record how re-scored results change the exam's graded/passed/score totals."""
+    old = {result_id: (score, passed) for result_id, score, passed in results}
+    graded = passed_count = 0
+    score_total = 0.0
+    for (score, passed), ids in updates.items():
+        for result_id in ids:
+            old_score, old_passed = old[result_id]
+            graded += old_score is None
+            passed_count += bool(passed) - bool(old_passed)
+            score_total += float(score) - (old_score or 0)
+    record_exam_stats(exam_id, graded=graded, passed=passed_count, score_total=score_total)
+
+def grade_exam(exam, result_ids=None, batch_size=None, vectorized=None):
+    """
+    Score every (or the given) result of an exam against its current answer key.
+
+    Multiple-choice answers get ``is_correct`` and ``earned_points`` from the
+    key; other answers keep their hand-given points. Each result's ``score``
+    is its earned points as a percentage of the exam's total points and
+    ``passed`` compares that with ``exam.passing_score``. Run it again after
+    correcting the key to re-grade the whole exam.
+
+    Results are processed in batches: the answers of a batch are read by
+    their ``answers.result_id`` (no joins), graded with NumPy (or plain
+    Python when NumPy isn't installed), and only rows whose values changed
+    are written back, one transaction per batch. Changed rows are grouped by
+    their new values, so a batch is written with a handful of
+    ``UPDATE ... WHERE id IN (...)`` statements rather than one per row.
+    Each batch also updates the exam's stats rollup in its transaction.
+
+    Args:
+        exam: Exam model instance
+        result_ids (list, optional): Only grade these results
+        batch_size (int, optional): Results per batch. Defaults to
+            ``GRADING_BATCH_SIZE``.
+        vectorized (bool, optional): Force the NumPy (True) or pure-Python
+            (False) implementation. Defaults to NumPy when it is installed.
+
+    Returns:
+        dict: Counts of results and answers graded and updated, and the
+        elapsed seconds
+
+    Raises:
+        RuntimeError: If ``vectorized`` is True and NumPy is not installed
+    """
+    started = time.perf_counter()
+    np = _numpy() if vectorized is not False else None
+    if vectorized and np is None:
+        raise RuntimeError("Vectorized grading requires numpy (pip install numpy)")
+    batch_size = batch_size or current_app.config.get('GRADING_BATCH_SIZE', 2000)
+
+    models = _models()
+    Result, Answer = models['Result'], models['Answer']
+    # The exam expires with the first commit below
+    exam_id = exam.id
+    key = AnswerKey.load(exam, models)
+    passing_score = exam.passing_score if exam.passing_score is not None else 0
+
+    query = db.select(Result.id, Result.score, Result.passed).where(Result.exam == exam).order_by(Result.id)
+    if result_ids is not None:
+        query = query.where(Result.id.in_(result_ids))
+    results = db.session.execute(query).all()
+
+    answer_columns = _answer_columns(models)
+    summary = {'results': len(results), 'answers': 0, 'results_updated': 0, 'answers_updated': 0,
+               'vectorized': np is not None}
+    for start in range(0, len(results), batch_size):
+        batch = results[start:start + batch_size]
+        # Plain column rows: the session's connection skips the ORM result
+        # layer, which costs more than the grading itself
+        batch_ids = [row[0] for row in batch]
+        answers = []
+        for chunk in range(0, len(batch_ids), UPDATE_CHUNK_SIZE):
+            answers += db.session.connection().execute(
+                db.select(*answer_columns)
+                .where(answer_columns[1].in_(batch_ids[chunk:chunk + UPDATE_CHUNK_SIZE]))
+            ).all()
+        # End the read transaction before computing so the write below
+        # starts its own (short) one
+        db.session.commit()
+
+        if np is not None:
+            answer_updates, result_updates = _grade_chunk_numpy(np, key, answers, batch, passing_score)
+        else:
+            answer_updates, result_updates = _grade_chunk_python(key, answers, batch, passing_score)
+
+        summary['answers_updated'] += _write(Answer, ('is_correct', 'earned_points'), answer_updates)
+        summary['results_updated'] += _write(Result, ('score', 'passed'), result_updates)
+        if result_updates:
+            _record_score_changes(exam_id, batch, result_updates)
+        db.session.commit()
+        summary['answers'] += len(answers)
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    logger.info("Graded exam %s: %d results, %d answers updated in %.2fs",
+                exam_id, summary['results'], summary['answers_updated'], summary['seconds'])
+    return summary
+
+def grade_result(result):
+    """Score a single submitted result; see ``grade_exam``."""
+    return grade_exam(result.exam, result_ids=[result.id])
@@ -0,0 +1,130 @@
+import logging
+import platform
+import threading
+import time
+import flask
+import sqlalchemy
+from flask import current_app
+from .. import db
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """
+    Cached health and diagnostics data for the application.
+
+    Static facts (interpreter, platform, library and database versions) are
+    collected once. Database connectivity and application stats are
+    refreshed by a daemon thread every ``interval`` seconds, so health
+    endpoints only read memory and never wait on the database.
+    """
+
+    def __init__(self, app, interval=30):
+        self.app = app
+        self.interval = interval
+        self.static = {
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'flask_version': flask.__version__,
+            'sqlalchemy_version': sqlalchemy.__version__
+        }
+        self.database = {'connected': False, 'type': None, 'version': None}
+        self.stats = {'users': None}
+        self.refreshed_at = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _database_version(self, db_type):
+        if db_type == 'sqlite':
+            return f"SQLite {db.session.execute(db.text('SELECT sqlite_version()')).scalar()}"
+        if db_type == 'postgresql':
+            return f"PostgreSQL {db.session.execute(db.text('SHOW server_version')).scalar()}"
+        if db_type == 'mysql':
+            return f"MySQL {db.session.execute(db.text('SELECT VERSION()')).scalar()}"
+        return None
+
+    def refresh(self):
+        """Check the database connection and recount application stats."""
+        with self.app.app_context():
+            database = dict(self.database)
+            stats = dict(self.stats)
+            try:
+                db.session.execute(db.text('SELECT 1'))
+                if database['version'] is None:
+                    database['type'] = db.session.get_bind().dialect.name
+                    database['version'] = self._database_version(database['type'])
+                stats['users'] = db.session.execute(
+                    db.select(db.func.count()).select_from(User)
+                ).scalar()
+                database['connected'] = True
+            except Exception as e:
+                database['connected'] = False
+                logger.warning("Health check database error: %s", e)
+            finally:
+                db.session.remove()
+
+        with self._lock:
+            self.database = database
+            self.stats = stats
+            self.refreshed_at = time.time()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        """
+        Start the refresh thread unless it is already running in this process.
+
+        The first refresh runs synchronously so the cache is never served empty.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.refresh()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def snapshot(self):
+        """
+        Return the cached system information.
+
+        Returns:
+            dict: Static facts, the last database check and stats, plus
+            ``stale_seconds`` since the last refresh (None before the first one)
+        """
+        with self._lock:
+            age = None if self.refreshed_at is None else round(time.time() - self.refreshed_at, 3)
+            return {
+                **self.static,
+                'database': dict(self.database),
+                'stats': dict(self.stats),
+                'stale_seconds': age
+            }
+
+
+def get_health_monitor(app=None):
+    """
+    Return the application's health monitor, creating it on first use.
+
+    The refresh thread is started on first use rather than in create_app so
+    each gunicorn worker runs its own thread after forking.
+    """
+    app = app or current_app._get_current_object()
+    monitor = app.extensions.get('health_monitor')
+    if monitor is None:
+        monitor = app.extensions.setdefault('health_monitor', HealthMonitor(
+            app, interval=app.config.get('HEALTH_REFRESH_INTERVAL', 30)
+        ))
+    monitor.start()
+    return monitor
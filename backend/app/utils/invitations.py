@@ -0,0 +1,121 @@
+from datetime import datetime
+from string import Formatter
+from flask import current_app
+from .. import db
+from ..models import get_model
+from .email import InvitationTemplate, send_email
+from .outbox import enqueue_emails
+from .stats import record_activity, record_exam_stats
+
+# Placeholders an exam link may use
+URL_TEMPLATE_FIELDS = ('candidate_id', 'exam_id')
+
+def check_exam_url_template(template):
+    """
+    Check that an exam link format only uses ``{candidate_id}`` and ``{exam_id}``.
+
+    Raises:
+        ValueError: If the template has other (or positional) placeholders,
+            or doesn't format
+    """
+    try:
+        fields = {field for _, field, _, _ in Formatter().parse(template) if field is not None}
+    except ValueError as e:
+        raise ValueError(f"Invalid exam URL template: {e}")
+    unknown = fields - set(URL_TEMPLATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown placeholders in exam URL template: {', '.join(sorted(unknown))} "
+                         f"(use {{candidate_id}} and {{exam_id}})")
+    try:
+        template.format(candidate_id=1, exam_id=1)
+    except ValueError as e:
+        raise ValueError(f"Invalid exam URL template: {e}")
+
+def invite_cohort(exam, candidate_ids=None, exam_url_template=None, resend=False, batch_size=None):
+    """
+    Invite a cohort of candidates to an exam, yielding progress after each batch.
+
+    Candidates are loaded with a single query (only the columns the email
+    needs), the invitation is rendered once for the exam, and each batch is
+    written with one multi-row outbox INSERT plus one UPDATE of
+    ``invitation_sent``/``last_invited_at``, committed together with the
+    exam's invitation counters.
+
+    Args:
+        exam: Exam model instance
+        candidate_ids (list, optional): Candidates to invite. Defaults to all
+            candidates of the exam.
+        exam_url_template (str, optional): Link format with ``{candidate_id}``
+            (and optionally ``{exam_id}``) placeholders. Defaults to
+            ``EXAM_URL_TEMPLATE``.
+        resend (bool): Also invite candidates that were already invited
+        batch_size (int, optional): Candidates per batch. Defaults to
+            ``INVITATION_BATCH_SIZE``.
+
+    Yields:
+        dict: Progress with ``total``, ``processed``, ``invited``, ``failed``
+        and ``done`` keys
+    """
+    Candidate = get_model('Candidate')
+    config = current_app.config
+    exam_url_template = exam_url_template or config['EXAM_URL_TEMPLATE']
+    batch_size = batch_size or config.get('INVITATION_BATCH_SIZE', 500)
+    use_outbox = config.get('MAIL_USE_OUTBOX', True)
+
+    exam_id = exam.id
+    query = (db.select(Candidate.id, Candidate.name, Candidate.email, Candidate.invitation_sent)
+             .where(Candidate.exam_id == exam_id))
+    if candidate_ids is not None:
+        query = query.where(Candidate.id.in_(candidate_ids))
+    if not resend:
+        query = query.where(db.or_(Candidate.invitation_sent.is_(None),
+                                   Candidate.invitation_sent.is_(False)))
+    candidates = db.session.execute(query.order_by(Candidate.id)).all()
+    # End the read transaction so each batch starts a fresh write transaction
+    db.session.commit()
+
+    template = InvitationTemplate(exam)
+    progress = {
+        'exam_id': exam_id,
+        'total': len(candidates),
+        'processed': 0,
+        'invited': 0,
+        'failed': 0,
+        'done': False
+    }
+
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        messages = []
+        invited_ids = []
+        first_invitations = 0
+
+        for candidate_id, name, email, already_invited in batch:
+            body, html = template.render(name, exam_url_template.format(candidate_id=candidate_id, exam_id=exam_id))
+            if use_outbox:
+                messages.append({'recipient': email, 'subject': template.subject,
+                                 'body': body, 'html': html})
+            elif not send_email(email, template.subject, body, html):
+                progress['failed'] += 1
+                continue
+            invited_ids.append(candidate_id)
+            first_invitations += not already_invited
+
+        enqueue_emails(messages)
+        if invited_ids:
+            db.session.execute(
+                db.update(Candidate)
+                .where(Candidate.id.in_(invited_ids))
+                .values(invitation_sent=True, last_invited_at=datetime.utcnow()),
+                execution_options={'synchronize_session': False}
+            )
+            record_exam_stats(exam_id, invited=first_invitations)
+            record_activity(invited=len(invited_ids))
+        db.session.commit()
+
+        progress['processed'] += len(batch)
+        progress['invited'] += len(invited_ids)
+        yield dict(progress)
+
+    progress['done'] = True
+    yield progress
@@ -0,0 +1,94 @@
+import logging
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    """
+    The stdlib JSON provider, with datetimes and dates as ISO 8601 strings.
+
+    Flask's default writes them as HTTP dates; ISO 8601 is what ``to_dict()``
+    used to produce by hand, so models can return datetimes as they are.
+    flask-jwt-extended encodes custom claims with this class's ``default``
+    too.
+    """
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(AppJSONProvider):
+    """
+    JSON provider backed by orjson.
+
+    Output matches ``AppJSONProvider`` (orjson writes datetimes in ISO 8601
+    natively) except that non-ASCII text is emitted as UTF-8 instead of
+    ``\\u`` escapes. Calls with options orjson doesn't support, and values
+    it can't encode (e.g. integers over 64 bits), use the stdlib encoder.
+    """
+    _ORJSON_KWARGS = frozenset(('default', 'ensure_ascii', 'sort_keys', 'indent', 'separators'))
+
+    def _option(self, sort_keys, indent):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if not self._ORJSON_KWARGS.issuperset(kwargs):
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(
+                obj, default=kwargs.get('default', self.default),
+                option=self._option(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+            ).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._option(self.sort_keys, indent))
+        except orjson.JSONEncodeError:
+            return super().response(obj)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app):
+    """
+    Install the JSON provider selected by ``JSON_PROVIDER``.
+
+    ``auto`` (the default) uses orjson when it is installed and the stdlib
+    otherwise; ``orjson`` requires it; ``json`` always uses the stdlib.
+
+    Raises:
+        RuntimeError: If ``JSON_PROVIDER`` is ``orjson`` and orjson is not installed
+    """
+    choice = app.config.get('JSON_PROVIDER', 'auto')
+    if choice not in ('auto', 'orjson', 'json'):
+        raise ValueError(f"Unknown JSON_PROVIDER: {choice}")
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson requires orjson (pip install orjson)")
+
+    provider_class = OrjsonProvider if choice != 'json' and orjson is not None else AppJSONProvider
+    app.json_provider_class = provider_class
+    app.json = provider_class(app)
+    logger.debug("Using %s", provider_class.__name__)
@@ -0,0 +1,53 @@
+import json
+import logging
+import time
+
+# Attributes every LogRecord has; anything else on a record came from ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as one JSON object per line.
+
+    The message is only interpolated when a record is actually emitted, so
+    callers should keep passing ``%``-style arguments rather than
+    pre-formatted strings. Fields passed with ``extra=`` become top-level
+    keys.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + '.%03dZ' % record.msecs,
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(config):
+    """
+    Configure the root logger from ``LOG_LEVEL`` and ``LOG_FORMAT`` (``text`` or ``json``).
+
+    Like ``logging.basicConfig`` this is a no-op when the process has
+    already configured logging (e.g. a test runner or a second app).
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler()
+    if config.get('LOG_FORMAT', 'text') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
@@ -0,0 +1,363 @@
+import bisect
+import logging
+import random
+import threading
+import time
+from weakref import WeakKeyDictionary
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('app.access')
+
+# Bucket upper bounds; the +Inf bucket is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram with one series per label tuple.
+
+    An observation is a bisect and three integer/float updates under a lock,
+    so recording on every request and every query is cheap.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        """Yield ``(suffix, labels, value)`` in Prometheus histogram form."""
+        with self._lock:
+            series = {labels: (list(counts), total, count)
+                      for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield '_bucket', dict(base, le=_format_value(bound)), cumulative
+            yield '_sum', base, total
+            yield '_count', base, count
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter with one series per label tuple."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            series = dict(self._series)
+        for labels, value in sorted(series.items()):
+            yield '', dict(zip(self.labelnames, labels)), value
+
+
+class Metrics:
+    """
+    Per-application metrics: request latency, DB queries per request and SMTP time.
+
+    Gauges for the connection pool, SMTP pool, rate limiter and user cache
+    are read from those components when ``/metrics`` is scraped rather than
+    being updated on every request.
+    """
+
+    def __init__(self):
+        self.requests = Counter(
+            'http_requests_total', 'HTTP requests by endpoint and status.',
+            ('method', 'endpoint', 'status'))
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Request latency, including streamed bodies.',
+            ('method', 'endpoint'))
+        self.request_queries = Histogram(
+            'http_request_db_queries', 'Database queries issued per request.',
+            ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.request_db_time = Histogram(
+            'http_request_db_seconds', 'Time spent in database queries per request.',
+            ('endpoint',))
+        self.query_duration = Histogram(
+            'db_query_duration_seconds', 'Latency of individual database queries.')
+        self.smtp_duration = Histogram(
+            'smtp_send_duration_seconds', 'Time to hand one message to the SMTP server.',
+            ('outcome',))
+
+    def collectors(self):
+        return (self.requests, self.request_duration, self.request_queries,
+                self.request_db_time, self.query_duration, self.smtp_duration)
+
+
+def get_metrics(app=None):
+    """Return the application's metrics registry, creating it on first use."""
+    app = app or current_app._get_current_object()
+    metrics = app.extensions.get('metrics')
+    if metrics is None:
+        metrics = app.extensions.setdefault('metrics', Metrics())
+    return metrics
+
+class RequestTiming:
+    """Counters for the request in flight, kept in a single ``g`` slot."""
+
+    __slots__ = ('started', 'status', 'queries', 'db_seconds', 'smtp_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.status = 500
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.smtp_seconds = 0.0
+
+
+def _current_timing():
+    return g.get('_request_timing') if has_request_context() else None
+
+def observe_smtp(seconds, outcome):
+    """Record one SMTP send; a no-op outside an app context or with metrics disabled."""
+    if not has_app_context() or 'metrics' not in current_app.extensions:
+        return
+    current_app.extensions['metrics'].smtp_duration.observe(seconds, outcome)
+    timing = _current_timing()
+    if timing is not None:
+        timing.smtp_seconds += seconds
+
+
+def _before_request():
+    g._request_timing = RequestTiming()
+
+def _after_request(response):
+    timing = g.get('_request_timing')
+    if timing is not None:
+        timing.status = response.status_code
+    return response
+
+def _teardown_request(exc):
+    # Runs once the response body has been sent, so streamed responses are
+    # timed in full
+    timing = g.pop('_request_timing', None)
+    if timing is None:
+        return
+    elapsed = time.perf_counter() - timing.started
+    # GeneratorExit means the client stopped reading a streamed body
+    status = timing.status if exc is None or isinstance(exc, GeneratorExit) else 500
+
+    req = request._get_current_object()
+    app = current_app._get_current_object()
+    # The URL rule keeps label cardinality bounded (no IDs, no 404 paths)
+    endpoint = req.url_rule.rule if req.url_rule is not None else 'unmatched'
+
+    metrics = app.extensions['metrics']
+    metrics.requests.inc(req.method, endpoint, str(status))
+    metrics.request_duration.observe(elapsed, req.method, endpoint)
+    metrics.request_queries.observe(timing.queries, endpoint)
+    metrics.request_db_time.observe(timing.db_seconds, endpoint)
+
+    config = app.config
+    slow = elapsed * 1000 >= config.get('LOG_SLOW_REQUEST_MS', 1000)
+    if status >= 500 or slow or random.random() < config.get('LOG_SAMPLE_RATE', 0.0):
+        access_logger.log(
+            logging.WARNING if status >= 500 or slow else logging.INFO,
+            '%s %s %s %.1fms queries=%d',
+            req.method, req.path, status, elapsed * 1000, timing.queries,
+            extra={
+                'method': req.method,
+                'path': req.path,
+                'endpoint': endpoint,
+                'status': status,
+                'duration_ms': round(elapsed * 1000, 2),
+                'db_queries': timing.queries,
+                'db_ms': round(timing.db_seconds * 1000, 2),
+                'smtp_ms': round(timing.smtp_seconds * 1000, 2),
+            }
+        )
+
+# Engine -> callbacks run with (statement, seconds) after every statement
+_query_listeners = WeakKeyDictionary()
+
+def add_query_listener(engine, callback):
+    """
+    Call ``callback(statement, seconds)`` after every statement run on ``engine``.
+
+    Statements are timed once by a single pair of cursor events, however
+    many listeners (metrics, the SQL profiler) are registered.
+    """
+    listeners = _query_listeners.get(engine)
+    if listeners is None:
+        listeners = _query_listeners[engine] = []
+        _instrument_engine(engine, listeners)
+    listeners.append(callback)
+
+def _instrument_engine(engine, listeners):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        for callback in listeners:
+            callback(statement, elapsed)
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed_query(context):
+        # after_cursor_execute is skipped for failed statements
+        if context.connection is not None:
+            started = context.connection.info.get('query_started')
+            if started:
+                started.pop()
+
+def _query_observer(metrics):
+    def observe_query(statement, seconds):
+        metrics.query_duration.observe(seconds)
+        timing = _current_timing()
+        if timing is not None:
+            timing.queries += 1
+            timing.db_seconds += seconds
+    return observe_query
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_sample(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f'{name}{{{label_text}}} {_format_value(value)}'
+    return f'{name} {_format_value(value)}'
+
+def _gauges(app):
+    """Yield ``(name, type, help, [(labels, value)])`` for the app's pools and caches."""
+    from .. import db
+    from .db_pool import pool_stats
+
+    with app.app_context():
+        stats = pool_stats(db.engine)
+    if 'checked_out' in stats:
+        yield 'db_pool_checked_out', 'gauge', 'Connections currently checked out.', [({}, stats['checked_out'])]
+        yield 'db_pool_overflow', 'gauge', 'Overflow connections currently open.', [({}, stats['overflow'])]
+    if 'checkouts' in stats:
+        yield 'db_pool_checkouts_total', 'counter', 'Connection checkouts.', [({}, stats['checkouts'])]
+        yield 'db_pool_timeouts_total', 'counter', 'Checkouts that timed out.', [({}, stats['timeouts'])]
+        yield 'db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection.', [({}, stats['wait_seconds_total'])]
+
+    smtp_pool = app.extensions.get('smtp_pool')
+    if smtp_pool is not None:
+        smtp = smtp_pool.stats()
+        yield 'smtp_messages_sent_total', 'counter', 'Messages delivered over pooled sessions.', [({}, smtp['messages_sent'])]
+        yield 'smtp_failures_total', 'counter', 'Failed SMTP sends.', [({}, smtp['failures'])]
+        yield 'smtp_handshakes_total', 'counter', 'SMTP connections opened.', [({}, smtp['handshakes'])]
+
+    limiter = app.extensions.get('rate_limiter')
+    if limiter is not None:
+        limits = limiter.stats()
+        yield 'ratelimit_allowed_total', 'counter', 'Requests allowed by the rate limiter.', \
+            [({'scope': scope}, count) for scope, count in sorted(limits['allowed'].items())]
+        yield 'ratelimit_rejected_total', 'counter', 'Requests rejected by the rate limiter.', \
+            [({'scope': scope}, count) for scope, count in sorted(limits['rejected'].items())]
+
+    revocations = app.extensions.get('token_revocations')
+    if revocations is not None:
+        revoked = revocations.stats()
+        yield 'jwt_revoked_tokens', 'gauge', 'Revoked token IDs in the Bloom filter.', [({}, revoked['revoked_tokens'])]
+        yield 'jwt_revocation_bloom_hits_total', 'counter', 'Tokens checked against the database after a filter hit.', \
+            [({}, revoked['bloom_hits'])]
+        yield 'jwt_revoked_rejections_total', 'counter', 'Requests rejected with a revoked token.', [({}, revoked['revoked_hits'])]
+
+    user_cache = app.extensions.get('user_cache')
+    if user_cache is not None:
+        cache = user_cache.stats()
+        yield 'user_cache_hits_total', 'counter', 'User cache hits.', [({}, cache['hits'])]
+        yield 'user_cache_misses_total', 'counter', 'User cache misses.', [({}, cache['misses'])]
+        yield 'user_cache_size', 'gauge', 'Users currently cached.', [({}, cache['size'])]
+
+    snapshots = app.extensions.get('exam_snapshots')
+    if snapshots is not None:
+        cache = snapshots.stats()
+        yield 'exam_snapshot_hits_total', 'counter', 'Exam content served from the snapshot cache.', [({}, cache['hits'])]
+        yield 'exam_snapshot_misses_total', 'counter', 'Exam snapshot cache misses.', [({}, cache['misses'])]
+        yield 'exam_snapshot_builds_total', 'counter', 'Exam snapshots built.', [({}, cache['builds'])]
+        yield 'exam_snapshot_size', 'gauge', 'Exam snapshots currently cached.', [({}, cache['size'])]
+
+    autosave = app.extensions.get('autosave_buffer')
+    if autosave is not None:
+        buffered = autosave.stats()
+        yield 'autosave_saves_total', 'counter', 'Answers autosaved.', [({}, buffered['saves'])]
+        yield 'autosave_coalesced_total', 'counter', 'Autosaves that replaced a pending save.', [({}, buffered['coalesced'])]
+        yield 'autosave_rows_written_total', 'counter', 'Autosaved answers written to the database.', \
+            [({}, buffered['rows_written'])]
+        yield 'autosave_flush_failures_total', 'counter', 'Failed autosave flushes.', [({}, buffered['failures'])]
+        yield 'autosave_pending', 'gauge', 'Autosaved answers waiting to be written.', [({}, buffered['pending'])]
+
+def render_prometheus(app=None):
+    """
+    Render the application's metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: Metrics text (``text/plain; version=0.0.4``)
+    """
+    app = app or current_app._get_current_object()
+    metrics = get_metrics(app)
+    lines = []
+    for collector in metrics.collectors():
+        kind = 'histogram' if isinstance(collector, Histogram) else 'counter'
+        lines.append(f'# HELP {collector.name} {collector.documentation}')
+        lines.append(f'# TYPE {collector.name} {kind}')
+        lines.extend(_format_sample(collector.name + suffix, labels, value)
+                     for suffix, labels, value in collector.samples())
+
+    try:
+        gauges = list(_gauges(app))
+    except Exception:
+        logger.exception("Failed to collect pool and cache gauges")
+        gauges = []
+    for name, kind, documentation, samples in gauges:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(_format_sample(name, labels, value) for labels, value in samples)
+    return '\n'.join(lines) + '\n'
+
+def metrics_view():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def init_metrics(app, engine):
+    """
+    Register request, query and SMTP instrumentation and the ``/metrics`` endpoint.
+
+    Args:
+        app: Flask application
+        engine: The application's SQLAlchemy engine
+    """
+    metrics = get_metrics(app)
+    add_query_listener(engine, _query_observer(metrics))
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', metrics_view)
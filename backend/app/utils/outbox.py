@@ -0,0 +1,228 @@
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from .. import db
+from ..models.email_outbox import EmailOutbox
+from .email import deliver_email
+from .sqlite import write_intent
+
+logger = logging.getLogger(__name__)
+
+def enqueue_email(recipient, subject, body, html=None, dedupe_key=None):
+    """
+    Queue an email for background delivery.
+
+    The entry is added to the current transaction; the caller commits, so
+    the email is only queued if the caller's own changes are saved too.
+
+    Args:
+        recipient (str): Email address of the recipient
+        subject (str): Subject of the email
+        body (str): Plain text body of the email
+        html (str, optional): HTML body of the email
+        dedupe_key (str, optional): Key identifying this logical message.
+            Queuing a second message with the same key returns the existing
+            entry instead of sending twice.
+
+    Returns:
+        EmailOutbox: The queued (or previously queued) outbox entry
+
+    Raises:
+        IntegrityError: If the entry can't be inserted for another reason
+            than a duplicate ``dedupe_key``
+    """
+    if dedupe_key:
+        existing = EmailOutbox.query.filter_by(dedupe_key=dedupe_key).first()
+        if existing:
+            return existing
+
+    message = EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        html=html,
+        dedupe_key=dedupe_key
+    )
+    try:
+        # A savepoint, so a duplicate only undoes this INSERT and not the
+        # caller's other pending changes
+        with db.session.begin_nested():
+            db.session.add(message)
+    except IntegrityError:
+        # Only a duplicate key means another worker queued the same message
+        # concurrently; anything else (e.g. a missing recipient) is an error
+        if not dedupe_key:
+            raise
+        existing = EmailOutbox.query.filter_by(dedupe_key=dedupe_key).first()
+        if existing is None:
+            raise
+        return existing
+
+    return message
+
+def enqueue_emails(messages):
+    """
+    Queue many emails with a single multi-row INSERT.
+
+    The rows are added to the current transaction; the caller commits, so
+    the outbox entries are persisted atomically with whatever else the
+    caller writes (e.g. invitation flags).
+
+    Args:
+        messages (list): Dicts with ``recipient``, ``subject``, ``body`` and
+            optionally ``html`` keys
+    """
+    if messages:
+        db.session.execute(db.insert(EmailOutbox), messages)
+
+
+class OutboxWorker:
+    """
+    Drains the email outbox with a pool of delivery threads.
+
+    Messages are claimed with a conditional UPDATE so several workers (or
+    worker processes) can drain the same table without sending a message
+    twice. Failed deliveries are retried with exponential backoff until
+    ``max_attempts`` is reached, after which the message is marked failed.
+    A message left in ``sending`` by a crashed worker is reclaimed once its
+    lease expires.
+    """
+
+    def __init__(self, app, concurrency=None, batch_size=None, poll_interval=None,
+                 max_attempts=None, backoff_seconds=None, lease_seconds=None):
+        config = app.config
+        self.app = app
+        self.concurrency = concurrency or config.get('MAIL_OUTBOX_CONCURRENCY', 4)
+        self.batch_size = batch_size or config.get('MAIL_OUTBOX_BATCH_SIZE', 50)
+        self.poll_interval = poll_interval or config.get('MAIL_OUTBOX_POLL_INTERVAL', 1.0)
+        self.max_attempts = max_attempts or config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 5)
+        self.backoff_seconds = backoff_seconds or config.get('MAIL_OUTBOX_BACKOFF_SECONDS', 30)
+        self.lease_seconds = lease_seconds or config.get('MAIL_OUTBOX_LEASE_SECONDS', 300)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                            thread_name_prefix='outbox')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def backoff(self, attempts):
+        """Return the delay before retry number ``attempts``, with jitter."""
+        delay = min(self.backoff_seconds * 2 ** (attempts - 1), 3600)
+        return delay * random.uniform(0.8, 1.2)
+
+    def claim_batch(self):
+        """Claim up to ``batch_size`` due messages and return their ids."""
+        with write_intent():
+            return self._claim_batch()
+
+    def _claim_batch(self):
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.lease_seconds)
+        outbox = EmailOutbox.__table__
+
+        due = db.session.execute(
+            db.select(outbox.c.id)
+            .where(db.or_(
+                db.and_(outbox.c.status == EmailOutbox.STATUS_PENDING,
+                        outbox.c.next_attempt_at <= now),
+                db.and_(outbox.c.status == EmailOutbox.STATUS_SENDING,
+                        outbox.c.locked_at < lease_expired)
+            ))
+            .order_by(outbox.c.next_attempt_at)
+            .limit(self.batch_size)
+        ).scalars().all()
+
+        claimed = []
+        for message_id in due:
+            result = db.session.execute(
+                outbox.update()
+                .where(outbox.c.id == message_id)
+                .where(db.or_(
+                    outbox.c.status == EmailOutbox.STATUS_PENDING,
+                    db.and_(outbox.c.status == EmailOutbox.STATUS_SENDING,
+                            outbox.c.locked_at < lease_expired)
+                ))
+                .values(status=EmailOutbox.STATUS_SENDING, locked_at=now,
+                        attempts=outbox.c.attempts + 1, updated_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append(message_id)
+        db.session.commit()
+        return claimed
+
+    def deliver(self, message_id):
+        """Deliver one claimed message and record the outcome."""
+        with self.app.app_context():
+            message = db.session.get(EmailOutbox, message_id)
+            if message is None:
+                return False
+            envelope = (message.recipient, message.subject, message.body, message.html)
+            # Don't hold a connection or read transaction open during the SMTP exchange
+            db.session.commit()
+
+            # Recording the outcome reloads the message and then writes it
+            with write_intent():
+                try:
+                    deliver_email(*envelope)
+                except Exception as e:
+                    message.last_error = str(e)
+                    message.locked_at = None
+                    if message.attempts >= self.max_attempts:
+                        message.status = EmailOutbox.STATUS_FAILED
+                        logger.error("Giving up on outbox message %s after %s attempts: %s",
+                                     message.id, message.attempts, e)
+                    else:
+                        message.status = EmailOutbox.STATUS_PENDING
+                        message.next_attempt_at = datetime.utcnow() + timedelta(
+                            seconds=self.backoff(message.attempts))
+                        logger.warning("Outbox message %s failed (attempt %s): %s",
+                                       message.id, message.attempts, e)
+                    db.session.commit()
+                    return False
+
+                message.status = EmailOutbox.STATUS_SENT
+                message.sent_at = datetime.utcnow()
+                message.locked_at = None
+                message.last_error = None
+                db.session.commit()
+                return True
+
+    def run_once(self):
+        """
+        Claim and deliver one batch of messages.
+
+        Returns:
+            int: Number of messages claimed
+        """
+        with self.app.app_context():
+            claimed = self.claim_batch()
+        if claimed:
+            list(self._executor.map(self.deliver, claimed))
+        return len(claimed)
+
+    def run_forever(self):
+        """Drain the outbox until ``stop()`` is called."""
+        logger.info("Outbox worker started with %s delivery threads", self.concurrency)
+        while not self._stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception:
+                logger.exception("Outbox worker iteration failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run the worker on a background daemon thread."""
+        self._thread = threading.Thread(target=self.run_forever, name='outbox-worker', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the worker and wait for in-flight deliveries to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already waiting for a worker."""
+
+
+_executor = None
+_pending = None
+_executor_lock = threading.Lock()
+
+def _config(key, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+def _get_executor():
+    """
+    Return the process-wide hashing executor, creating it on first use.
+
+    The executor is created lazily so each gunicorn worker builds its own
+    threads after forking. hashlib's scrypt/pbkdf2 and argon2 release the
+    GIL, so the threads hash in parallel.
+    """
+    global _executor, _pending
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = _config('PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+                _pending = threading.BoundedSemaphore(_config('PASSWORD_HASH_MAX_PENDING', 64))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor
+
+def _run(fn, *args):
+    """Run a hash operation on the bounded executor and wait for its result."""
+    executor = _get_executor()
+    if not _pending.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many password hash operations in progress")
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        _pending.release()
+
+@lru_cache(maxsize=1)
+def _argon2_hasher(time_cost, memory_cost, parallelism):
+    try:
+        from argon2 import PasswordHasher
+    except ImportError:
+        raise RuntimeError("PASSWORD_HASH_METHOD=argon2 requires argon2-cffi (pip install argon2-cffi)")
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+def _get_argon2_hasher():
+    return _argon2_hasher(
+        _config('PASSWORD_ARGON2_TIME_COST', 2),
+        _config('PASSWORD_ARGON2_MEMORY_COST', 19456),
+        _config('PASSWORD_ARGON2_PARALLELISM', 1)
+    )
+
+@lru_cache(maxsize=8)
+def _werkzeug_prefix(method):
+    """The method string werkzeug stores in a hash, e.g. ``pbkdf2:sha256:600000``."""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+def _hash(password, method):
+    if method == 'argon2':
+        return _get_argon2_hasher().hash(password)
+    return generate_password_hash(password, method=method)
+
+def _verify(pw_hash, password):
+    if pw_hash.startswith('$argon2'):
+        from argon2.exceptions import InvalidHashError, VerificationError
+        try:
+            return _get_argon2_hasher().verify(pw_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(pw_hash, password)
+
+def hash_password(password):
+    """
+    Hash a password with the configured ``PASSWORD_HASH_METHOD``.
+
+    Supported methods are any werkzeug method string (``scrypt:N:r:p``,
+    ``pbkdf2:sha256:iterations``) and ``argon2`` (argon2id via argon2-cffi,
+    tuned with ``PASSWORD_ARGON2_*``).
+
+    Raises:
+        PasswordHasherBusy: If the hashing executor's queue is full
+    """
+    return _run(_hash, password, _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+
+def verify_password(pw_hash, password):
+    """
+    Check a password against a stored hash of any supported method.
+
+    Raises:
+        PasswordHasherBusy: If the hashing executor's queue is full
+    """
+    return _run(_verify, pw_hash, password)
+
+def needs_rehash(pw_hash):
+    """Return True if a stored hash was not made with the current method and parameters."""
+    method = _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    if method == 'argon2':
+        return not pw_hash.startswith('$argon2') or _get_argon2_hasher().check_needs_rehash(pw_hash)
+    if pw_hash.startswith('$argon2'):
+        return True
+    return pw_hash.split('$', 1)[0] != _werkzeug_prefix(method)
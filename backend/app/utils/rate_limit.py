@@ -0,0 +1,211 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+
+class MemoryStore:
+    """
+    In-process counter store for the sliding-window limiter.
+
+    Counts are kept per key and fixed time bucket; only the current and
+    previous bucket of each key are retained. Limits are per worker process.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def _sweep(self, now):
+        # Drop keys whose newest bucket no longer overlaps the sliding window
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        stale = [key for key, (window, counts) in self._buckets.items()
+                 if max(counts) < int(now // window) - 1]
+        for key in stale:
+            del self._buckets[key]
+
+    def hit(self, key, window, now):
+        """Increment the current bucket and return (current, previous) counts."""
+        bucket = int(now // window)
+        with self._lock:
+            self._sweep(now)
+            counts = self._buckets.setdefault(key, (window, {}))[1]
+            counts[bucket] = counts.get(bucket, 0) + 1
+            for old in [b for b in counts if b < bucket - 1]:
+                del counts[old]
+            return counts[bucket], counts.get(bucket - 1, 0)
+
+    def peek(self, key, window, now):
+        """Return (current, previous) counts without incrementing."""
+        bucket = int(now // window)
+        with self._lock:
+            counts = self._buckets.get(key, (window, {}))[1]
+            return counts.get(bucket, 0), counts.get(bucket - 1, 0)
+
+    def reset(self, key, window, now):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class RedisStore:
+    """
+    Redis-backed counter store, shared by every worker process.
+
+    Works with any server speaking the Redis protocol (Redis, Valkey,
+    KeyDB, ...). Requires the ``redis`` package.
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Redis rate limit storage requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _keys(self, key, window, now):
+        bucket = int(now // window)
+        return f'{self.prefix}{key}:{bucket}', f'{self.prefix}{key}:{bucket - 1}'
+
+    def hit(self, key, window, now):
+        current_key, previous_key = self._keys(key, window, now)
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(window * 2) + 1)
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+    def peek(self, key, window, now):
+        current, previous = self.client.mget(self._keys(key, window, now))
+        return int(current or 0), int(previous or 0)
+
+    def reset(self, key, window, now):
+        self.client.delete(*self._keys(key, window, now))
+
+
+def parse_limit(value):
+    """Parse a ``"<count>/<seconds>"`` limit string into (count, seconds)."""
+    count, seconds = value.split('/')
+    return int(count), float(seconds)
+
+def create_store(url):
+    """Create a counter store from ``memory://`` or a ``redis://``/``rediss://`` URL."""
+    if not url or url.startswith('memory://'):
+        return MemoryStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported rate limit storage URL: {url}")
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window rate limiter.
+
+    The request rate is estimated from the counts of the current and the
+    previous fixed window, weighting the previous one by how much of it
+    still overlaps the sliding window. This needs two counters per key
+    and no per-request timestamps, so rejecting a request costs a couple of
+    dictionary lookups (or one Redis round trip).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.allowed = {}
+        self.rejected = {}
+
+    @staticmethod
+    def _estimate(current, previous, window, now):
+        elapsed = (now % window) / window
+        return previous * (1 - elapsed) + current
+
+    def _record(self, scope, allowed):
+        counter = self.allowed if allowed else self.rejected
+        with self._lock:
+            counter[scope] = counter.get(scope, 0) + 1
+
+    def hit(self, scope, key, limit):
+        """
+        Count one request for ``key`` and check it against ``limit``.
+
+        Args:
+            scope (str): Name of the limit, e.g. ``login_ip``
+            key (str): What is being limited, e.g. the client IP
+            limit (tuple): (count, seconds)
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        count, window = limit
+        now = time.time()
+        current, previous = self.store.hit(f'{scope}:{key}', window, now)
+        allowed = self._estimate(current, previous, window, now) <= count
+        self._record(scope, allowed)
+        return allowed, 0 if allowed else int(window - now % window) + 1
+
+    def check(self, scope, key, limit):
+        """Check ``key`` against ``limit`` without counting a request."""
+        count, window = limit
+        now = time.time()
+        current, previous = self.store.peek(f'{scope}:{key}', window, now)
+        allowed = self._estimate(current, previous, window, now) < count
+        if not allowed:
+            self._record(scope, False)
+        return allowed, 0 if allowed else int(window - now % window) + 1
+
+    def reset(self, scope, key, limit):
+        """Forget the requests counted for ``key``."""
+        self.store.reset(f'{scope}:{key}', limit[1], time.time())
+
+    def stats(self):
+        with self._lock:
+            return {'allowed': dict(self.allowed), 'rejected': dict(self.rejected)}
+
+
+def get_limiter(app=None):
+    """Return the application's rate limiter, creating it on first use."""
+    app = app or current_app._get_current_object()
+    limiter = app.extensions.get('rate_limiter')
+    if limiter is None:
+        limiter = app.extensions.setdefault('rate_limiter', SlidingWindowLimiter(
+            create_store(app.config.get('RATELIMIT_STORAGE_URL', 'memory://'))
+        ))
+    return limiter
+
+def client_ip():
+    """
+    The client address.
+
+    Behind ``TRUSTED_PROXY_COUNT`` proxies, ProxyFix (installed by
+    create_app) has already set it from the X-Forwarded-For entry the
+    outermost proxy appended, which the client can't forge.
+    """
+    return request.remote_addr
+
+def rate_limited_response(retry_after):
+    response = jsonify({'error': 'Too many requests', 'message': 'Please try again later.'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def limit_by_ip(scope, config_key):
+    """
+    Reject requests from a client IP that exceeds the limit in ``config_key``.
+
+    The check runs before the view, so throttled requests never reach the
+    database or the password hasher.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current_app.config.get('RATELIMIT_ENABLED', True):
+                limit = parse_limit(current_app.config[config_key])
+                allowed, retry_after = get_limiter().hit(scope, client_ip(), limit)
+                if not allowed:
+                    return rate_limited_response(retry_after)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
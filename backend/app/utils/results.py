@@ -0,0 +1,54 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+from ..models import get_model
+
+def result_load_options(Result):
+    """
+    Loader options that fetch everything result exports and notifications touch.
+
+    With these options a query for results costs a fixed number of SELECTs
+    regardless of the number of answers: one for the results joined to
+    their candidate, exam and exam creator, and one for all of their
+    answers joined to the question and selected option.
+
+    Args:
+        Result: The Result model class
+
+    Returns:
+        list: Loader options to pass to ``Query.options``
+    """
+    Answer = Result.answers.property.mapper.class_
+    Exam = Result.exam.property.mapper.class_
+    return [
+        joinedload(Result.candidate),
+        joinedload(Result.exam).joinedload(Exam.creator),
+        selectinload(Result.answers).options(
+            joinedload(Answer.question),
+            joinedload(Answer.selected_option)
+        )
+    ]
+
+def load_result(result_id):
+    """
+    Load a result with its candidate, exam, answers, questions and options in two queries.
+
+    Args:
+        result_id (int): ID of the result
+
+    Returns:
+        Result model instance, or None if it doesn't exist
+    """
+    Result = get_model('Result')
+    return (
+        Result.query
+        .options(*result_load_options(Result))
+        .filter(Result.id == result_id)
+        .populate_existing()
+        .one_or_none()
+    )
+
+def answers_loaded(result):
+    """Return True if the result's answers and their questions are already in memory."""
+    if 'answers' in inspect(result).unloaded:
+        return False
+    return all('question' not in inspect(answer).unloaded for answer in result.answers)
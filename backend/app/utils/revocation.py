@@ -0,0 +1,283 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from .. import db
+from ..models.token_revocation import TokenRevocation
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Incremental syncs re-read this much history so rows committed out of
+# order (or by workers with a slightly skewed clock) are not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Membership tests never give false negatives; false positives occur at
+    about ``error_rate`` once ``capacity`` keys have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        positions = self._positions(key)
+        bits = self._bits
+        if all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+            return
+        for pos in positions:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    """
+    In-memory view of the ``token_revocations`` table for one worker process.
+
+    Revoked token IDs are held in a Bloom filter and per-user cut-offs in a
+    dict, so checking a token is a few bit tests and a dict lookup. Only a
+    Bloom filter hit (a revoked token, or a false positive at about
+    ``error_rate``) is confirmed against the database, and the answer is
+    cached until the token is next seen in a sync.
+
+    The view is refreshed from the database at most every ``sync_interval``
+    seconds by whichever request gets there first, reading only rows revoked
+    since the previous sync. Every ``rebuild_interval`` seconds the filter
+    is rebuilt from scratch, which drops expired revocations. Revocations
+    made in this process apply immediately; other workers see them after
+    their next sync.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, sync_interval=10, rebuild_interval=3600,
+                 confirm_cache_size=10000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.confirm_cache_size = confirm_cache_size
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked_before = {}
+        self._confirmed = OrderedDict()
+        self._synced_at = None
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self._sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.syncs = 0
+        self.bloom_hits = 0
+        self.revoked_hits = 0
+
+    def is_revoked(self, payload):
+        """
+        Check a decoded access token against the revocation list.
+
+        Args:
+            payload (dict): JWT claims; ``sub``, ``iat`` and ``jti`` are used
+
+        Returns:
+            bool: True if the token or all of its user's older tokens were revoked
+        """
+        self._maybe_sync()
+
+        before = self._revoked_before.get(str(payload.get('sub')))
+        if before is not None and payload.get('iat', 0) < before:
+            self.revoked_hits += 1
+            return True
+
+        jti = payload.get('jti')
+        if jti is None or jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        revoked = self._confirm(jti)
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    def _confirm(self, jti):
+        with self._lock:
+            revoked = self._confirmed.get(jti)
+        if revoked is None:
+            with db.engine.connect() as conn:
+                revoked = conn.execute(
+                    db.select(TokenRevocation.id).where(TokenRevocation.jti == jti)
+                ).first() is not None
+            with self._lock:
+                self._confirmed[jti] = revoked
+                while len(self._confirmed) > self.confirm_cache_size:
+                    self._confirmed.popitem(last=False)
+        return revoked
+
+    def _apply(self, bloom, revoked_before, jti, user_id, revoked_at):
+        if jti:
+            bloom.add(jti)
+            with self._lock:
+                self._confirmed.pop(jti, None)
+        elif user_id is not None:
+            key = str(user_id)
+            # ``iat`` is a whole second: a token issued later in the same second
+            # as the revocation (logging in again right away) must stay valid,
+            # so tokens from that second are spared rather than rejected
+            cutoff = int((revoked_at - EPOCH).total_seconds())
+            revoked_before[key] = max(cutoff, revoked_before.get(key, cutoff))
+
+    def add(self, revocation):
+        """Apply a revocation made by this process without waiting for a sync."""
+        revoked_before = dict(self._revoked_before)
+        self._apply(self._bloom, revoked_before, revocation.jti, revocation.user_id, revocation.revoked_at)
+        self._revoked_before = revoked_before
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        # Requests wait for the first load; afterwards one request syncs and
+        # the others keep using the current view
+        if not self._sync_lock.acquire(blocking=self._synced_at is None):
+            return
+        try:
+            if now < self._next_sync:
+                return
+            self.sync(full=now >= self._next_rebuild or self._bloom.count >= self._bloom.capacity)
+        except Exception:
+            logger.exception("Failed to sync token revocations")
+            self._next_sync = now + self.sync_interval
+        finally:
+            self._sync_lock.release()
+
+    def sync(self, full=False):
+        """
+        Load revocations from the database.
+
+        Args:
+            full (bool): Rebuild the filter from every unexpired revocation
+                instead of reading only those made since the last sync
+        """
+        full = full or self._synced_at is None
+        started = datetime.utcnow()
+        query = db.select(TokenRevocation.jti, TokenRevocation.user_id, TokenRevocation.revoked_at).where(
+            db.or_(TokenRevocation.expires_at.is_(None), TokenRevocation.expires_at > started)
+        )
+        if not full:
+            query = query.where(TokenRevocation.revoked_at >= self._synced_at - SYNC_OVERLAP)
+        with db.engine.connect() as conn:
+            rows = conn.execute(query).all()
+
+        if full:
+            bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+            revoked_before = {}
+        else:
+            bloom = self._bloom
+            revoked_before = dict(self._revoked_before)
+        for jti, user_id, revoked_at in rows:
+            self._apply(bloom, revoked_before, jti, user_id, revoked_at)
+
+        self._bloom = bloom
+        self._revoked_before = revoked_before
+        if full:
+            with self._lock:
+                self._confirmed.clear()
+            self._next_rebuild = time.monotonic() + self.rebuild_interval
+        self._synced_at = started
+        self._next_sync = time.monotonic() + self.sync_interval
+        self.syncs += 1
+
+    def stats(self):
+        return {
+            'revoked_tokens': self._bloom.count,
+            'revoked_users': len(self._revoked_before),
+            'bloom_bytes': len(self._bloom._bits),
+            'syncs': self.syncs,
+            'bloom_hits': self.bloom_hits,
+            'revoked_hits': self.revoked_hits
+        }
+
+
+def get_revocation_list(app=None):
+    """Return the application's token revocation list, creating it on first use."""
+    app = app or current_app._get_current_object()
+    revocations = app.extensions.get('token_revocations')
+    if revocations is None:
+        revocations = app.extensions.setdefault('token_revocations', RevocationList(
+            capacity=app.config.get('JWT_REVOCATION_CAPACITY', 100000),
+            error_rate=app.config.get('JWT_REVOCATION_ERROR_RATE', 0.001),
+            sync_interval=app.config.get('JWT_REVOCATION_SYNC_INTERVAL', 10),
+            rebuild_interval=app.config.get('JWT_REVOCATION_REBUILD_INTERVAL', 3600)
+        ))
+    return revocations
+
+def _token_lifetime():
+    expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    if not expires:
+        return None
+    return expires if isinstance(expires, timedelta) else timedelta(seconds=expires)
+
+def _revoke(revocation):
+    now = revocation.revoked_at
+    # Rows for tokens that have expired on their own are no longer needed
+    db.session.execute(db.delete(TokenRevocation).where(TokenRevocation.expires_at < now))
+    db.session.add(revocation)
+    db.session.commit()
+    get_revocation_list().add(revocation)
+    return revocation
+
+def revoke_token(jti, user_id=None, expires_at=None, reason=None):
+    """
+    Revoke a single access token.
+
+    Args:
+        jti (str): The token's ``jti`` claim
+        user_id (int, optional): Owner of the token
+        expires_at (datetime, optional): The token's expiry (UTC). Defaults to
+            now plus ``JWT_ACCESS_TOKEN_EXPIRES``.
+        reason (str, optional): Free-form note
+
+    Returns:
+        TokenRevocation: The new (or existing) revocation
+    """
+    existing = db.session.execute(
+        db.select(TokenRevocation).where(TokenRevocation.jti == jti)
+    ).scalar_one_or_none()
+    if existing is not None:
+        return existing
+
+    now = datetime.utcnow()
+    lifetime = _token_lifetime()
+    if expires_at is None and lifetime is not None:
+        expires_at = now + lifetime
+    return _revoke(TokenRevocation(jti=jti, user_id=user_id, revoked_at=now,
+                                   expires_at=expires_at, reason=reason))
+
+def revoke_user_tokens(user_id, reason=None):
+    """
+    Revoke every access token issued to a user up to now.
+
+    Returns:
+        TokenRevocation: The new revocation
+    """
+    now = datetime.utcnow()
+    lifetime = _token_lifetime()
+    return _revoke(TokenRevocation(user_id=user_id, revoked_at=now,
+                                   expires_at=now + lifetime if lifetime else None, reason=reason))
@@ -0,0 +1,230 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from flask import current_app, g, has_request_context, request
+from .metrics import add_query_listener
+
+logger = logging.getLogger(__name__)
+
+# Frames from these files are skipped when looking for the call site
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+def call_site():
+    """
+    Return ``path:line in function`` for the innermost application frame.
+
+    Frames in SQLAlchemy, Flask and this module are skipped, so the result
+    points at the view or helper that issued (or lazily triggered) the query.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and filename != _THIS_FILE:
+            return '%s:%d in %s' % (os.path.relpath(filename, os.path.dirname(_APP_ROOT)),
+                                    frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return None
+
+def _shorten(statement, limit=500):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+class RequestProfile:
+    """Statements executed during one request, grouped by SQL text."""
+
+    __slots__ = ('statements', 'slow', 'status')
+
+    def __init__(self):
+        self.status = None
+        # statement -> [count, seconds, first call site]
+        self.statements = {}
+        self.slow = []
+
+    @property
+    def queries(self):
+        return sum(entry[0] for entry in self.statements.values())
+
+    @property
+    def seconds(self):
+        return sum(entry[1] for entry in self.statements.values())
+
+    def add(self, statement, seconds, site):
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, seconds, site]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def repeated(self, threshold):
+        """Statements run at least ``threshold`` times: the signature of an N+1 loop."""
+        return [
+            {'statement': _shorten(statement), 'count': count,
+             'time_ms': round(seconds * 1000, 2), 'call_site': site}
+            for statement, (count, seconds, site) in self.statements.items()
+            if count >= threshold
+        ]
+
+
+class SQLProfiler:
+    """
+    SQLAlchemy event-based query profiler.
+
+    Slow-query detection is always on: any statement slower than
+    ``slow_query_ms`` is logged with its duration and call site, in requests
+    and in background workers alike. Per-request profiling (statement
+    grouping, N+1 detection and the ``X-SQL-Profile`` response header) only
+    runs while ``enabled`` is set, which can be flipped at runtime through
+    ``/api/test/sql-profiler``. Requests that had slow or repeated queries
+    are kept in a short history for the debug endpoint.
+
+    Statements are grouped by their SQL text. SQLAlchemy binds parameters,
+    so the per-row queries of an N+1 loop share the same text.
+    """
+
+    def __init__(self, enabled=False, slow_query_ms=200, n_plus_one_threshold=10, history=50):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_queries = deque(maxlen=history)
+        self.reports = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, slow_query_ms=None, n_plus_one_threshold=None):
+        """
+        Change settings at runtime; ``None`` leaves a setting unchanged.
+
+        ``enabled`` may also be a string, as sent by clients that post form
+        style values: ``1``, ``true`` and ``yes`` (any case) enable.
+
+        Raises:
+            TypeError, ValueError: If a threshold is not a number (nothing is changed)
+        """
+        if slow_query_ms is not None:
+            slow_query_ms = float(slow_query_ms)
+        if n_plus_one_threshold is not None:
+            n_plus_one_threshold = max(int(n_plus_one_threshold), 2)
+
+        if isinstance(enabled, str):
+            enabled = enabled.lower() in ('1', 'true', 'yes')
+
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if slow_query_ms is not None:
+            self.slow_query_ms = slow_query_ms
+        if n_plus_one_threshold is not None:
+            self.n_plus_one_threshold = n_plus_one_threshold
+
+    def record(self, statement, seconds):
+        """Account one executed statement; called by the metrics query timer."""
+        profile = g.get('_sql_profile') if has_request_context() else None
+        slow = seconds * 1000 >= self.slow_query_ms
+        if profile is None and not slow:
+            return
+
+        site = call_site()
+        if profile is not None:
+            profile.add(statement, seconds, site)
+        if slow:
+            entry = {
+                'statement': _shorten(statement),
+                'time_ms': round(seconds * 1000, 2),
+                'call_site': site,
+                'path': request.path if has_request_context() else None,
+                'at': time.time()
+            }
+            logger.warning("Slow query (%.1fms) at %s: %s", entry['time_ms'], site, entry['statement'])
+            with self._lock:
+                self.slow_queries.append(entry)
+            if profile is not None:
+                profile.slow.append(entry)
+
+    def finish(self, profile, method, path):
+        """Log N+1 patterns for a finished request and keep it if anything was flagged."""
+        repeated = profile.repeated(self.n_plus_one_threshold)
+        for item in repeated:
+            logger.warning("Possible N+1: %s %s ran a statement %d times (%.1fms) at %s: %s",
+                           method, path, item['count'], item['time_ms'], item['call_site'],
+                           item['statement'])
+        if repeated or profile.slow:
+            with self._lock:
+                self.reports.append({
+                    'method': method,
+                    'path': path,
+                    'status': profile.status,
+                    'queries': profile.queries,
+                    'time_ms': round(profile.seconds * 1000, 2),
+                    'slow': profile.slow,
+                    'repeated': repeated,
+                    'at': time.time()
+                })
+
+    def state(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'slow_query_ms': self.slow_query_ms,
+                'n_plus_one_threshold': self.n_plus_one_threshold,
+                'slow_queries': list(self.slow_queries),
+                'reports': list(self.reports)
+            }
+
+    def clear(self):
+        with self._lock:
+            self.slow_queries.clear()
+            self.reports.clear()
+
+
+def get_sql_profiler(app=None):
+    """Return the application's SQL profiler, creating it on first use."""
+    app = app or current_app._get_current_object()
+    profiler = app.extensions.get('sql_profiler')
+    if profiler is None:
+        profiler = app.extensions.setdefault('sql_profiler', SQLProfiler(
+            enabled=app.config.get('SQL_PROFILER_ENABLED', False),
+            slow_query_ms=app.config.get('SQL_SLOW_QUERY_MS', 200),
+            n_plus_one_threshold=app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10),
+            history=app.config.get('SQL_PROFILER_HISTORY', 50)
+        ))
+    return profiler
+
+def init_sql_profiler(app, engine):
+    """
+    Attach the SQL profiler to an engine and to the request lifecycle.
+
+    Args:
+        app: Flask application
+        engine: The application's SQLAlchemy engine
+    """
+    profiler = get_sql_profiler(app)
+    # Durations come from the same timer as the query metrics
+    add_query_listener(engine, profiler.record)
+
+    @app.before_request
+    def _start_profile():
+        if profiler.enabled:
+            g._sql_profile = RequestProfile()
+
+    @app.after_request
+    def _profile_header(response):
+        # Streamed bodies run their queries after this point; the header
+        # only counts what ran before the response was returned
+        profile = g.get('_sql_profile')
+        if profile is not None:
+            profile.status = response.status_code
+            response.headers['X-SQL-Profile'] = 'queries=%d; time_ms=%.2f; slow=%d; repeated=%d' % (
+                profile.queries, profile.seconds * 1000, len(profile.slow),
+                len(profile.repeated(profiler.n_plus_one_threshold))
+            )
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profile = g.pop('_sql_profile', None)
+        if profile is not None:
+            profiler.finish(profile, request.method, request.path)
@@ -0,0 +1,107 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statements that never write; a transaction starting with anything else takes the write lock
+READ_PREFIXES = ('SELECT', 'PRAGMA', 'EXPLAIN')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_write_intent = ContextVar('sqlite_write_intent', default=None)
+
+@contextmanager
+def write_intent():
+    """
+    Mark transactions begun in this block as writers.
+
+    Use around code that reads and then writes in one transaction outside
+    of a request (workers, scripts). Such transactions start with
+    ``BEGIN IMMEDIATE`` and wait for the write lock up front, instead of
+    failing with ``database is locked`` when upgrading a read snapshot that
+    another writer has since changed.
+    """
+    token = _write_intent.set(True)
+    try:
+        yield
+    finally:
+        _write_intent.reset(token)
+
+@contextmanager
+def read_intent():
+    """
+    Mark transactions begun in this block as readers, even in a non-GET request.
+
+    Use in endpoints that only read and leave the writing to someone else
+    (e.g. a write-behind buffer), so concurrent requests don't queue for
+    the write lock. A transaction whose first statement writes still
+    starts with ``BEGIN IMMEDIATE``.
+    """
+    token = _write_intent.set(False)
+    try:
+        yield
+    finally:
+        _write_intent.reset(token)
+
+def _wants_write_lock(statement):
+    intent = _write_intent.get()
+    if intent:
+        return True
+    if intent is None and has_request_context() and request.method not in SAFE_METHODS:
+        return True
+    return not statement.lstrip()[:7].upper().startswith(READ_PREFIXES)
+
+def configure_sqlite(engine, config):
+    """
+    Apply the SQLite concurrency settings to an engine.
+
+    On every new connection this enables WAL (readers and the writer no
+    longer block each other), sets a busy timeout so writers wait for the
+    lock instead of failing, and applies ``synchronous=NORMAL``, a larger
+    page cache and memory-mapped I/O.
+
+    Transactions are begun by hand rather than by the driver: read
+    transactions use a deferred ``BEGIN``, while transactions that will
+    write use ``BEGIN IMMEDIATE``. A transaction is a writer when it runs
+    in a non-GET request or inside ``write_intent()``, or when its first
+    statement is not a read.
+
+    Args:
+        engine: SQLAlchemy engine for a SQLite database
+        config: The application config mapping
+    """
+    journal_mode = 'WAL' if config.get('SQLITE_WAL', True) and engine.url.database not in (None, '', ':memory:') else None
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA synchronous = {config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA cache_size = -{int(config.get('SQLITE_CACHE_SIZE_KB', 65536))}",
+        f"PRAGMA mmap_size = {int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+        "PRAGMA temp_store = MEMORY"
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        # Disable the driver's own transaction handling; see _on_begin
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            if journal_mode:
+                mode = cursor.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()[0]
+                if mode.upper() != journal_mode:
+                    logger.warning("SQLite journal_mode is %s, expected %s", mode, journal_mode)
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def _on_begin(conn):
+        # Defer BEGIN until the first statement shows whether this is a reader or a writer
+        conn.info['sqlite_begin_pending'] = True
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.pop('sqlite_begin_pending', False):
+            cursor.execute('BEGIN IMMEDIATE' if _wants_write_lock(statement) else 'BEGIN')
@@ -0,0 +1,409 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+from .. import db
+from ..models import get_model
+from ..models.exam_stats import DailyActivity, ExamStats
+
+logger = logging.getLogger(__name__)
+
+# Dialects with a native upsert; others update, then insert if no row matched
+_UPSERT_DIALECTS = {'sqlite': sqlite, 'postgresql': postgresql, 'mysql': mysql}
+
+# Exams recounted per transaction by rebuild_stats()
+REBUILD_BATCH_SIZE = 500
+
+# Rows per IN (...) query when loading old values before a flush
+_LOAD_CHUNK_SIZE = 500
+
+# Longest history served by recent_activity()
+ACTIVITY_MAX_DAYS = 366
+
+# How each tracked column of the exam models adds to an exam's counters
+_TRACKED = {
+    'Candidate': {
+        'invitation_sent': lambda value: {'invited': int(bool(value))},
+        'test_start_time': lambda value: {'started': int(value is not None)},
+        'test_end_time': lambda value: {'completed': int(value is not None)},
+    },
+    'Result': {
+        'score': lambda value: {'graded': int(value is not None), 'score_total': value or 0},
+        'passed': lambda value: {'passed': int(bool(value))},
+    },
+}
+# Counter of the rows themselves
+_ROW_COUNTERS = {'Candidate': 'candidates'}
+# Candidate columns whose first setting is an event in the daily activity
+_ACTIVITY = {'invitation_sent': 'invited', 'test_start_time': 'started', 'test_end_time': 'completed'}
+
+_UNKNOWN = object()
+
+
+class _PendingStats:
+    """Counter changes made in a transaction, written to the rollups when it commits."""
+
+    def __init__(self):
+        self.exams = defaultdict(lambda: defaultdict(int))
+        self.days = defaultdict(lambda: defaultdict(int))
+        self.recount = set()
+        self.removed = set()
+
+    def add(self, exam_id, counts, sign=1):
+        totals = self.exams[exam_id]
+        for name, value in counts.items():
+            totals[name] += sign * value
+
+    def add_activity(self, day, name, count=1):
+        self.days[day][name] += count
+
+    def apply(self, connection):
+        now = datetime.utcnow()
+        # Fixed order, so concurrent transactions lock the rows the same way
+        for exam_id in sorted(self.removed):
+            connection.execute(db.delete(ExamStats).where(ExamStats.exam_id == exam_id))
+        recount = sorted(self.recount - self.removed)
+        if recount:
+            _recount(connection, recount)
+        for exam_id in sorted(set(self.exams) - self.removed - self.recount):
+            increments = {name: value for name, value in self.exams[exam_id].items() if value}
+            if increments:
+                _upsert(connection, ExamStats, {'exam_id': exam_id}, increments, {'updated_at': now})
+        for day in sorted(self.days):
+            increments = {name: value for name, value in self.days[day].items() if value}
+            if increments:
+                _upsert(connection, DailyActivity, {'day': day}, increments)
+
+
+def _upsert(connection, model, key, increments=None, values=None):
+    """
+    Insert a rollup row, or add ``increments`` to (and set ``values`` on) the existing one.
+
+    Args:
+        connection: Connection of the transaction to write in
+        model: ExamStats or DailyActivity
+        key (dict): Primary key column values
+        increments (dict, optional): Amounts to add to counter columns
+        values (dict, optional): Values to overwrite
+    """
+    table = model.__table__
+    increments, values = increments or {}, values or {}
+    dialect = _UPSERT_DIALECTS.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table).values(**key, **increments, **values)
+        if dialect is mysql:
+            new = statement.inserted
+            changes = {name: table.c[name] + new[name] for name in increments}
+            changes.update({name: new[name] for name in values})
+            statement = statement.on_duplicate_key_update(changes)
+        else:
+            new = statement.excluded
+            changes = {name: table.c[name] + new[name] for name in increments}
+            changes.update({name: new[name] for name in values})
+            statement = statement.on_conflict_do_update(index_elements=list(key), set_=changes)
+        connection.execute(statement)
+        return
+
+    changes = {name: table.c[name] + value for name, value in increments.items()}
+    changes.update(values)
+    where = [table.c[name] == value for name, value in key.items()]
+    if connection.execute(db.update(table).where(*where).values(changes)).rowcount == 0:
+        connection.execute(db.insert(table).values(**key, **increments, **values))
+
+def _recount(connection, exam_ids):
+    """
+    Recompute the counters of ``exam_ids`` from the candidates and results tables.
+
+    The stats rows are locked first (by an empty upsert), so a concurrent
+    transaction's increments either land before the count, which then
+    includes them, or wait until this transaction commits.
+    """
+    Candidate, Result = get_model('Candidate'), get_model('Result')
+    now = datetime.utcnow()
+    counts = {exam_id: {name: 0 for name in ('candidates', 'invited', 'started', 'completed',
+                                             'graded', 'passed', 'score_total')}
+              for exam_id in exam_ids}
+    for exam_id in exam_ids:
+        _upsert(connection, ExamStats, {'exam_id': exam_id}, values={'updated_at': now})
+
+    if Candidate is not None:
+        for exam_id, candidates, invited, started, completed in connection.execute(
+            db.select(Candidate.exam_id, db.func.count(),
+                      db.func.count(db.case((Candidate.invitation_sent.is_(True), 1))),
+                      db.func.count(Candidate.test_start_time), db.func.count(Candidate.test_end_time))
+            .where(Candidate.exam_id.in_(exam_ids))
+            .group_by(Candidate.exam_id)
+        ):
+            counts[exam_id].update(candidates=candidates, invited=invited, started=started, completed=completed)
+    if Result is not None:
+        for exam_id, graded, passed, score_total in connection.execute(
+            db.select(Result.exam_id, db.func.count(Result.score),
+                      db.func.count(db.case((Result.passed.is_(True), 1))), db.func.sum(Result.score))
+            .where(Result.exam_id.in_(exam_ids))
+            .group_by(Result.exam_id)
+        ):
+            counts[exam_id].update(graded=graded, passed=passed, score_total=score_total or 0)
+
+    for exam_id in exam_ids:
+        _upsert(connection, ExamStats, {'exam_id': exam_id}, values=dict(counts[exam_id], updated_at=now))
+
+def _pending(session):
+    pending = session.info.get('exam_stats_changes')
+    if pending is None:
+        pending = session.info['exam_stats_changes'] = _PendingStats()
+    return pending
+
+def record_exam_stats(exam_id, **deltas):
+    """
+    Add to an exam's counters when the current transaction commits.
+
+    Changes made through the ORM are counted automatically. Code that
+    changes candidates or results with bulk (Core) statements records the
+    effect itself, e.g. ``record_exam_stats(exam_id, completed=1)``.
+
+    Args:
+        exam_id (int): ID of the exam
+        **deltas: Amounts to add to ``candidates``, ``invited``,
+            ``started``, ``completed``, ``graded``, ``passed`` or ``score_total``
+    """
+    _pending(db.session).add(exam_id, deltas)
+
+def record_activity(day=None, **deltas):
+    """Add to a day's activity counters (``invited``, ``started``, ``completed``) when the transaction commits."""
+    pending = _pending(db.session)
+    for name, count in deltas.items():
+        pending.add_activity(day or datetime.utcnow().date(), name, count)
+
+
+def _old_value(state, key, loaded):
+    """A column's value before the flush, or _UNKNOWN if it was never loaded."""
+    if key in state.committed_state:
+        value = state.committed_state[key]
+        if value is NO_VALUE:
+            return loaded.get(key, _UNKNOWN)
+        return value
+    return state.dict.get(key, _UNKNOWN)
+
+def _contribution(name, values):
+    counts = defaultdict(int)
+    if name in _ROW_COUNTERS:
+        counts[_ROW_COUNTERS[name]] = 1
+    for key, counters in _TRACKED[name].items():
+        for counter, value in counters(values[key]).items():
+            counts[counter] += value
+    return counts
+
+def _activity_day(key, value):
+    if key != 'invitation_sent' and isinstance(value, datetime):
+        return value.date()
+    return datetime.utcnow().date()
+
+def _count_change(pending, obj, kind, old_values):
+    """Record how a flushed Candidate or Result changes its exam's counters."""
+    name = type(obj).__name__
+    state = db.inspect(obj)
+    keys = _TRACKED[name]
+    old = new = None
+    if kind != 'new':
+        loaded = old_values.get(state.key, {})
+        old = {key: _old_value(state, key, loaded) for key in chain(('exam_id',), keys)}
+    if kind != 'deleted':
+        # Columns of a new row that were never set are NULL
+        missing = None if kind == 'new' else _UNKNOWN
+        new = {key: state.dict.get(key, missing) for key in chain(('exam_id',), keys)}
+
+    if name == 'Candidate':
+        for key, counter in _ACTIVITY.items():
+            before = None if old is None else old[key]
+            after = None if new is None else new[key]
+            if before is not _UNKNOWN and after is not _UNKNOWN and not before and after:
+                pending.add_activity(_activity_day(key, after), counter)
+
+    if kind == 'dirty' and old['exam_id'] == new['exam_id'] and old['exam_id'] is not _UNKNOWN:
+        changed = [key for key in keys if key in state.committed_state]
+        if any(old[key] is _UNKNOWN for key in changed):
+            pending.recount.add(new['exam_id'])
+            return
+        for key in changed:
+            pending.add(new['exam_id'], keys[key](new[key]))
+            pending.add(new['exam_id'], keys[key](old[key]), sign=-1)
+        return
+
+    # Added, deleted or moved to another exam: the whole row counts
+    for values, sign in ((old, -1), (new, 1)):
+        if values is None or values['exam_id'] is None:
+            continue
+        if values['exam_id'] is _UNKNOWN:
+            logger.warning("Can't update exam stats for %r; run rebuild_stats.py", obj)
+        elif _UNKNOWN in values.values():
+            pending.recount.add(values['exam_id'])
+        else:
+            pending.add(values['exam_id'], _contribution(name, values), sign)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_old_values(session, flush_context, instances):
+    """
+    Read the tracked columns of rows changed without loading them first.
+
+    Assigning to an expired attribute (e.g. after a commit) doesn't keep
+    the old value; the row still holds it until the flush, and without it
+    the change could only be counted by recounting the exam, and its
+    activity not at all.
+    """
+    stale = defaultdict(list)
+    for obj in session.dirty:
+        name = type(obj).__name__
+        if name in _TRACKED:
+            state = db.inspect(obj)
+            if state.key is not None and any(state.committed_state.get(key) is NO_VALUE
+                                             for key in chain(('exam_id',), _TRACKED[name])):
+                stale[type(obj)].append(state)
+
+    old_values = session.info['exam_stats_old_values'] = {}
+    for model, states in stale.items():
+        keys = ['exam_id', *_TRACKED[model.__name__]]
+        for start in range(0, len(states), _LOAD_CHUNK_SIZE):
+            ids = {state.identity[0]: state.key for state in states[start:start + _LOAD_CHUNK_SIZE]}
+            for row in session.connection().execute(
+                db.select(model.id, *(getattr(model, key) for key in keys)).where(model.id.in_(ids))
+            ):
+                old_values[ids[row[0]]] = dict(zip(keys, row[1:]))
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stats_changes(session, flush_context):
+    """Turn flushed Candidate/Result changes into counter deltas (history is still available here)."""
+    old_values = session.info.pop('exam_stats_old_values', None) or {}
+    for kind, objects in (('new', session.new), ('dirty', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            name = type(obj).__name__
+            if name in _TRACKED:
+                _count_change(_pending(session), obj, kind, old_values)
+            elif name == 'Exam' and kind == 'deleted':
+                _pending(session).removed.add(obj.id)
+
+@event.listens_for(Session, 'before_commit')
+def _write_stats(session):
+    if any(type(obj).__name__ in _TRACKED or type(obj).__name__ == 'Exam'
+           for obj in chain(session.new, session.dirty, session.deleted)):
+        # Count what the commit is about to flush
+        session.flush()
+    pending = session.info.pop('exam_stats_changes', None)
+    if pending is not None:
+        pending.apply(session.connection())
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_stats_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('exam_stats_changes', None)
+
+
+def _day(value):
+    # SQLite's date() returns text
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def rebuild_stats(batch_size=None):
+    """
+    Recompute every exam's counters and the daily activity from scratch.
+
+    Use it to fill the rollups for existing data (e.g. after the migration
+    that adds them) or after changing candidates or results outside the
+    application. Exams are recounted in batches, one transaction each.
+    Invitations only count on the day of a candidate's latest invitation,
+    the only one recorded.
+
+    Returns:
+        dict: Number of exams and days written
+
+    Raises:
+        RuntimeError: If the exam models are not available
+    """
+    Exam, Candidate = get_model('Exam'), get_model('Candidate')
+    if Exam is None:
+        raise RuntimeError("Exam models are not available")
+    batch_size = batch_size or REBUILD_BATCH_SIZE
+
+    exam_ids = db.session.execute(db.select(Exam.id).order_by(Exam.id)).scalars().all()
+    db.session.execute(db.delete(ExamStats).where(ExamStats.exam_id.notin_(db.select(Exam.id))))
+    db.session.commit()
+    for start in range(0, len(exam_ids), batch_size):
+        _recount(db.session.connection(), exam_ids[start:start + batch_size])
+        db.session.commit()
+
+    days = defaultdict(dict)
+    if Candidate is not None:
+        columns = {'started': Candidate.test_start_time, 'completed': Candidate.test_end_time}
+        if hasattr(Candidate, 'last_invited_at'):
+            columns['invited'] = Candidate.last_invited_at
+        for counter, column in columns.items():
+            day = db.func.date(column)
+            for value, count in db.session.execute(
+                db.select(day, db.func.count()).where(column.isnot(None)).group_by(day)
+            ):
+                days[_day(value)][counter] = count
+    db.session.execute(db.delete(DailyActivity))
+    if days:
+        db.session.execute(db.insert(DailyActivity), [
+            {'day': day, 'invited': 0, 'started': 0, 'completed': 0, **counts} for day, counts in days.items()
+        ])
+    db.session.commit()
+
+    logger.info("Rebuilt stats of %d exams and %d days of activity", len(exam_ids), len(days))
+    return {'exams': len(exam_ids), 'days': len(days)}
+
+
+def dashboard_stats(limit=50):
+    """
+    Totals across all exams plus the per-exam counters, most recently active first.
+
+    Reads only the rollup tables: one row per exam, however many candidates
+    and results there are.
+
+    Args:
+        limit (int): Maximum number of exams to list
+
+    Returns:
+        dict: ``totals`` and ``exams``
+    """
+    columns = ('candidates', 'invited', 'started', 'completed', 'graded', 'passed')
+    row = db.session.execute(db.select(
+        db.func.count(),
+        *(db.func.coalesce(db.func.sum(getattr(ExamStats, name)), 0) for name in columns),
+        db.func.coalesce(db.func.sum(ExamStats.score_total), 0)
+    )).one()
+    totals = dict(zip(('exams',) + columns, row))
+    graded = totals['graded']
+    totals['average_score'] = round(row[-1] / graded, 2) if graded else None
+    totals['pass_rate'] = round(totals['passed'] / graded * 100, 2) if graded else None
+
+    exams = db.session.execute(
+        db.select(ExamStats).order_by(ExamStats.updated_at.desc(), ExamStats.exam_id.desc()).limit(limit)
+    ).scalars()
+    return {'totals': totals, 'exams': [stats.to_dict() for stats in exams]}
+
+def recent_activity(days=30):
+    """
+    Daily activity of the last ``days`` days (UTC, oldest first), with empty days as zeros.
+
+    Returns:
+        list: One ``DailyActivity.to_dict()`` per day
+    """
+    today = datetime.utcnow().date()
+    first = today - timedelta(days=days - 1)
+    rows = {
+        activity.day: activity
+        for activity in db.session.execute(
+            db.select(DailyActivity).where(DailyActivity.day >= first)
+        ).scalars()
+    }
+    activity = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = rows.get(day)
+        activity.append(row.to_dict() if row is not None else
+                        {'day': day, 'invited': 0, 'started': 0, 'completed': 0})
+    return activity
@@ -0,0 +1,116 @@
+import os
+import re
+import threading
+from flask import current_app
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import escape
+
+_env_lock = threading.Lock()
+
+def get_email_environment(app=None):
+    """
+    Return the Jinja2 environment for email templates, creating it on first use.
+
+    Templates live in ``app/templates/email`` and are compiled once per
+    process; the compiled bytecode is also cached on disk
+    (``EMAIL_TEMPLATE_CACHE_DIR``) so freshly started workers skip parsing.
+    Templates are only re-checked for changes in debug mode.
+    """
+    app = app or current_app._get_current_object()
+    env = app.extensions.get('email_templates')
+    if env is not None:
+        return env
+
+    with _env_lock:
+        env = app.extensions.get('email_templates')
+        if env is None:
+            cache_dir = app.config.get('EMAIL_TEMPLATE_CACHE_DIR') or os.path.join(
+                app.instance_path, 'email_template_cache')
+            os.makedirs(cache_dir, exist_ok=True)
+
+            env = Environment(
+                loader=FileSystemLoader(os.path.join(app.root_path, 'templates', 'email')),
+                autoescape=select_autoescape(['html']),
+                bytecode_cache=FileSystemBytecodeCache(cache_dir),
+                auto_reload=app.debug,
+                trim_blocks=True,
+                lstrip_blocks=True,
+                keep_trailing_newline=True
+            )
+            app.extensions['email_templates'] = env
+    return env
+
+class EmailTemplate:
+    """
+    A compiled plain text + HTML email template pair.
+
+    Args:
+        name (str): Template base name; ``<name>.txt`` and ``<name>.html``
+            are loaded from the email template directory
+        context (dict, optional): Values shared by every render, e.g.
+            per-exam details computed once for a whole cohort
+    """
+
+    def __init__(self, name, context=None):
+        env = get_email_environment()
+        self._text = env.get_template(f'{name}.txt')
+        self._html = env.get_template(f'{name}.html')
+        self.context = context or {}
+
+    def render(self, **context):
+        """
+        Render both parts with the shared context plus ``context``.
+
+        Returns:
+            tuple: (plain text body, HTML body)
+        """
+        return self._render(context)
+
+    def _render(self, context):
+        if self.context:
+            context = {**self.context, **context}
+        return self._text.render(context), self._html.render(context)
+
+    def prerender(self, *fields, **context):
+        """
+        Render everything except ``fields`` once, leaving them as placeholders.
+
+        Use this when the same message goes to many recipients and only a few
+        plain string values differ; filling in the placeholders is a simple
+        substitution instead of a full template render.
+
+        Returns:
+            PrerenderedEmail: Template with only ``fields`` left to fill in
+        """
+        placeholders = {field: f'\x00{field}\x00' for field in fields}
+        text, html = self._render({**context, **placeholders})
+        return PrerenderedEmail(text, html, fields)
+
+class PrerenderedEmail:
+    """Rendered email parts with per-recipient placeholders left to fill in."""
+
+    def __init__(self, text, html, fields):
+        pattern = re.compile('\x00(%s)\x00' % '|'.join(map(re.escape, fields)))
+        # Alternating literal chunks and field names
+        self._text = pattern.split(text)
+        self._html = pattern.split(html)
+
+    @staticmethod
+    def _fill(parts, values):
+        filled = parts[:]
+        filled[1::2] = [values[field] for field in parts[1::2]]
+        return ''.join(filled)
+
+    def render(self, **values):
+        """
+        Fill in the placeholders; values are HTML-escaped in the HTML part.
+
+        Values are converted with ``str``, except ``None`` (e.g. a candidate
+        without a name), which fills in as an empty string.
+
+        Returns:
+            tuple: (plain text body, HTML body)
+        """
+        values = {key: '' if value is None else str(value) for key, value in values.items()}
+        html_values = {key: str(escape(value)) for key, value in values.items()}
+        return self._fill(self._text, values), self._fill(self._html, html_values)
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from .. import db
+from ..models.user import User
+
+class UserCache:
+    """
+    Thread-safe TTL + LRU cache of serialized users keyed by user ID.
+
+    Entries expire after ``ttl`` seconds and the least recently used entry
+    is evicted once ``maxsize`` is reached. Changes made through the ORM in
+    this process invalidate the entry immediately; the TTL bounds how long
+    other worker processes can serve a stale copy.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return the cached user dict, or None if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, data):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def get_user_cache(app=None):
+    """Return the application's user cache, creating it on first use."""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('user_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('user_cache', UserCache(
+            maxsize=app.config.get('USER_CACHE_MAX_SIZE', 1024),
+            ttl=app.config.get('USER_CACHE_TTL', 60)
+        ))
+    return cache
+
+def get_cached_user(user_id):
+    """
+    Return the serialized user for a JWT identity, hitting the database only on a cache miss.
+
+    Args:
+        user_id: User ID as an int or a numeric string
+
+    Returns:
+        dict: ``User.to_dict()`` output, or None if the user doesn't exist
+    """
+    if isinstance(user_id, str) and user_id.isdigit():
+        user_id = int(user_id)
+
+    cache = get_user_cache()
+    data = cache.get(user_id)
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        data = user.to_dict()
+        cache.set(user_id, data)
+    return data
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    """Drop a user from the cache whenever its row changes (e.g. ``updated_at`` bumps)."""
+    if has_app_context() and 'user_cache' in current_app.extensions:
+        current_app.extensions['user_cache'].invalidate(target.id)
@@ -0,0 +1,18 @@
+"""
+ASGI entry point.
+
+Run with an ASGI server, e.g.:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+The Flask app stays synchronous; a2wsgi's ``WSGIMiddleware`` runs each
+request on a pool of ``ASGI_THREADS`` threads per worker.
+"""
+import os
+from a2wsgi import WSGIMiddleware
+from app import create_app
+from app.config import get_config
+
+flask_app = create_app(get_config())
+
+app = WSGIMiddleware(flask_app, workers=int(os.environ.get('ASGI_THREADS', 32)))
@@ -0,0 +1,161 @@
+"""
+Concurrent request throughput: sync WSGI workers vs the ASGI entry point.
+
+Starts the app under gunicorn (one sync worker), gunicorn (one gthread
+worker) and uvicorn (one worker running the app through a2wsgi's thread
+pool, as asgi.py does), and drives each with concurrent keep-alive clients:
+
+- ``login``: POST /api/auth/login (database read + password hash)
+- ``notify``: sends one email inline through a local SMTP sink that takes
+  ``SMTP_DELAY`` seconds per message (slow network I/O)
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_asgi [concurrency] [seconds]
+"""
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from flask import jsonify
+from app import create_app, db
+from app.config import get_config
+from app.models.user import User
+from app.utils.email import send_email
+from benchmarks.smtp_sink import SMTPSink
+
+PORT = 5091
+SMTP_DELAY = 0.05
+THREADS = 32
+PASSWORD = 'correct horse battery staple'
+
+SERVERS = {
+    'gunicorn sync': ['gunicorn', '--workers', '1', '--bind', f'127.0.0.1:{PORT}',
+                      'benchmarks.bench_asgi:wsgi_app()'],
+    'gunicorn gthread': ['gunicorn', '--workers', '1', '--worker-class', 'gthread', '--threads', str(THREADS),
+                         '--bind', f'127.0.0.1:{PORT}', 'benchmarks.bench_asgi:wsgi_app()'],
+    'uvicorn asgi': ['uvicorn', '--factory', 'benchmarks.bench_asgi:asgi_app', '--port', str(PORT),
+                     '--log-level', 'warning']
+}
+
+def wsgi_app():
+    """The API plus a route that sends one email inline (server-side factory)."""
+    app = create_app(get_config())
+
+    @app.route('/bench/notify', methods=['POST'])
+    def bench_notify():
+        sent = send_email('candidate@example.com', 'Benchmark', 'Hello from the benchmark')
+        return jsonify({'sent': sent}), 200 if sent else 502
+
+    return app
+
+def asgi_app():
+    from a2wsgi import WSGIMiddleware
+    return WSGIMiddleware(wsgi_app(), workers=THREADS)
+
+def wait_until_up(timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/api/test/live')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+def drive(method, path, body, concurrency, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    payload = json.dumps(body) if body is not None else None
+    headers = {'Content-Type': 'application/json'}
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=30)
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+def report(name, scenario, latencies, errors, seconds):
+    if not latencies:
+        print(f"{name:<18} {scenario:<8} no successful requests ({errors} errors)")
+        return
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{name:<18} {scenario:<8} {len(latencies) / seconds:>8.1f} req/s "
+          f"p50 {cuts[49] * 1000:>7.1f}ms  p95 {cuts[94] * 1000:>7.1f}ms  errors {errors}")
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    sink = SMTPSink(delay=SMTP_DELAY).start()
+    tmpdir = tempfile.mkdtemp()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+               MAIL_SERVER='127.0.0.1', MAIL_PORT=str(sink.port), MAIL_USE_TLS='False',
+               MAIL_USE_SSL='False', MAIL_DEFAULT_SENDER='bench@example.com',
+               MAIL_USE_OUTBOX='False', MAIL_POOL_SIZE=str(THREADS),
+               RATELIMIT_ENABLED='False', PASSWORD_HASH_METHOD='pbkdf2:sha256:50000')
+
+    # The config class has already read the environment, so seed through an override
+    config = type('BenchConfig', (get_config(),), {
+        'SQLALCHEMY_DATABASE_URI': env['DATABASE_URL'],
+        'PASSWORD_HASH_METHOD': env['PASSWORD_HASH_METHOD']
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email='bench@example.com', username='bench', password=PASSWORD))
+        db.session.commit()
+        db.engine.dispose()
+
+    scenarios = {
+        'login': ('POST', '/api/auth/login', {'email': 'bench@example.com', 'password': PASSWORD}),
+        'notify': ('POST', '/bench/notify', None)
+    }
+
+    print(f"{concurrency} concurrent clients, {seconds:.0f}s per run, SMTP delay {SMTP_DELAY * 1000:.0f}ms")
+    for name, command in SERVERS.items():
+        server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_up()
+            for scenario, (method, path, body) in scenarios.items():
+                latencies, errors = drive(method, path, body, concurrency, seconds)
+                report(name, scenario, latencies, errors, seconds)
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
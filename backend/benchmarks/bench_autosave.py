@@ -0,0 +1,114 @@
+"""
+Answer autosave throughput: one transaction per save vs the write-behind buffer.
+
+Candidate threads autosave random answers to an existing exam through the
+API for a fixed time, first with AUTOSAVE_BUFFERED=False (each save is
+committed before the response) and then with the buffer. The buffered
+run includes the final flush in its elapsed time. Requires the exam
+models to be registered, an exam with questions and candidates that have
+access tokens and haven't submitted; the in-progress answers of those
+candidates are deleted after each run.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_autosave <exam_id> [threads] [seconds]
+"""
+import logging
+import random
+import sys
+import threading
+import time
+from app import create_app, db
+from app.models import get_model
+from app.utils.autosave import get_autosave_buffer
+from app.utils.exam_snapshot import get_exam_snapshot
+from app.utils.sqlite import write_intent
+from benchmarks.suite import percentile
+
+def load_candidates(exam_id):
+    Candidate = get_model('Candidate')
+    return db.session.execute(
+        db.select(Candidate.id, Candidate.access_token)
+        .where(Candidate.exam_id == exam_id, Candidate.access_token.isnot(None),
+               Candidate.test_end_time.is_(None))
+        .order_by(Candidate.id)
+    ).all()
+
+def clear_answers(candidate_ids):
+    Answer = get_model('Answer')
+    with write_intent():
+        db.session.execute(db.delete(Answer).where(Answer.candidate_id.in_(candidate_ids), Answer.result_id.is_(None)))
+        db.session.commit()
+
+def run(app, exam_id, candidates, choices, threads, seconds, buffered):
+    app.config['AUTOSAVE_BUFFERED'] = buffered
+    buffer = get_autosave_buffer(app)
+    written_before, flushes_before = buffer.rows_written, buffer.flushes
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(slot):
+        client = app.test_client()
+        mine = candidates[slot::threads]
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            _, token = random.choice(mine)
+            question_id = random.choice(list(choices))
+            options = list(choices[question_id])
+            body = {'question_id': question_id, 'selected_option_id': random.choice(options) if options else None}
+            start = time.perf_counter()
+            response = client.put(f'/api/exams/{exam_id}/answers', json=body, headers={'X-Candidate-Token': token})
+            if response.status_code in (200, 202):
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    buffer.flush()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    label = 'buffered' if buffered else 'per-save commit'
+    print(f"{label:<16} {len(latencies) / elapsed:>9.0f} saves/s  p50 {percentile(latencies, 0.5) * 1000:6.2f}ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.2f}ms  {buffer.rows_written - written_before:>7,} rows in "
+          f"{buffer.flushes - flushes_before:>6,} flushes  {errors[0]} errors")
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    exam_id = int(sys.argv[1])
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    app = create_app()
+    logging.disable(logging.WARNING)
+    with app.app_context():
+        if get_model('Exam') is None or get_model('Answer') is None:
+            print("Exam models are not available.")
+            return
+        snapshot = get_exam_snapshot(exam_id)
+        candidates = load_candidates(exam_id)
+        if snapshot is None or not snapshot.choices or len(candidates) < threads:
+            print(f"Exam {exam_id} needs questions and at least {threads} candidates with access tokens.")
+            return
+        candidate_ids = [candidate_id for candidate_id, _ in candidates]
+        # Don't hold a read snapshot open while the candidates write
+        db.session.commit()
+        print(f"{len(candidates):,} candidates, {len(snapshot.choices)} questions, {threads} threads, {seconds:g}s")
+
+        for buffered in (False, True):
+            run(app, exam_id, candidates, snapshot.choices, threads, seconds, buffered)
+            clear_answers(candidate_ids)
+
+if __name__ == '__main__':
+    main()
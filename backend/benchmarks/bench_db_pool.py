@@ -0,0 +1,107 @@
+"""
+Concurrent login load test against the database connection pool.
+
+Runs logins from many threads at once through the WSGI app and reports
+throughput, errors, pool timeouts, checkout wait times and the peak number
+of checked-out connections. With a pool of ``size + overflow`` connections
+smaller than the number of threads, no login should fail with a pool
+timeout.
+
+Run from the backend directory (defaults to a temporary SQLite file using
+the instrumented pool; pass a PostgreSQL URL to test a real server):
+
+    python -m benchmarks.bench_db_pool [threads] [logins_per_thread] [database_url]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app, db
+from app.config import ProductionConfig
+from app.models.user import User
+from app.utils.db_pool import InstrumentedQueuePool, engine_options, pool_stats
+
+USERS = 20
+PASSWORD = 'correct horse battery staple'
+
+def make_app(database_url):
+    class BenchConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        RATELIMIT_ENABLED = False
+        DB_POOL_SIZE = 2
+        DB_MAX_OVERFLOW = 2
+        DB_POOL_TIMEOUT = 5
+
+    options = engine_options({key: getattr(BenchConfig, key) for key in dir(BenchConfig) if key.isupper()})
+    if not options:
+        # SQLite: apply the same pool settings so the test exercises the pool
+        options = {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': BenchConfig.DB_POOL_SIZE,
+            'max_overflow': BenchConfig.DB_MAX_OVERFLOW,
+            'pool_timeout': BenchConfig.DB_POOL_TIMEOUT,
+            'connect_args': {'check_same_thread': False}
+        }
+    BenchConfig.SQLALCHEMY_ENGINE_OPTIONS = options
+    return create_app(BenchConfig)
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    tmpdir = tempfile.mkdtemp()
+    database_url = sys.argv[3] if len(sys.argv) > 3 else f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    app = make_app(database_url)
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:100000'
+    with app.app_context():
+        db.create_all()
+        for i in range(USERS):
+            if not User.query.filter_by(email=f'bench{i}@example.com').first():
+                db.session.add(User(email=f'bench{i}@example.com', username=f'bench{i}', password=PASSWORD))
+        db.session.commit()
+        engine = db.engine
+        engine.dispose()
+
+    statuses = {}
+    status_lock = threading.Lock()
+    peak = {'checked_out': 0}
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak['checked_out'] = max(peak['checked_out'], engine.pool.checkedout())
+            time.sleep(0.001)
+
+    def worker(slot):
+        client = app.test_client()
+        for n in range(per_thread):
+            response = client.post('/api/auth/login', json={
+                'email': f'bench{(slot + n) % USERS}@example.com', 'password': PASSWORD
+            })
+            with status_lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    total = threads * per_thread
+    stats = pool_stats(engine)
+    print(f"database          {engine.url.render_as_string(hide_password=True)}")
+    print(f"threads           {threads}")
+    print(f"logins            {total} in {elapsed:.2f}s ({total / elapsed:.1f}/s)")
+    print(f"status codes      {dict(sorted(statuses.items()))}")
+    print(f"pool              size={stats.get('size')} max_overflow={stats.get('max_overflow')}")
+    print(f"peak checked out  {peak['checked_out']}")
+    print(f"checkouts         {stats.get('checkouts')} (timeouts: {stats.get('timeouts')})")
+    print(f"checkout wait     avg {stats.get('wait_seconds_avg', 0) * 1000:.2f}ms, "
+          f"max {stats.get('wait_seconds_max', 0) * 1000:.2f}ms")
+
+if __name__ == '__main__':
+    main()
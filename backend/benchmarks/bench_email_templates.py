@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for email rendering: inline f-strings vs compiled templates.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_email_templates
+"""
+import time
+from types import SimpleNamespace
+from app import create_app
+from app.config import TestingConfig
+from app.utils.email import InvitationTemplate
+from app.utils.templates import EmailTemplate
+
+ITERATIONS = 20000
+
+def legacy_invitation(candidate, exam_url):
+    """The per-candidate f-string rendering used before the template layer."""
+    body = f"""
+    Hello {candidate.name},
+    
+    You have been invited to complete an online assessment.
+    
+    Please click the link below to access your assessment:
+    {exam_url}
+    
+    This link is unique to you and should not be shared with others.
+    
+    The assessment will take approximately {candidate.exam.duration_minutes} minutes to complete.
+    Once you start the assessment, you must complete it in one session.
+    
+    Good luck!
+    """
+    html = f"""
+    <html>
+      <body>
+        <p>Hello {candidate.name},</p>
+        <p>You have been invited to complete an online assessment.</p>
+        <p>Please click the link below to access your assessment:</p>
+        <p><a href="{exam_url}">{exam_url}</a></p>
+        <p>This link is unique to you and should not be shared with others.</p>
+        <p>The assessment will take approximately {candidate.exam.duration_minutes} minutes to complete.
+        Once you start the assessment, you must complete it in one session.</p>
+        <p>Good luck!</p>
+      </body>
+    </html>
+    """
+    return body, html
+
+def legacy_admin_notification(result):
+    """The admin notification f-strings, including the double open-ended scan."""
+    candidate = result.candidate
+    exam = result.exam
+    body = f"""
+    {candidate.name} ({candidate.email}) has completed the assessment: {exam.title}.
+    Score: {result.score:.2f}%
+    Status: {"Passed" if result.passed else "Failed"}
+    {"This assessment contains open-ended questions that require manual evaluation." if any(a.question.question_type == 'open_ended' for a in result.answers) else ""}
+    """
+    html = f"""
+    <p><strong>{candidate.name}</strong> ({candidate.email}) has completed the assessment: <strong>{exam.title}</strong>.</p>
+    <p>Score: <strong>{result.score:.2f}%</strong></p>
+    <p>Status: <strong>{"Passed" if result.passed else "Failed"}</strong></p>
+    {f"<p><em>This assessment contains open-ended questions that require manual evaluation.</em></p>" if any(a.question.question_type == 'open_ended' for a in result.answers) else ""}
+    """
+    return body, html
+
+def measure(label, fn):
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {ITERATIONS / elapsed:>12,.0f} renders/sec")
+
+def main():
+    app = create_app(TestingConfig)
+    exam = SimpleNamespace(title='Backend Engineering', duration_minutes=45)
+    candidate = SimpleNamespace(name='Ada Lovelace', email='ada@example.com', exam=exam)
+    questions = [SimpleNamespace(question_type='multiple_choice') for _ in range(99)]
+    questions.append(SimpleNamespace(question_type='open_ended'))
+    result = SimpleNamespace(candidate=candidate, exam=exam, score=87.5, passed=True,
+                             answers=[SimpleNamespace(question=q) for q in questions])
+
+    with app.app_context():
+        measure('invitation, f-string per candidate',
+                lambda i: legacy_invitation(candidate, f'https://example.com/exam/{i}'))
+        template = InvitationTemplate(exam)
+        measure('invitation, compiled per-exam template',
+                lambda i: template.render(candidate.name, f'https://example.com/exam/{i}'))
+
+        measure('admin notification, f-string + 2 scans',
+                lambda i: legacy_admin_notification(result))
+        admin = EmailTemplate('admin_notification')
+        measure('admin notification, compiled template',
+                lambda i: admin.render(candidate_name=candidate.name, candidate_email=candidate.email,
+                                       exam_title=exam.title, score=result.score,
+                                       passed=result.passed, has_open_ended=True))
+
+if __name__ == '__main__':
+    main()
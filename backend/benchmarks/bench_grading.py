@@ -0,0 +1,81 @@
+"""
+Grading throughput: NumPy vs pure Python, and a full re-grade of an exam.
+
+Loads the answer key and every answer of an existing exam once, times both
+grading implementations on the same in-memory rows (compute only), then
+runs ``grade_exam`` end to end: once from a cleared state (every answer and
+result written) and once more as a no-op re-grade. Requires the exam models
+to be registered and a populated database; the clearing step modifies the
+exam's answers and results.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_grading <exam_id>
+"""
+import sys
+import time
+from app import create_app, db
+from app.models import get_model
+from app.utils.grading import (AnswerKey, _answer_columns, _grade_chunk_numpy, _grade_chunk_python, _models,
+                               _numpy, grade_exam)
+
+def load_rows(exam, models):
+    Result = models['Result']
+    result_ids = db.select(Result.id).where(Result.exam == exam)
+    results = db.session.execute(result_ids.add_columns(Result.score, Result.passed).order_by(Result.id)).all()
+    columns = _answer_columns(models)
+    answers = db.session.execute(db.select(*columns).where(columns[1].in_(result_ids.scalar_subquery()))).all()
+    return results, answers
+
+def clear_grades(exam, models):
+    Result, Answer = models['Result'], models['Answer']
+    result_ids = db.select(Result.id).where(Result.exam == exam).scalar_subquery()
+    db.session.execute(db.update(Answer).where(_answer_columns(models)[1].in_(result_ids))
+                       .values(is_correct=None, earned_points=None)
+                       .execution_options(synchronize_session=False))
+    db.session.execute(db.update(Result).where(Result.exam == exam)
+                       .values(score=None, passed=None)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    app = create_app()
+    with app.app_context():
+        Exam = get_model('Exam')
+        if Exam is None or get_model('Result') is None:
+            print("Exam models are not available.")
+            return
+        exam = db.session.get(Exam, int(sys.argv[1]))
+        if exam is None:
+            print("Exam not found.")
+            return
+
+        models = _models()
+        key = AnswerKey.load(exam, models)
+        results, answers = load_rows(exam, models)
+        passing = exam.passing_score or 0
+        print(f"{len(results):,} results, {len(answers):,} answers, {len(key.points)} questions")
+
+        np = _numpy()
+        implementations = [('python', lambda: _grade_chunk_python(key, answers, results, passing))]
+        if np is not None:
+            implementations.append(('numpy', lambda: _grade_chunk_numpy(np, key, answers, results, passing)))
+        for label, grade in implementations:
+            start = time.perf_counter()
+            grade()
+            elapsed = time.perf_counter() - start
+            print(f"compute {label:<7} {elapsed:>8.3f}s {len(answers) / elapsed:>14,.0f} answers/sec")
+
+        clear_grades(exam, models)
+        summary = grade_exam(exam)
+        print(f"grade   (all rows written) {summary['seconds']:>8.3f}s  "
+              f"{summary['answers_updated']:,} answers, {summary['results_updated']:,} results updated")
+        summary = grade_exam(exam)
+        print(f"regrade (no changes)       {summary['seconds']:>8.3f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+JSON serialization and response compression on realistic payloads.
+
+Builds in-memory payloads shaped like the API's real responses (a page of
+``User.to_dict()`` rows and a ``result_to_dict()`` export of graded
+results, datetimes included), then times:
+
+- ``dumps`` and ``response`` with the stdlib provider and with orjson
+  (when installed), compact as in production;
+- compressing each serialized payload with gzip at a few levels and with
+  brotli (when installed), with the resulting sizes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_json [users] [results]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from app import create_app
+from app.config import TestingConfig
+from app.utils.compression import Compressor, brotli
+from app.utils.json_provider import AppJSONProvider, OrjsonProvider, orjson
+
+def users_payload(count):
+    now = datetime.utcnow()
+    return {'users': [{
+        'id': i,
+        'email': f'user{i}@example.com',
+        'username': f'user{i}',
+        'is_admin': i % 50 == 0,
+        'created_at': now - timedelta(days=i % 400, seconds=i),
+        'updated_at': now - timedelta(seconds=i)
+    } for i in range(1, count + 1)]}
+
+def results_payload(count, questions=20):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    results = []
+    for i in range(1, count + 1):
+        answers = [{
+            'question': {'id': q, 'text': f'Question {q}: which of the following best describes option handling?',
+                         'question_type': 'multiple_choice', 'points': 5},
+            'answer': {'id': i * questions + q, 'is_correct': rng.random() < 0.7, 'earned_points': 5,
+                       'selected_option': {'id': q * 4 + rng.randrange(4), 'text': 'An option of average length',
+                                           'is_correct': False}}
+        } for q in range(1, questions + 1)]
+        results.append({
+            'exam': {'id': 1, 'title': 'Backend engineering assessment',
+                     'description': 'Covers HTTP, databases and Python.', 'passing_score': 70},
+            'candidate': {'id': i, 'name': f'Candidate {i}', 'email': f'candidate{i}@example.com',
+                          'test_start_time': now - timedelta(hours=1, minutes=i % 60), 'test_end_time': now},
+            'result': {'id': i, 'score': round(rng.uniform(20, 100), 2), 'passed': rng.random() < 0.6,
+                       'feedback': None, 'created_at': now},
+            'answers': answers
+        })
+    return results
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_serialization(app, payloads, repeat):
+    providers = [AppJSONProvider(app)]
+    if orjson is not None:
+        providers.append(OrjsonProvider(app))
+    print(f"{'payload':<10} {'provider':<16} {'dumps':>10} {'response':>10} {'bytes':>12}")
+    for name, payload in payloads.items():
+        for provider in providers:
+            body = provider.dumps(payload, separators=(',', ':'))
+            dumps = timed(lambda: provider.dumps(payload, separators=(',', ':')), repeat)
+            response = timed(lambda: provider.response(payload), repeat)
+            print(f"{name:<10} {type(provider).__name__:<16} {dumps * 1000:>8.1f}ms {response * 1000:>8.1f}ms "
+                  f"{len(body.encode()):>12,}")
+
+def bench_compression(app, payloads, repeat):
+    settings = [('gzip', level, Compressor(gzip_level=level)) for level in (1, 6, 9)]
+    if brotli is not None:
+        settings += [('br', quality, Compressor(brotli_quality=quality)) for quality in (1, 4, 9)]
+    print(f"\n{'payload':<10} {'encoding':<10} {'time':>10} {'bytes':>12} {'ratio':>7}")
+    for name, payload in payloads.items():
+        data = app.json.dumps(payload, separators=(',', ':')).encode()
+        print(f"{name:<10} {'identity':<10} {'':>10} {len(data):>12,}")
+        for encoding, level, compressor in settings:
+            compressed = compressor.compress(data, encoding)
+            elapsed = timed(lambda: compressor.compress(data, encoding), repeat)
+            print(f"{name:<10} {f'{encoding}-{level}':<10} {elapsed * 1000:>8.1f}ms {len(compressed):>12,} "
+                  f"{len(data) / len(compressed):>6.1f}x")
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    results = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    app = create_app(TestingConfig)
+    payloads = {'users': users_payload(users), 'results': results_payload(results)}
+
+    print(f"{users:,} users, {results:,} results of 20 answers; best of 5"
+          f"{'' if orjson is not None else ' (orjson not installed)'}\n")
+    with app.app_context():
+        bench_serialization(app, payloads, 5)
+        bench_compression(app, payloads, 5)
+    if brotli is None:
+        print("\nbrotli is not installed; only gzip was measured.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Password verification throughput per hashing method.
+
+Measures verifications/sec on one thread and on the bounded hashing
+executor, which approximates logins/sec per core and per worker process.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_password_hashing [seconds]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app
+from app.config import TestingConfig
+from app.utils import passwords
+
+METHODS = ['pbkdf2:sha256:600000', 'scrypt:32768:8:1', 'scrypt:16384:8:1', 'argon2']
+
+def throughput(fn, seconds, threads=1):
+    deadline = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def loop(slot):
+        while time.perf_counter() < deadline:
+            fn()
+            counts[slot] += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(loop, range(threads)))
+    return sum(counts) / seconds
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    cores = os.cpu_count() or 1
+    app = create_app(TestingConfig)
+
+    print(f"{'method':<24} {'1 thread':>12} {f'{cores} threads':>12} {'per core':>12}")
+    for method in METHODS:
+        app.config['PASSWORD_HASH_METHOD'] = method
+        with app.app_context():
+            try:
+                pw_hash = passwords.hash_password('correct horse battery staple')
+            except RuntimeError as e:
+                print(f"{method:<24} skipped: {e}")
+                continue
+
+        def verify():
+            with app.app_context():
+                passwords.verify_password(pw_hash, 'correct horse battery staple')
+
+        single = throughput(verify, seconds)
+        parallel = throughput(verify, seconds, threads=cores)
+        print(f"{method:<24} {single:>10.1f}/s {parallel:>10.1f}/s {parallel / cores:>10.1f}/s")
+
+if __name__ == '__main__':
+    main()
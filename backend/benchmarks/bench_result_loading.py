@@ -0,0 +1,68 @@
+"""
+Query-count and latency benchmark for loading a result for export.
+
+Compares plain lazy loading with ``load_result`` on an existing result.
+Requires the exam models to be registered and a populated database.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_result_loading <result_id> [iterations]
+"""
+import sys
+import time
+from sqlalchemy import event
+from app import create_app, db
+from app.models import get_model
+from app.utils.export import export_to_csv
+from app.utils.results import load_result
+
+class QueryCounter:
+    """Count statements executed on an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+def lazy_load(result_id):
+    return db.session.get(get_model('Result'), result_id)
+
+def measure(label, loader, result_id, iterations):
+    queries = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        db.session.expunge_all()
+        with QueryCounter(db.engine) as counter:
+            export_to_csv(loader(result_id))
+        queries = counter.count
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {queries:>6} queries/export {iterations / elapsed:>10,.1f} exports/sec")
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    result_id = int(sys.argv[1])
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    app = create_app()
+    with app.app_context():
+        if get_model('Result') is None:
+            print("Exam models are not available.")
+            return
+
+        measure('lazy loading', lazy_load, result_id, iterations)
+        measure('load_result', load_result, result_id, iterations)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Concurrent writes to one SQLite file from several worker processes.
+
+Each process plays a gunicorn worker and builds its own app. Two workloads
+are run, first with stock SQLite settings (SQLITE_TUNING=False) and then
+with the WAL/busy-timeout/BEGIN IMMEDIATE mode:
+
+- ``api``: registrations through the API (two reads, then an insert per
+  request) mixed with user listings
+- ``batch``: invitation-style transactions that read, queue several outbox
+  rows and update them before committing, while one process streams an
+  export of the outbox table (a long read transaction, like the result
+  exports)
+
+Throughput is reported together with the number of operations that failed
+with ``database is locked``.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_sqlite_concurrency [processes] [requests_per_process]
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from app import create_app, db
+from sqlalchemy.exc import OperationalError
+from app.config import Config
+from app.models.email_outbox import EmailOutbox
+from app.utils.outbox import enqueue_emails
+from app.utils.sqlite import write_intent
+
+def make_app(database_url, tuning):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLITE_TUNING = tuning
+        RATELIMIT_ENABLED = False
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1'
+    return create_app(BenchConfig)
+
+def batch_worker(app, slot, requests):
+    statuses = {}
+    for n in range(requests):
+        with app.app_context(), write_intent():
+            try:
+                db.session.execute(db.select(db.func.count()).select_from(EmailOutbox)).scalar()
+                enqueue_emails([
+                    {'recipient': f'w{slot}-{n}-{i}@example.com', 'subject': 'Invitation', 'body': 'Hello'}
+                    for i in range(5)
+                ])
+                # Stand-in for per-batch work between writes (rendering, building rows)
+                time.sleep(0.002)
+                db.session.execute(
+                    db.update(EmailOutbox)
+                    .where(EmailOutbox.recipient.like(f'w{slot}-{n}-%'))
+                    .values(status=EmailOutbox.STATUS_PENDING)
+                )
+                db.session.commit()
+                status = 'ok'
+            except OperationalError:
+                db.session.rollback()
+                status = 'locked'
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+def export_reader(app):
+    """Stream the outbox slowly, holding one read transaction for several seconds."""
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(EmailOutbox.id, EmailOutbox.recipient).execution_options(yield_per=100)
+        )
+        for partition in rows.partitions():
+            time.sleep(0.2)
+        db.session.rollback()
+    return {'export': 1}
+
+def worker(args):
+    database_url, tuning, workload, slot, requests = args
+    logging.disable(logging.CRITICAL)
+    app = make_app(database_url, tuning)
+    if workload == 'batch':
+        if slot == 0:
+            return export_reader(app)
+        return batch_worker(app, slot, requests)
+
+    client = app.test_client()
+    statuses = {}
+    for n in range(requests):
+        if n % 4 == 3:
+            response = client.get('/api/test/users?limit=50')
+        else:
+            response = client.post('/api/auth/register', json={
+                'email': f'w{slot}-{n}@example.com', 'username': f'w{slot}-{n}', 'password': 'secret'
+            })
+        # Consume and close the (streamed) body like a real server, ending the request
+        response.get_data()
+        response.close()
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return statuses
+
+def run(processes, requests, tuning, workload):
+    tmpdir = tempfile.mkdtemp()
+    database_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    app = make_app(database_url, tuning)
+    with app.app_context():
+        db.create_all()
+        if workload == 'batch':
+            enqueue_emails([
+                {'recipient': f'seed-{i}@example.com', 'subject': 'Seed', 'body': 'Hello'}
+                for i in range(4000)
+            ])
+            db.session.commit()
+        db.engine.dispose()
+
+    ctx = multiprocessing.get_context('spawn')
+    start = time.perf_counter()
+    with ctx.Pool(processes) as pool:
+        results = pool.map(worker, [(database_url, tuning, workload, slot, requests) for slot in range(processes)])
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for result in results:
+        for status, count in result.items():
+            statuses[status] = statuses.get(status, 0) + count
+    total = sum(count for status, count in statuses.items() if status != 'export')
+    errors = sum(count for status, count in statuses.items() if status == 'locked' or (isinstance(status, int) and status >= 500))
+    label = f"{workload} {'tuned (WAL)' if tuning else 'stock'}"
+    print(f"{label:<18} {total / elapsed:>10.1f} op/s {errors:>8} errors   {statuses}")
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    logging.disable(logging.CRITICAL)
+    print(f"{processes} processes x {requests} operations")
+    for workload in ('api', 'batch'):
+        run(processes, requests, tuning=False, workload=workload)
+        run(processes, requests, tuning=True, workload=workload)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Application startup time and import-time profile.
+
+Each run starts a fresh interpreter and measures importing the package,
+create_app() and the first request. The median of the runs is reported
+together with the slowest modules from ``python -X importtime``.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup [--runs N] [--top N] [--max-ms MS]
+
+With ``--max-ms`` the script exits non-zero when the median of import plus
+create_app() exceeds the budget, so CI can track startup regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get('/api/test/live')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import': imported - start, 'create_app': created - imported, 'first_request': served - created}))
+"""
+
+def run_probe(env):
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def import_profile(env, top):
+    """Return the ``top`` slowest modules by cumulative import time, in milliseconds."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+                            env=env, check=True, capture_output=True, text=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((int(cumulative) / 1000, depth, name.strip()))
+    # Top-level imports and their direct imports (e.g. app -> flask, sqlalchemy)
+    shallowest = min(depth for _, depth, _ in modules)
+    return sorted((m for m in modules if m[1] <= shallowest + 1), reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Fail if median import + create_app() exceeds this many milliseconds')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'startup.db')}")
+
+    run_probe(env)  # warm the bytecode cache
+    runs = [run_probe(env) for _ in range(args.runs)]
+    medians = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+    startup = medians['import'] + medians['create_app']
+
+    print(f"{'phase':<16} {'median':>10}")
+    for key, value in medians.items():
+        print(f"{key:<16} {value:>8.1f}ms")
+    print(f"{'startup':<16} {startup:>8.1f}ms")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative, _, name in import_profile(env, args.top):
+        print(f"  {cumulative:>8.1f}ms  {name}")
+
+    if args.max_ms is not None and startup > args.max_ms:
+        print(f"\nStartup {startup:.1f}ms exceeds budget of {args.max_ms:.0f}ms")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Admin dashboard statistics: live aggregates vs the rollup tables.
+
+Times computing per-exam counts, pass rates and average scores with
+``COUNT``/``SUM`` queries over the candidates and results tables (what the
+dashboard would otherwise run on every load) against reading them from the
+rollup tables with ``dashboard_stats()``. The rollups are rebuilt first,
+which rewrites the exam_stats and daily_activity tables. Requires the exam
+models to be registered and a populated database.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_stats [repeat]
+"""
+import sys
+import time
+from app import create_app, db
+from app.models import get_model
+from app.utils.stats import dashboard_stats, rebuild_stats, recent_activity
+
+def live_stats():
+    Candidate, Result = get_model('Candidate'), get_model('Result')
+    candidates = db.session.execute(
+        db.select(Candidate.exam_id, db.func.count(),
+                  db.func.count(db.case((Candidate.invitation_sent.is_(True), 1))),
+                  db.func.count(Candidate.test_start_time), db.func.count(Candidate.test_end_time))
+        .group_by(Candidate.exam_id)
+    ).all()
+    results = db.session.execute(
+        db.select(Result.exam_id, db.func.count(Result.score),
+                  db.func.count(db.case((Result.passed.is_(True), 1))), db.func.avg(Result.score))
+        .group_by(Result.exam_id)
+    ).all()
+    return candidates, results
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    app = create_app()
+    with app.app_context():
+        if get_model('Exam') is None or get_model('Result') is None:
+            print("Exam models are not available.")
+            return
+        Candidate, Result = get_model('Candidate'), get_model('Result')
+        candidates = db.session.execute(db.select(db.func.count()).select_from(Candidate)).scalar()
+        results = db.session.execute(db.select(db.func.count()).select_from(Result)).scalar()
+        print(f"{candidates:,} candidates, {results:,} results; median of {repeat}")
+
+        start = time.perf_counter()
+        summary = rebuild_stats()
+        print(f"rebuild_stats        {time.perf_counter() - start:>9.3f}s  ({summary['exams']} exams, "
+              f"{summary['days']} days)")
+
+        live = timed(live_stats, repeat)
+        rollup = timed(dashboard_stats, repeat)
+        activity = timed(lambda: recent_activity(30), repeat)
+        print(f"live aggregates      {live * 1000:>9.2f}ms")
+        print(f"dashboard_stats()    {rollup * 1000:>9.2f}ms  ({live / rollup:.0f}x faster)")
+        print(f"recent_activity(30)  {activity * 1000:>9.2f}ms")
+
+if __name__ == '__main__':
+    main()
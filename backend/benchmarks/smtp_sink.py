@@ -0,0 +1,67 @@
+"""
+Minimal local SMTP server for benchmarks.
+
+Accepts every message and discards it, optionally waiting ``delay``
+seconds before acknowledging each one to simulate a remote mail server.
+"""
+import socketserver
+import threading
+import time
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(b"220 smtp-sink ready\r\n")
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    if self.server.delay:
+                        time.sleep(self.server.delay)
+                    with self.server.lock:
+                        self.server.messages += 1
+                    self.wfile.write(b"250 OK\r\n")
+                continue
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.wfile.write(b"250 smtp-sink\r\n")
+            elif command == b"DATA":
+                in_data = True
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP sink listening on ``127.0.0.1``.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free port
+        delay (float): Seconds to wait before acknowledging each message
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+    # Pools open many connections at once; the default backlog of 5 drops some
+    request_queue_size = 128
+
+    def __init__(self, port=0, delay=0.0):
+        super().__init__(('127.0.0.1', port), _SMTPHandler)
+        self.delay = delay
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve in a daemon thread and return self."""
+        threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True).start()
+        return self
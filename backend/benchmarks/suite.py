@@ -0,0 +1,377 @@
+"""
+API benchmark suite: latency percentiles and throughput per endpoint.
+
+Each scenario is driven by concurrent keep-alive clients for a fixed time
+and reports requests/sec and p50/p95/p99 latency:
+
+- ``login``: POST /api/auth/login (database read + password hash)
+- ``validate-token``: GET /api/auth/validate-token
+- ``me``: GET /api/auth/me
+- ``system-info``: GET /api/test/system-info
+- ``export``: GET /api/admin/exams/<id>/results/export (CSV stream)
+- ``bulk-email``: POST /api/admin/exams/<id>/invitations with ``resend``,
+  delivered inline to a local SMTP sink (one request at a time)
+
+Targets:
+
+- ``inprocess``: ``create_app(TestingConfig)`` on a temporary SQLite file,
+  driven through the Flask test client (no network or server overhead)
+- ``gunicorn``: the same app under a local gunicorn (gthread workers),
+  driven over HTTP
+
+The export and bulk-email scenarios need the exam models and an existing
+exam, so they only run with ``--database``, ``--email``, ``--password``
+(an admin account) and ``--exam-id``. Without ``--database`` a temporary
+database with one admin user is created.
+
+``--save`` writes the results as a baseline (``<target>.json`` in
+``benchmarks/baselines`` or ``--baseline-dir``); ``--compare`` checks a run
+against it and exits with status 1 when a scenario's p95 latency rises, or
+its throughput falls, by more than ``--tolerance``. Baselines are only
+comparable between runs on the same machine with the same settings.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite [--target inprocess|gunicorn|all] [--seconds 5]
+        [--concurrency 8] [--scenarios login,me] [--save] [--compare]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from app import create_app, db
+from app.config import TestingConfig, get_config
+from app.models.user import User
+from benchmarks.smtp_sink import SMTPSink
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+BENCH_EMAIL = 'bench-admin@example.com'
+BENCH_PASSWORD = 'correct horse battery staple'
+
+Scenario = namedtuple('Scenario', 'name method path body auth needs_exam max_concurrency')
+
+SCENARIOS = [
+    Scenario('login', 'POST', '/api/auth/login', 'credentials', False, False, None),
+    Scenario('validate-token', 'GET', '/api/auth/validate-token', None, True, False, None),
+    Scenario('me', 'GET', '/api/auth/me', None, True, False, None),
+    Scenario('system-info', 'GET', '/api/test/system-info', None, False, False, None),
+    Scenario('export', 'GET', '/api/admin/exams/{exam_id}/results/export?format=csv', None, True, True, None),
+    Scenario('bulk-email', 'POST', '/api/admin/exams/{exam_id}/invitations', {'resend': True}, True, True, 1),
+]
+
+# Settings shared by both targets: inline email to the sink, no throttling,
+# no sampled access logging
+BENCH_SETTINGS = {
+    'JWT_SECRET_KEY': 'benchmark-only-jwt-secret-key-0123456789',
+    'MAIL_USE_TLS': False,
+    'MAIL_USE_SSL': False,
+    'MAIL_DEFAULT_SENDER': 'bench@example.com',
+    'MAIL_USE_OUTBOX': False,
+    'RATELIMIT_ENABLED': False,
+    'LOG_SAMPLE_RATE': 0.0,
+}
+
+
+class InProcessClient:
+    """Flask test client with the interface of ``HTTPClient``."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        data = response.get_data()
+        response.close()
+        return response.status_code, data
+
+    def close(self):
+        pass
+
+
+class HTTPClient:
+    """Keep-alive HTTP client that reconnects after a failed request."""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            return 0, b''
+
+    def close(self):
+        self.conn.close()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def drive(make_client, request_args, concurrency, seconds):
+    """
+    Run one scenario with ``concurrency`` clients for ``seconds``.
+
+    Returns:
+        dict: requests, errors, rps and p50/p95/p99 latency in milliseconds
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = make_client()
+        local = []
+        failed = 0
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status, _ = client.request(*request_args)
+                if 200 <= status < 400:
+                    local.append(time.perf_counter() - start)
+                else:
+                    failed += 1
+        finally:
+            client.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'concurrency': concurrency,
+        'rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+def run_scenarios(make_client, scenarios, options):
+    """Log in once, then warm up and drive every scenario in turn."""
+    client = make_client()
+    credentials = {'email': options.email, 'password': options.password}
+    status, body = client.request('POST', '/api/auth/login', credentials)
+    client.close()
+    if status != 200:
+        raise RuntimeError(f"Benchmark login failed with status {status}: {body[:200]!r}")
+    auth = {'Authorization': f"Bearer {json.loads(body)['access_token']}"}
+
+    results = {}
+    for scenario in scenarios:
+        path = scenario.path.format(exam_id=options.exam_id)
+        body = credentials if scenario.body == 'credentials' else scenario.body
+        request_args = (scenario.method, path, body, auth if scenario.auth else None)
+        concurrency = min(options.concurrency, scenario.max_concurrency or options.concurrency)
+
+        if options.warmup:
+            drive(make_client, request_args, concurrency, options.warmup)
+        results[scenario.name] = result = drive(make_client, request_args, concurrency, options.seconds)
+        print(f"  {scenario.name:<15} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.1f}ms  "
+              f"p95 {result['p95_ms']:>8.1f}ms  p99 {result['p99_ms']:>8.1f}ms  "
+              f"errors {result['errors']}  (x{concurrency})")
+    return results
+
+
+def bench_config(database_url, smtp_port):
+    """TestingConfig pointed at the benchmark database and SMTP sink."""
+    return type('BenchConfig', (TestingConfig,), dict(
+        BENCH_SETTINGS,
+        SQLALCHEMY_DATABASE_URI=database_url,
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=smtp_port
+    ))
+
+def seed_database(database_url, smtp_port):
+    """Create the schema and an admin user in a fresh benchmark database."""
+    app = create_app(bench_config(database_url, smtp_port))
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email=BENCH_EMAIL, username='bench-admin', password=BENCH_PASSWORD, is_admin=True))
+        db.session.commit()
+        db.engine.dispose()
+
+def server_app():
+    """App factory for the gunicorn target; settings come from the environment."""
+    return create_app(get_config())
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/test/live')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start")
+
+def run_inprocess(scenarios, options, database_url, smtp_port):
+    app = create_app(bench_config(database_url, smtp_port))
+    try:
+        return run_scenarios(lambda: InProcessClient(app), scenarios, options)
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+
+def run_gunicorn(scenarios, options, database_url, smtp_port):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, MAIL_SERVER='127.0.0.1', MAIL_PORT=str(smtp_port))
+    env.update({key: str(value) for key, value in BENCH_SETTINGS.items()})
+    command = ['gunicorn', '--workers', str(options.workers), '--worker-class', 'gthread',
+               '--threads', str(options.threads), '--bind', f'127.0.0.1:{port}',
+               'benchmarks.suite:server_app()']
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port)
+        return run_scenarios(lambda: HTTPClient(port), scenarios, options)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def baseline_path(options, target):
+    return os.path.join(options.baseline_dir, f'{target}.json')
+
+def save_baseline(path, target, results, options):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'target': target,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'seconds': options.seconds,
+            'concurrency': options.concurrency,
+            'results': results
+        }, f, indent=2)
+    print(f"  baseline saved to {path}")
+
+def compare_baseline(path, results, tolerance):
+    """Print changes against a saved baseline and return the regressed scenario names."""
+    if not os.path.exists(path):
+        print(f"  no baseline at {path}")
+        return []
+    with open(path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before or not before['rps'] or not before['p95_ms']:
+            continue
+        p95_change = result['p95_ms'] / before['p95_ms'] - 1
+        rps_change = result['rps'] / before['rps'] - 1
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<15} p95 {p95_change:>+7.1%}  req/s {rps_change:>+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process and under gunicorn.")
+    parser.add_argument('--target', choices=('inprocess', 'gunicorn', 'all'), default='inprocess')
+    parser.add_argument('--scenarios', help="Comma-separated scenario names (default: all that can run)")
+    parser.add_argument('--seconds', type=float, default=5.0, help="Measured seconds per scenario")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument('--database', help="Existing database URL (default: a fresh temporary SQLite file)")
+    parser.add_argument('--email', default=BENCH_EMAIL, help="Admin account to benchmark with")
+    parser.add_argument('--password', default=BENCH_PASSWORD)
+    parser.add_argument('--exam-id', type=int, help="Exam for the export and bulk-email scenarios")
+    parser.add_argument('--smtp-delay', type=float, default=0.0, help="Seconds the SMTP sink takes per message")
+    parser.add_argument('--save', action='store_true', help="Save the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="Compare against the baseline (exit 1 on regression)")
+    parser.add_argument('--baseline-dir', default=BASELINE_DIR,
+                        help="Directory of <target>.json baselines (default: benchmarks/baselines)")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95/throughput change (default 0.2)")
+    return parser.parse_args(argv)
+
+def select_scenarios(options):
+    names = options.scenarios.split(',') if options.scenarios else [s.name for s in SCENARIOS]
+    unknown = set(names) - {s.name for s in SCENARIOS}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    selected = []
+    for scenario in SCENARIOS:
+        if scenario.name not in names:
+            continue
+        if scenario.needs_exam and (options.exam_id is None or options.database is None):
+            print(f"Skipping {scenario.name}: needs --database and --exam-id with the exam models installed")
+            continue
+        selected.append(scenario)
+    return selected
+
+def main(argv=None):
+    options = parse_args(argv)
+    scenarios = select_scenarios(options)
+    targets = ('inprocess', 'gunicorn') if options.target == 'all' else (options.target,)
+
+    sink = SMTPSink(delay=options.smtp_delay).start()
+    database_url = options.database
+    if database_url is None:
+        tmpdir = tempfile.mkdtemp()
+        database_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+        seed_database(database_url, sink.port)
+
+    runners = {'inprocess': run_inprocess, 'gunicorn': run_gunicorn}
+    regressions = []
+    print(f"{options.concurrency} concurrent clients, {options.seconds:g}s per scenario, {os.cpu_count()} CPUs")
+    for target in targets:
+        print(f"{target}:")
+        results = runners[target](scenarios, options, database_url, sink.port)
+        if options.compare:
+            regressions += [f'{target}/{name}' for name in
+                            compare_baseline(baseline_path(options, target), results, options.tolerance)]
+        if options.save:
+            save_baseline(baseline_path(options, target), target, results, options)
+
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import argparse
+import os
+from app import create_app, db
+from app.models import get_model
+from app.utils.columnar_export import COLUMNAR_FORMATS, TABLES, write_columnar
+
+def main():
+    """Export an exam's results and answers as Parquet or Arrow files."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('exam_id', type=int, help='ID of the exam')
+    parser.add_argument('--format', choices=sorted(COLUMNAR_FORMATS), default='parquet')
+    parser.add_argument('--output-dir', default='.', help='Directory for the exported files')
+    parser.add_argument('--batch-size', type=int, help='Rows per row group')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        Exam = get_model('Exam')
+        if Exam is None or get_model('Result') is None:
+            print("Exam models are not available.")
+            return
+
+        exam = db.session.get(Exam, args.exam_id)
+        if not exam:
+            print(f"Exam {args.exam_id} not found.")
+            return
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        for table in TABLES:
+            path = os.path.join(args.output_dir,
+                                f'exam-{exam.id}-{table}.{COLUMNAR_FORMATS[args.format]}')
+            rows = write_columnar(exam, table, path, args.format, args.batch_size)
+            print(f"Wrote {rows} rows to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,34 @@
-from app import create_app, db
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+from app import create_app, db, init_migrations
 from app.models.user import User
 
+# Head of the migration chain when databases were still built with
+# create_all() on startup
+PRE_MIGRATIONS_REVISION = '706de44aab47'
+
 def init_db():
-    """Initialize the database with initial data."""
+    """Create or migrate the database schema, then add initial data."""
     app = create_app()
+    init_migrations(app)
     with app.app_context():
-        # Create tables
-        db.create_all()
+        tables = inspect(db.engine).get_table_names()
+        if not tables:
+            # Fresh database: create every table and mark it as up to date
+            db.create_all()
+            stamp()
+            print("Database schema created.")
+        elif 'alembic_version' not in tables:
+            # Created with create_all() before migrations were tracked. Its
+            # existing tables are never altered by create_all() (e.g. the
+            # users indexes), so mark it at the last revision such databases
+            # already have and migrate from there.
+            stamp(revision=PRE_MIGRATIONS_REVISION)
+            upgrade()
+            print("Database schema migrated.")
+        else:
+            upgrade()
+            print("Database schema migrated.")
         
         # Check if admin user exists
         admin = User.query.filter_by(email='admin@example.com').first()
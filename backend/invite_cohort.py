@@ -0,0 +1,46 @@
+import argparse
+from app import create_app, db
+from app.models import get_model
+from app.utils.invitations import check_exam_url_template, invite_cohort
+
+def main():
+    """Invite a cohort of candidates to an exam from the command line."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('exam_id', type=int, help='ID of the exam')
+    parser.add_argument('--candidate-ids', type=int, nargs='+',
+                        help='Only invite these candidates (default: all candidates of the exam)')
+    parser.add_argument('--url-template',
+                        help='Exam link with {candidate_id} and optionally {exam_id} placeholders '
+                             '(default: EXAM_URL_TEMPLATE)')
+    parser.add_argument('--resend', action='store_true',
+                        help='Also invite candidates that were already invited')
+    parser.add_argument('--batch-size', type=int, help='Candidates per batch')
+    args = parser.parse_args()
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error('--batch-size must be a positive integer')
+    if args.url_template is not None:
+        try:
+            check_exam_url_template(args.url_template)
+        except ValueError as e:
+            parser.error(str(e))
+
+    app = create_app()
+    with app.app_context():
+        Exam = get_model('Exam')
+        if Exam is None or get_model('Candidate') is None:
+            print("Exam models are not available.")
+            return
+
+        exam = db.session.get(Exam, args.exam_id)
+        if not exam:
+            print(f"Exam {args.exam_id} not found.")
+            return
+
+        for progress in invite_cohort(exam, candidate_ids=args.candidate_ids,
+                                      exam_url_template=args.url_template,
+                                      resend=args.resend, batch_size=args.batch_size):
+            print(f"{progress['processed']}/{progress['total']} processed, "
+                  f"{progress['invited']} invited, {progress['failed']} failed")
+
+if __name__ == '__main__':
+    main()
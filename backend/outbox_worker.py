@@ -0,0 +1,16 @@
+from app import create_app
+from app.utils.outbox import OutboxWorker
+
+def run_worker():
+    """Deliver queued emails from the outbox until interrupted."""
+    app = create_app()
+    worker = OutboxWorker(app)
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        print("Stopping outbox worker...")
+    finally:
+        worker.stop()
+
+if __name__ == '__main__':
+    run_worker()
@@ -0,0 +1,22 @@
+import argparse
+from app import create_app
+from app.models import get_model
+from app.utils.stats import rebuild_stats
+
+def main():
+    """Recompute the admin dashboard's stats rollups from the candidates and results tables."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--batch-size', type=int, help='Exams recounted per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if get_model('Exam') is None:
+            print("Exam models are not available.")
+            return
+
+        summary = rebuild_stats(batch_size=args.batch_size)
+        print(f"Rebuilt stats of {summary['exams']} exams and {summary['days']} days of activity.")
+
+if __name__ == '__main__':
+    main()
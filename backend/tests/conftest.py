@@ -0,0 +1,48 @@
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.user import User
+from . import models  # noqa: F401  (registers the exam model stand-ins)
+
+
+def make_config(tmp_path, **overrides):
+    attrs = {
+        # A file rather than :memory:, so every connection sees the same database
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'JWT_SECRET_KEY': 'test-secret-key-that-is-long-enough-for-hs256',
+        'METRICS_ENABLED': False
+    }
+    attrs.update(overrides)
+    return type('Config', (TestingConfig,), attrs)
+
+@pytest.fixture
+def config():
+    """Config overrides for the ``app`` fixture; override this fixture in a module to change them."""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, config):
+    app = create_app(make_config(tmp_path, **config))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        buffer = app.extensions.get('autosave_buffer')
+        if buffer is not None:
+            buffer.stop()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin(app):
+    user = User('admin@example.com', 'admin', 'password', is_admin=True)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def admin_headers(client, admin):
+    response = client.post('/api/auth/login', json={'email': 'admin@example.com', 'password': 'password'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
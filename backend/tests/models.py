@@ -0,0 +1,85 @@
+"""
+Minimal stand-ins for the exam models.
+
+The exam models belong to the application built on the boilerplate; the
+helpers find them by name through ``app.models.get_model``, so tests that
+need them import this module.
+"""
+from datetime import datetime
+from app import db
+
+
+class Exam(db.Model):
+    __tablename__ = 'exams'
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200))
+    description = db.Column(db.Text)
+    duration_minutes = db.Column(db.Integer, default=60)
+    passing_score = db.Column(db.Float)
+    creator_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    creator = db.relationship('User')
+    questions = db.relationship('Question', order_by='Question.id', overlaps='exam')
+
+
+class Question(db.Model):
+    __tablename__ = 'questions'
+    id = db.Column(db.Integer, primary_key=True)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id'))
+    text = db.Column(db.Text)
+    question_type = db.Column(db.String(20), default='multiple_choice')
+    points = db.Column(db.Float, default=1)
+    explanation = db.Column(db.Text)
+    # Deliberately no backref: attaching a question through it leaves the exam untouched
+    exam = db.relationship('Exam', overlaps='questions')
+    options = db.relationship('Option', back_populates='question', order_by='Option.id')
+
+
+class Option(db.Model):
+    __tablename__ = 'options'
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'))
+    text = db.Column(db.Text)
+    is_correct = db.Column(db.Boolean, default=False)
+    question = db.relationship('Question', back_populates='options')
+
+
+class Candidate(db.Model):
+    __tablename__ = 'candidates'
+    id = db.Column(db.Integer, primary_key=True)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id'))
+    name = db.Column(db.String(100))
+    email = db.Column(db.String(120))
+    access_token = db.Column(db.String(64))
+    invitation_sent = db.Column(db.Boolean, default=False)
+    last_invited_at = db.Column(db.DateTime)
+    test_start_time = db.Column(db.DateTime)
+    test_end_time = db.Column(db.DateTime)
+
+
+class Result(db.Model):
+    __tablename__ = 'results'
+    id = db.Column(db.Integer, primary_key=True)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id'))
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id'))
+    score = db.Column(db.Float)
+    passed = db.Column(db.Boolean)
+    feedback = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    exam = db.relationship('Exam')
+    candidate = db.relationship('Candidate')
+    answers = db.relationship('Answer', back_populates='result', order_by='Answer.id')
+
+
+class Answer(db.Model):
+    __tablename__ = 'answers'
+    id = db.Column(db.Integer, primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('results.id'))
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id'))
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'))
+    selected_option_id = db.Column(db.Integer, db.ForeignKey('options.id'))
+    text_response = db.Column(db.Text)
+    is_correct = db.Column(db.Boolean)
+    earned_points = db.Column(db.Float)
+    result = db.relationship('Result', back_populates='answers')
+    question = db.relationship('Question')
+    selected_option = db.relationship('Option')
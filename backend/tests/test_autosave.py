@@ -0,0 +1,120 @@
+"""
+Autosave buffering and the durability of exam submission.
+
+Each worker process has its own ``AutosaveBuffer``; a second buffer on the
+same app stands in for another worker here.
+"""
+from types import SimpleNamespace
+import pytest
+from app import db
+from app.utils.autosave import AutosaveBuffer, get_autosave_buffer
+from .models import Answer, Candidate, Exam, Option, Question
+
+TOKEN = 'candidate-token'
+
+
+@pytest.fixture
+def config():
+    # Flush only when a test asks to
+    return {'AUTOSAVE_FLUSH_INTERVAL': 60}
+
+@pytest.fixture
+def exam(app, admin):
+    """An exam of three questions with two options each, and an invited candidate."""
+    exam = Exam(title='Exam', passing_score=50, creator=admin)
+    for i in range(3):
+        exam.questions.append(Question(text=f'Question {i}', points=1, options=[
+            Option(text='Right', is_correct=True), Option(text='Wrong')
+        ]))
+    db.session.add(exam)
+    db.session.flush()
+    candidate = Candidate(exam_id=exam.id, name='Candidate', access_token=TOKEN)
+    db.session.add(candidate)
+    db.session.commit()
+    exam = SimpleNamespace(id=exam.id, candidate_id=candidate.id,
+                           questions=[question.id for question in exam.questions],
+                           options=[[option.id for option in question.options] for question in exam.questions])
+    # Plain IDs, and no transaction left open in the test's session while
+    # requests and buffers write
+    db.session.rollback()
+    return exam
+
+@pytest.fixture
+def other_worker(app):
+    buffer = AutosaveBuffer(app, flush_interval=60)
+    yield buffer
+    buffer.stop()
+
+def saved_answers():
+    answers = {answer.question_id: (answer.selected_option_id, answer.result_id)
+               for answer in db.session.scalars(db.select(Answer))}
+    db.session.rollback()
+    return answers
+
+def autosave(client, exam, question, option):
+    return client.put(f'/api/exams/{exam.id}/answers', headers={'X-Candidate-Token': TOKEN},
+                      json={'question_id': exam.questions[question], 'selected_option_id': option})
+
+def submit(client, exam, answers):
+    return client.post(f'/api/exams/{exam.id}/submit', headers={'X-Candidate-Token': TOKEN},
+                       json={'answers': [{'question_id': exam.questions[question], 'selected_option_id': option}
+                                         for question, option in answers]})
+
+
+def test_saves_coalesce_until_flushed(app, client, exam):
+    right, wrong = exam.options[0]
+    assert autosave(client, exam, 0, wrong).status_code == 202
+    assert autosave(client, exam, 0, right).status_code == 202
+
+    buffer = get_autosave_buffer()
+    assert buffer.stats()['coalesced'] == 1
+    assert saved_answers() == {}
+    assert buffer.flush() == 1
+    assert saved_answers() == {exam.questions[0]: (right, None)}
+
+def test_submit_writes_answers_buffered_by_another_worker(app, client, exam, other_worker):
+    (right, wrong), (second, _) = exam.options[0], exam.options[1]
+    # Acknowledged by another worker, never flushed there
+    other_worker.save(exam.candidate_id, exam.questions[0], wrong)
+    other_worker.save(exam.candidate_id, exam.questions[1], second)
+
+    response = submit(client, exam, [(0, right), (1, second)])
+    assert response.status_code == 201
+    result_id = response.get_json()['result_id']
+    expected = {exam.questions[0]: (right, result_id), exam.questions[1]: (second, result_id)}
+    assert saved_answers() == expected
+
+    # The other worker's late flush must not touch the submitted exam
+    assert other_worker.flush() == 0
+    assert saved_answers() == expected
+
+def test_final_answers_override_flushed_autosaves(app, client, exam, other_worker):
+    right, wrong = exam.options[0]
+    other_worker.save(exam.candidate_id, exam.questions[0], wrong)
+    other_worker.save(exam.candidate_id, exam.questions[2], exam.options[2][0])
+    assert other_worker.flush() == 2
+
+    response = submit(client, exam, [(0, right)])
+    assert response.status_code == 201
+    result_id = response.get_json()['result_id']
+    # Answers already written and not in the final set are kept
+    assert saved_answers() == {exam.questions[0]: (right, result_id),
+                               exam.questions[2]: (exam.options[2][0], result_id)}
+
+def test_submit_includes_this_workers_pending_saves(app, client, exam):
+    assert autosave(client, exam, 2, exam.options[2][1]).status_code == 202
+
+    response = submit(client, exam, [(0, exam.options[0][0])])
+    assert response.status_code == 201
+    assert set(saved_answers()) == {exam.questions[0], exam.questions[2]}
+    assert get_autosave_buffer().pending() == 0
+
+def test_submit_requires_the_final_answers(app, client, exam):
+    response = client.post(f'/api/exams/{exam.id}/submit', headers={'X-Candidate-Token': TOKEN}, json={})
+    assert response.status_code == 400
+    assert db.session.get(Candidate, exam.candidate_id).test_end_time is None
+
+def test_submit_twice_and_save_after_submit(app, client, exam):
+    assert submit(client, exam, []).status_code == 201
+    assert submit(client, exam, []).status_code == 409
+    assert autosave(client, exam, 0, exam.options[0][0]).status_code == 409
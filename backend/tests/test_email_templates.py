@@ -0,0 +1,19 @@
+"""
+Email templates: prerendered messages match a full render.
+"""
+from types import SimpleNamespace
+from app.utils.email import InvitationTemplate
+from app.utils.templates import EmailTemplate
+
+
+def test_prerendered_invitation_matches_full_render(app):
+    template = InvitationTemplate(SimpleNamespace(duration_minutes=45))
+    full = EmailTemplate('invitation', {'duration_minutes': 45})
+    for name in ('Ada', '<b>Bob & Co</b>'):
+        assert template.render(name, 'https://example.com/exam?t=1&x=2') == \
+            full.render(name=name, exam_url='https://example.com/exam?t=1&x=2')
+
+def test_missing_and_non_string_values(app):
+    text, html = InvitationTemplate(SimpleNamespace(duration_minutes=45)).render(None, 42)
+    assert text.startswith('Hello ,\n')
+    assert '42' in text and '42' in html
@@ -0,0 +1,80 @@
+"""
+Exam content snapshots: ETag revalidation and invalidation on changes.
+"""
+import gzip
+import pytest
+from app import db
+from .models import Candidate, Exam, Option, Question
+
+TOKEN = 'candidate-token'
+
+
+@pytest.fixture
+def exam_id(app, admin):
+    exam = Exam(title='Exam', creator=admin)
+    exam.questions.append(Question(text='Question', options=[Option(text='A', is_correct=True), Option(text='B')]))
+    db.session.add(exam)
+    db.session.flush()
+    db.session.add(Candidate(exam_id=exam.id, access_token=TOKEN))
+    db.session.commit()
+    return exam.id
+
+def content(client, exam_id, **headers):
+    return client.get(f'/api/exams/{exam_id}/content', headers=dict(headers, **{'X-Candidate-Token': TOKEN}))
+
+def question_texts(client, exam_id):
+    return [question['text'] for question in content(client, exam_id).get_json()['questions']]
+
+
+def test_etag_revalidation(app, client, exam_id):
+    response = content(client, exam_id)
+    assert response.status_code == 200
+    assert 'is_correct' not in response.get_data(as_text=True)
+    etag = response.headers['ETag']
+
+    compressed = content(client, exam_id, **{'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == response.data
+
+    for tag in (etag, compressed.headers['ETag']):
+        revalidated = content(client, exam_id, **{'If-None-Match': tag})
+        assert revalidated.status_code == 304
+        assert revalidated.data == b''
+    assert content(client, exam_id, **{'If-None-Match': '"stale"'}).status_code == 200
+
+def test_edit_invalidates_the_snapshot(app, client, exam_id):
+    etag = content(client, exam_id).headers['ETag']
+    db.session.get(Exam, exam_id).questions[0].text = 'Edited'
+    db.session.commit()
+
+    response = content(client, exam_id, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert question_texts(client, exam_id) == ['Edited']
+
+def test_question_added_through_relationship_invalidates(app, client, exam_id):
+    assert question_texts(client, exam_id) == ['Question']
+    exam = db.session.get(Exam, exam_id)
+    db.session.add(Question(exam=exam, text='Second'))
+    db.session.commit()
+    assert question_texts(client, exam_id) == ['Question', 'Second']
+
+    exam = db.session.get(Exam, exam_id)
+    exam.questions.append(Question(text='Third'))
+    db.session.commit()
+    assert question_texts(client, exam_id) == ['Question', 'Second', 'Third']
+
+def test_option_added_through_relationship_invalidates(app, client, exam_id):
+    assert len(content(client, exam_id).get_json()['questions'][0]['options']) == 2
+    question = db.session.get(Exam, exam_id).questions[0]
+    question.options.append(Option(text='C'))
+    db.session.commit()
+    assert len(content(client, exam_id).get_json()['questions'][0]['options']) == 3
+
+def test_rolled_back_change_keeps_the_snapshot(app, client, exam_id):
+    content(client, exam_id)
+    db.session.get(Exam, exam_id).title = 'Renamed'
+    db.session.flush()
+    db.session.rollback()
+    content(client, exam_id)
+    assert app.extensions['exam_snapshots'].stats()['builds'] == 1
@@ -0,0 +1,95 @@
+"""
+Batch grading: the NumPy and pure-Python paths must agree.
+"""
+import random
+import pytest
+from app import db
+from app.utils.grading import grade_exam
+from .models import Answer, Candidate, Exam, Option, Question, Result
+
+pytest.importorskip('numpy')
+
+RESULTS = 30
+
+
+def build_exam(admin, rng, title):
+    exam = Exam(title=title, passing_score=50, creator=admin)
+    for i in range(6):
+        if i % 3 == 2:
+            exam.questions.append(Question(text=f'Essay {i}', question_type='open_ended', points=4))
+        else:
+            exam.questions.append(Question(text=f'Choice {i}', points=rng.choice([1, 2, 2.5]), options=[
+                Option(text='A', is_correct=True), Option(text='B'), Option(text='C', is_correct=i == 0)
+            ]))
+    db.session.add(exam)
+    db.session.flush()
+    return exam
+
+def add_result(exam, rng):
+    candidate = Candidate(exam_id=exam.id, name='Candidate')
+    result = Result(exam=exam, candidate=candidate)
+    for question in exam.questions:
+        if question.options:
+            # Unanswered, or a choice with stale grading left behind
+            option = rng.choice(question.options + [None])
+            result.answers.append(Answer(question=question, selected_option=option,
+                                         is_correct=rng.choice([None, True, False]),
+                                         earned_points=rng.choice([None, 0.0, question.points])))
+        else:
+            result.answers.append(Answer(question=question, text_response='Because',
+                                         earned_points=rng.choice([None, 0.0, 1.5, 4.0])))
+    db.session.add(result)
+
+@pytest.fixture
+def exams(app, admin):
+    """Two exams whose results (and answers) are interleaved in the tables."""
+    rng = random.Random(7)
+    exams = [build_exam(admin, rng, 'Small'), build_exam(admin, rng, 'Large')]
+    for i in range(RESULTS):
+        add_result(exams[0] if i % 5 == 0 else exams[1], rng)
+    db.session.commit()
+    return exams
+
+def snapshot():
+    """Stored grading of every result and answer, to compare and restore."""
+    db.session.expire_all()
+    return (
+        db.session.execute(db.select(Result.id, Result.score, Result.passed).order_by(Result.id)).all(),
+        db.session.execute(db.select(Answer.id, Answer.is_correct, Answer.earned_points).order_by(Answer.id)).all()
+    )
+
+def restore(state):
+    results, answers = state
+    db.session.execute(db.update(Result), [{'id': i, 'score': s, 'passed': p} for i, s, p in results])
+    db.session.execute(db.update(Answer), [{'id': i, 'is_correct': c, 'earned_points': e} for i, c, e in answers])
+    db.session.commit()
+
+
+def test_numpy_and_python_grade_the_same(app, exams):
+    before = snapshot()
+    summaries = {}
+    graded = {}
+    for vectorized in (False, True):
+        restore(before)
+        summaries[vectorized] = [grade_exam(exam, batch_size=4, vectorized=vectorized) for exam in exams]
+        graded[vectorized] = snapshot()
+
+    assert graded[True] == graded[False]
+    assert graded[True] != before
+    for python, vectorized in zip(summaries[False], summaries[True]):
+        assert {k: v for k, v in python.items() if k not in ('seconds', 'vectorized')} == \
+            {k: v for k, v in vectorized.items() if k not in ('seconds', 'vectorized')}
+
+def test_regrading_is_idempotent(app, exams):
+    for exam in exams:
+        grade_exam(exam, vectorized=True)
+    for exam in exams:
+        summary = grade_exam(exam, vectorized=True)
+        assert summary['results_updated'] == summary['answers_updated'] == 0
+
+def test_reads_only_the_exams_answers(app, exams):
+    small = exams[0]
+    summary = grade_exam(small, batch_size=100)
+    # The small exam's results span the whole id range of the large one's
+    assert summary['results'] == RESULTS // 5
+    assert summary['answers'] == RESULTS // 5 * len(small.questions)
@@ -0,0 +1,90 @@
+"""
+JSON providers and negotiated response compression.
+"""
+import gzip
+import json
+from datetime import date, datetime
+import pytest
+from flask import Response, jsonify
+from app import create_app
+from app.utils.json_provider import AppJSONProvider, OrjsonProvider
+from .conftest import make_config
+
+PAYLOAD = {
+    'created_at': datetime(2026, 5, 4, 3, 2, 1, 123456),
+    'day': date(2026, 5, 4),
+    'scores': [1, 2.5, None, True],
+    'nested': {'b': 'x', 'a': [{'id': 1}]}
+}
+ROWS = [{'id': i, 'email': f'user{i}@example.com', 'created_at': datetime(2026, 1, 1)} for i in range(200)]
+
+
+@pytest.fixture
+def routes(app):
+    app.add_url_rule('/rows', 'rows', lambda: jsonify(ROWS))
+    app.add_url_rule('/small', 'small', lambda: jsonify({'ok': True}))
+    app.add_url_rule('/stream', 'stream', lambda: Response(
+        (app.json.dumps(row) + '\n' for row in ROWS), mimetype='application/x-ndjson'))
+    app.add_url_rule('/no-transform', 'no_transform', lambda: Response(
+        json.dumps(ROWS, default=str), mimetype='application/json', headers={'Cache-Control': 'no-transform'}))
+    return app.test_client()
+
+def get(client, path, encoding=None):
+    return client.get(path, headers={'Accept-Encoding': encoding} if encoding else {})
+
+
+@pytest.mark.parametrize('provider_class', [AppJSONProvider, OrjsonProvider])
+def test_providers_write_iso_datetimes(app, provider_class):
+    if provider_class is OrjsonProvider:
+        pytest.importorskip('orjson')
+    provider = provider_class(app)
+    data = json.loads(provider.dumps(PAYLOAD))
+    assert data['created_at'] == '2026-05-04T03:02:01.123456'
+    assert data['day'] == '2026-05-04'
+    assert data['scores'] == [1, 2.5, None, True]
+    assert list(json.loads(provider.dumps(PAYLOAD['nested'], sort_keys=True))) == ['a', 'b']
+    assert provider.loads(provider.dumps(PAYLOAD['nested'])) == PAYLOAD['nested']
+
+def test_orjson_falls_back_for_values_it_cant_encode(app):
+    pytest.importorskip('orjson')
+    provider = OrjsonProvider(app)
+    assert json.loads(provider.dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+    with app.test_request_context():
+        assert provider.response({'big': 2 ** 70}).get_json() == {'big': 2 ** 70}
+
+def test_provider_selection(tmp_path):
+    assert type(create_app(make_config(tmp_path, JSON_PROVIDER='json')).json) is AppJSONProvider
+    with pytest.raises(ValueError):
+        create_app(make_config(tmp_path, JSON_PROVIDER='simplejson'))
+
+def test_large_responses_are_gzipped(routes):
+    plain = get(routes, '/rows')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    compressed = get(routes, '/rows', 'gzip, deflate')
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert int(compressed.headers['Content-Length']) < len(plain.data) / 5
+    assert gzip.decompress(compressed.data) == plain.data
+    assert json.loads(plain.data)[0]['created_at'] == '2026-01-01T00:00:00'
+
+def test_small_and_opted_out_responses_are_not_compressed(routes):
+    assert 'Content-Encoding' not in get(routes, '/small', 'gzip').headers
+    assert 'Content-Encoding' not in get(routes, '/no-transform', 'gzip').headers
+    assert 'Content-Encoding' not in get(routes, '/rows', 'identity').headers
+    assert 'Content-Encoding' not in routes.head('/rows', headers={'Accept-Encoding': 'gzip'}).headers
+
+def test_streamed_responses_are_compressed_as_they_go(routes):
+    plain = get(routes, '/stream')
+    compressed = get(routes, '/stream', 'gzip')
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in compressed.headers
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(plain.data.splitlines()) == len(ROWS)
+
+def test_brotli_is_preferred_when_available(routes):
+    brotli = pytest.importorskip('brotli')
+    plain = get(routes, '/rows')
+    compressed = get(routes, '/rows', 'gzip, br')
+    assert compressed.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(compressed.data) == plain.data
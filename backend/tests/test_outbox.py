@@ -0,0 +1,111 @@
+"""
+Email outbox: deduplicated queuing in the caller's transaction, and
+delivery with retries by the outbox worker.
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.email_outbox import EmailOutbox
+from app.models.user import User
+from app.utils import outbox
+from app.utils.email import dispatch_email
+from app.utils.outbox import OutboxWorker, enqueue_email
+
+
+@pytest.fixture
+def worker(app):
+    worker = OutboxWorker(app, concurrency=1, max_attempts=2, backoff_seconds=30, lease_seconds=60)
+    yield worker
+    worker.stop()
+
+@pytest.fixture
+def deliveries(monkeypatch):
+    """Record delivered emails; set ``fail`` to make deliveries raise."""
+    sent = []
+
+    def deliver_email(recipient, subject, body, html):
+        if deliver_email.fail:
+            raise OSError('SMTP unavailable')
+        sent.append(recipient)
+
+    deliver_email.fail = False
+    deliver_email.sent = sent
+    monkeypatch.setattr(outbox, 'deliver_email', deliver_email)
+    return deliver_email
+
+def queue(recipient='candidate@example.com', dedupe_key=None):
+    message = enqueue_email(recipient, 'Subject', 'Body', dedupe_key=dedupe_key)
+    db.session.commit()
+    return message.id
+
+def reload(message_id):
+    # End the test session's read transaction to see the worker's writes
+    db.session.rollback()
+    return db.session.get(EmailOutbox, message_id)
+
+
+def test_queued_with_the_callers_transaction(app):
+    db.session.add(User('user@example.com', 'user', 'password'))
+    dispatch_email('candidate@example.com', 'Subject', 'Body')
+    db.session.rollback()
+    assert db.session.scalar(db.select(db.func.count()).select_from(EmailOutbox)) == 0
+
+    db.session.add(User('user@example.com', 'user', 'password'))
+    message = dispatch_email('candidate@example.com', 'Subject', 'Body')
+    db.session.commit()
+    assert db.session.get(EmailOutbox, message.id).status == EmailOutbox.STATUS_PENDING
+
+def test_duplicate_key_returns_the_existing_entry(app):
+    first = queue(dedupe_key='result:1')
+    user = User('user@example.com', 'user', 'password')
+    db.session.add(user)
+    assert enqueue_email('other@example.com', 'Subject', 'Body', dedupe_key='result:1').id == first
+
+    db.session.commit()
+    assert db.session.get(User, user.id) is not None
+    assert db.session.scalar(db.select(db.func.count()).select_from(EmailOutbox)) == 1
+
+def test_other_integrity_errors_are_raised(app):
+    queue()
+    with pytest.raises(IntegrityError):
+        enqueue_email(None, 'Subject', 'Body')
+    with pytest.raises(IntegrityError):
+        enqueue_email(None, 'Subject', 'Body', dedupe_key='invite:1')
+
+def test_delivery_marks_sent(app, worker, deliveries):
+    message_id = queue()
+    assert worker.run_once() == 1
+    message = reload(message_id)
+    assert (message.status, message.attempts) == (EmailOutbox.STATUS_SENT, 1)
+    assert deliveries.sent == ['candidate@example.com']
+    assert worker.run_once() == 0
+
+def test_failed_delivery_is_retried_with_backoff_then_given_up(app, worker, deliveries):
+    message_id = queue()
+    deliveries.fail = True
+    assert worker.run_once() == 1
+    message = reload(message_id)
+    assert (message.status, message.attempts) == (EmailOutbox.STATUS_PENDING, 1)
+    assert message.last_error == 'SMTP unavailable'
+    assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=20)
+    # Not due yet
+    assert worker.run_once() == 0
+
+    message.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    assert worker.run_once() == 1
+    message = reload(message_id)
+    assert (message.status, message.attempts) == (EmailOutbox.STATUS_FAILED, 2)
+    assert worker.run_once() == 0
+
+def test_expired_lease_is_reclaimed(app, worker, deliveries):
+    message_id = queue()
+    # Claimed by a worker that crashed before recording the outcome
+    assert worker.claim_batch() == [message_id]
+    assert worker.run_once() == 0
+
+    reload(message_id).locked_at = datetime.utcnow() - timedelta(seconds=61)
+    db.session.commit()
+    assert worker.run_once() == 1
+    assert deliveries.sent == ['candidate@example.com']
@@ -0,0 +1,95 @@
+"""
+Sliding-window rate limiting: window expiry, the stores and the 429
+responses of the login endpoint.
+"""
+from types import SimpleNamespace
+import pytest
+from app import db
+from app.models.user import User
+from app.utils import rate_limit
+from app.utils.rate_limit import MemoryStore, RedisStore, SlidingWindowLimiter
+
+
+@pytest.fixture
+def config():
+    return {'RATELIMIT_LOGIN_IP': '100/60', 'RATELIMIT_LOGIN_EMAIL': '2/60'}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable ``time.time`` for the limiter, starting at a window boundary."""
+    class Clock:
+        now = 6000.0
+
+        def __call__(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', SimpleNamespace(time=clock))
+    return clock
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    if request.param == 'memory':
+        return MemoryStore()
+    fakeredis = pytest.importorskip('fakeredis')
+    store = RedisStore('redis://localhost:6379/0')
+    store.client = fakeredis.FakeRedis()
+    return store
+
+def log_in(client, email='user@example.com', password='wrong'):
+    return client.post('/api/auth/login', json={'email': email, 'password': password})
+
+
+def test_sliding_window_expiry(store, clock):
+    limiter = SlidingWindowLimiter(store)
+    limit = (3, 60)
+    assert [limiter.hit('scope', 'key', limit)[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit('scope', 'other', limit)[0]
+
+    # A quarter into the next window: 4 * 0.75 + 1 > 3
+    clock.now += 75
+    assert not limiter.hit('scope', 'key', limit)[0]
+    # The previous window has slid out almost completely: 4 / 60 + 2 <= 3
+    clock.now += 44
+    assert limiter.hit('scope', 'key', limit)[0]
+    # Two windows later nothing is left
+    clock.now += 120
+    assert limiter.check('scope', 'key', limit) == (True, 0)
+    assert limiter.stats() == {'allowed': {'scope': 5}, 'rejected': {'scope': 2}}
+
+def test_check_and_reset(store, clock):
+    limiter = SlidingWindowLimiter(store)
+    limit = (2, 60)
+    clock.now += 15
+    limiter.hit('scope', 'key', limit)
+    assert limiter.check('scope', 'key', limit) == (True, 0)
+    limiter.hit('scope', 'key', limit)
+    assert limiter.check('scope', 'key', limit) == (False, 46)
+    limiter.reset('scope', 'key', limit)
+    assert limiter.check('scope', 'key', limit) == (True, 0)
+
+def test_failed_logins_are_throttled_per_account(app, client, clock):
+    db.session.add(User('user@example.com', 'user', 'password'))
+    db.session.commit()
+    clock.now += 50
+
+    assert [log_in(client).status_code for _ in range(2)] == [401, 401]
+    response = log_in(client, email='USER@example.com', password='password')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '11'
+    assert log_in(client, email='other@example.com').status_code == 401
+
+    clock.now += 120
+    assert log_in(client, password='password').status_code == 200
+    # A successful login clears the failures
+    assert [log_in(client).status_code for _ in range(2)] == [401, 401]
+
+def test_login_ip_limit(app, client, clock):
+    app.config['RATELIMIT_LOGIN_IP'] = '3/60'
+    assert [log_in(client, email=f'user{i}@example.com').status_code for i in range(4)] == [401, 401, 401, 429]
+    assert log_in(client).headers['Retry-After'] == '61'
+
+def test_email_that_is_not_a_string_is_limited_by_ip(app, client, clock):
+    emails = (['user@example.com'], {'email': 'user@example.com'}, 42)
+    assert [log_in(client, email=email).status_code for email in emails] == [401, 401, 429]
+    assert log_in(client).status_code == 401
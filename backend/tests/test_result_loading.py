@@ -0,0 +1,102 @@
+"""
+Query budget of loading a result for export.
+
+``load_result`` must fetch a result with everything the CSV and JSON
+exports touch in a fixed number of queries, however many answers it has.
+The exam models are the stand-ins from ``tests/models.py``.
+"""
+import json
+from contextlib import contextmanager
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models.user import User
+from app.utils.export import export_to_csv, export_to_json
+from app.utils.results import load_result
+from .models import Answer, Candidate, Exam, Option, Question, Result
+
+# SELECTs for a result with its candidate, exam, creator, answers, questions and options
+QUERY_BUDGET = 2
+ANSWERS = 12
+
+
+@pytest.fixture
+def result_id(app):
+    creator = User('creator@example.com', 'creator', 'password', is_admin=True)
+    exam = Exam(title='Exam', description='An exam', passing_score=50, creator=creator)
+    candidate = Candidate(name='Candidate', email='candidate@example.com',
+                          test_start_time=datetime(2024, 1, 1, 9), test_end_time=datetime(2024, 1, 1, 10))
+    db.session.add_all([exam, candidate])
+    db.session.flush()
+    candidate.exam_id = exam.id
+
+    result = Result(exam=exam, candidate=candidate, score=75.0, passed=True, feedback='Well done')
+    db.session.add(result)
+    for i in range(ANSWERS):
+        if i % 3:
+            question = Question(exam_id=exam.id, text=f'Question {i}', question_type='multiple_choice', points=1)
+            option = Option(text=f'Option {i}', is_correct=True)
+            db.session.add_all([question, option])
+            db.session.flush()
+            option.question_id = question.id
+            answer = Answer(question=question, selected_option=option, is_correct=True, earned_points=1)
+        else:
+            question = Question(exam_id=exam.id, text=f'Question {i}', question_type='open_ended', points=2)
+            answer = Answer(question=question, text_response='Because', earned_points=1)
+        result.answers.append(answer)
+    db.session.commit()
+    result_id = result.id
+    db.session.expunge_all()
+    return result_id
+
+@contextmanager
+def count_queries():
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_load_result_and_export_to_csv_within_budget(result_id):
+    with count_queries() as queries:
+        result = load_result(result_id)
+        csv = export_to_csv(result)
+
+    assert len(queries) <= QUERY_BUDGET, queries
+    assert csv.count('Question ') == ANSWERS
+
+def test_load_result_and_export_to_json_within_budget(result_id):
+    with count_queries() as queries:
+        result = load_result(result_id)
+        data = json.loads(export_to_json(result))
+
+    assert len(queries) <= QUERY_BUDGET, queries
+    assert len(data['answers']) == ANSWERS
+    assert data['candidate']['test_end_time'] == '2024-01-01T10:00:00'
+
+def test_query_budget_does_not_grow_with_answers(app, result_id):
+    result = db.session.get(Result, result_id)
+    for i in range(ANSWERS):
+        result.answers.append(Answer(question=Question(exam_id=result.exam_id, text=f'Extra {i}',
+                                                       question_type='open_ended', points=1)))
+    db.session.commit()
+    db.session.expunge_all()
+
+    with count_queries() as queries:
+        export_to_csv(load_result(result_id))
+
+    assert len(queries) <= QUERY_BUDGET, queries
+
+def test_lazy_loading_exceeds_budget(result_id):
+    # Guards the test itself: without load_result the export costs a query per answer
+    with count_queries() as queries:
+        export_to_csv(db.session.get(Result, result_id))
+
+    assert len(queries) > ANSWERS
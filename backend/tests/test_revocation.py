@@ -0,0 +1,93 @@
+"""
+Access token revocation: single tokens, "sign out everywhere" cut-offs and
+the per-worker revocation list.
+"""
+import time
+from datetime import datetime
+import pytest
+from app import db
+from app.models.token_revocation import TokenRevocation
+from app.models.user import User
+from app.utils.revocation import BloomFilter, RevocationList
+
+
+@pytest.fixture
+def user(app):
+    user = User('user@example.com', 'user', 'password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def login(client, email='user@example.com'):
+    response = client.post('/api/auth/login', json={'email': email, 'password': 'password'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+def next_second():
+    # Cut-offs have whole-second resolution and spare tokens of their own second
+    time.sleep(1.01 - time.time() % 1)
+
+def me(client, headers):
+    return client.get('/api/auth/me', headers=headers).status_code
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f'token-{i}' for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert sum(f'other-{i}' in bloom for i in range(1000)) < 50
+
+def test_logout_revokes_only_that_token(app, client, user):
+    first, second = login(client), login(client)
+    assert client.post('/api/auth/logout', headers=first).status_code == 200
+    assert me(client, first) == 401
+    assert me(client, second) == 200
+
+def test_logout_everywhere_then_log_in_again(app, client, user):
+    other_device = login(client)
+    next_second()
+    old = login(client)
+    assert client.post('/api/auth/logout', headers=old, json={'all': True}).status_code == 200
+    assert me(client, old) == 401
+    assert me(client, other_device) == 401
+    # Usually issued in the same second as the revocation
+    assert me(client, login(client)) == 200
+
+def test_cutoff_compares_whole_seconds(app, user):
+    revocations = RevocationList()
+    revocations.sync()
+    revocations.add(TokenRevocation(user_id=user.id, revoked_at=datetime.utcfromtimestamp(1000.7)))
+    assert revocations.is_revoked({'sub': str(user.id), 'iat': 999, 'jti': 'a'})
+    assert not revocations.is_revoked({'sub': str(user.id), 'iat': 1000, 'jti': 'b'})
+    assert not revocations.is_revoked({'sub': str(user.id + 1), 'iat': 999, 'jti': 'c'})
+
+def test_other_workers_see_revocations_after_sync(app, client, user):
+    other_worker = RevocationList(sync_interval=0)
+    other_worker.sync()
+    headers = login(client)
+    client.post('/api/auth/logout', headers=headers)
+
+    jti = db.session.scalar(db.select(TokenRevocation.jti))
+    assert other_worker.is_revoked({'sub': str(user.id), 'iat': 0, 'jti': jti})
+    assert not other_worker.is_revoked({'sub': str(user.id), 'iat': 0, 'jti': 'not-revoked'})
+
+def test_admin_revokes_a_single_token(app, client, admin_headers, user):
+    headers = login(client)
+    assert client.post('/api/admin/tokens/revoke', headers=admin_headers,
+                       json={'jti': 'some-jti', 'user_id': user.id}).status_code == 200
+    assert me(client, headers) == 200
+
+    for user_id, status in (('1', 400), (True, 400), (user.id + 100, 404)):
+        response = client.post('/api/admin/tokens/revoke', headers=admin_headers,
+                               json={'jti': 'other-jti', 'user_id': user_id})
+        assert response.status_code == status
+    assert db.session.scalar(db.select(db.func.count()).select_from(TokenRevocation)) == 1
+
+def test_admin_revokes_all_of_a_users_tokens(app, client, admin_headers, user):
+    headers = login(client)
+    next_second()
+    assert client.post(f'/api/admin/users/{user.id}/revoke-tokens', headers=admin_headers).status_code == 200
+    assert me(client, headers) == 401
+    assert me(client, admin_headers) == 200
+    assert client.post('/api/admin/users/999/revoke-tokens', headers=admin_headers).status_code == 404
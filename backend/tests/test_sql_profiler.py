@@ -0,0 +1,32 @@
+"""
+SQL profiler settings.
+"""
+import pytest
+from app.utils.sql_profiler import SQLProfiler
+
+
+@pytest.mark.parametrize('value, enabled', [
+    (True, True), (False, False), (1, True), (0, False),
+    ('true', True), ('Yes', True), ('1', True), ('false', False), ('0', False), ('', False)
+])
+def test_enabled_flag(value, enabled):
+    profiler = SQLProfiler(enabled=not enabled)
+    profiler.configure(enabled=value)
+    assert profiler.enabled is enabled
+
+def test_invalid_threshold_changes_nothing():
+    profiler = SQLProfiler()
+    with pytest.raises(ValueError):
+        profiler.configure(enabled='true', slow_query_ms='fast')
+    assert (profiler.enabled, profiler.slow_query_ms) == (False, 200)
+    profiler.configure(enabled=None, n_plus_one_threshold='1')
+    assert (profiler.enabled, profiler.n_plus_one_threshold) == (False, 2)
+
+def test_reconfigure_endpoint(app, client, admin_headers):
+    response = client.put('/api/test/sql-profiler', headers=admin_headers,
+                          json={'enabled': 'false', 'slow_query_ms': '50'})
+    assert response.status_code == 200
+    state = response.get_json()['profiler']
+    assert (state['enabled'], state['slow_query_ms']) == (False, 50)
+    assert client.put('/api/test/sql-profiler', headers=admin_headers,
+                      json={'slow_query_ms': 'fast'}).status_code == 400
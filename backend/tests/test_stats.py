@@ -0,0 +1,124 @@
+"""
+Dashboard stats rollups: incremental updates must match a full rebuild.
+"""
+import random
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.exam_stats import DailyActivity, ExamStats
+from app.utils.stats import dashboard_stats, rebuild_stats, record_exam_stats
+from .models import Candidate, Exam, Result
+
+STEPS = 300
+
+
+@pytest.fixture
+def exam_ids(app, admin):
+    exams = [Exam(title=f'Exam {i}', creator=admin) for i in range(3)]
+    db.session.add_all(exams)
+    db.session.commit()
+    return [exam.id for exam in exams]
+
+def rollups():
+    db.session.rollback()
+    exams = {
+        stats.exam_id: {key: value for key, value in stats.to_dict().items() if key != 'updated_at'}
+        for stats in db.session.execute(db.select(ExamStats)).scalars()
+    }
+    days = {activity.day: activity.to_dict() for activity in db.session.execute(db.select(DailyActivity)).scalars()}
+    return exams, days
+
+def rebuilt():
+    rebuild_stats(batch_size=2)
+    return rollups()
+
+def mutate(rng, exam_ids):
+    """One random change to candidates or results, through the ORM or a bulk statement."""
+    candidates = db.session.execute(db.select(Candidate)).scalars().all()
+    results = db.session.execute(db.select(Result)).scalars().all()
+    action = rng.randrange(9)
+    if action == 0 or not candidates:
+        db.session.add(Candidate(exam_id=rng.choice(exam_ids), name='Candidate',
+                                 invitation_sent=rng.random() < 0.5))
+    elif action == 1:
+        candidate = rng.choice(candidates)
+        candidate.invitation_sent = not candidate.invitation_sent
+    elif action == 2:
+        candidate = rng.choice(candidates)
+        candidate.test_start_time = rng.choice([None, datetime.utcnow()])
+    elif action == 3:
+        candidate = rng.choice(candidates)
+        candidate.test_end_time = rng.choice([None, datetime.utcnow()])
+    elif action == 4:
+        candidate = rng.choice(candidates)
+        candidate.exam_id = rng.choice(exam_ids)
+    elif action == 5:
+        db.session.delete(rng.choice(candidates))
+    elif action == 6 or not results:
+        score = rng.choice([None, 35.0, 80.0])
+        db.session.add(Result(exam_id=rng.choice(exam_ids), score=score,
+                              passed=None if score is None else score >= 50))
+    elif action == 7:
+        result = rng.choice(results)
+        result.score = rng.choice([None, 10.0, 95.5])
+        result.passed = None if result.score is None else result.score >= 50
+    else:
+        # A bulk completion records its own effect
+        candidate = rng.choice([c for c in candidates if c.test_end_time is None] or candidates)
+        if candidate.test_end_time is None:
+            db.session.execute(db.update(Candidate).where(Candidate.id == candidate.id)
+                               .values(test_end_time=datetime.utcnow()))
+            record_exam_stats(candidate.exam_id, completed=1)
+    if rng.random() < 0.2:
+        # Expire some rows, so the next change doesn't know every old value
+        db.session.expire(rng.choice(candidates))
+    if rng.random() < 0.1:
+        db.session.rollback()
+    else:
+        db.session.commit()
+
+
+def test_incremental_rollups_match_a_rebuild(app, exam_ids):
+    rng = random.Random(25)
+    for step in range(STEPS):
+        mutate(rng, exam_ids)
+        if step % 50 == 49:
+            exams, _ = rollups()
+            assert exams == rebuilt()[0], f'after step {step}'
+    assert sum(stats['candidates'] for stats in exams.values()) > 0
+
+def test_exam_deletion_drops_its_row(app, exam_ids):
+    db.session.add_all([Candidate(exam_id=exam_id) for exam_id in exam_ids])
+    db.session.commit()
+    db.session.delete(db.session.get(Exam, exam_ids[0]))
+    db.session.commit()
+    exams, _ = rollups()
+    assert sorted(exams) == exam_ids[1:]
+    assert exams == rebuilt()[0]
+
+def test_daily_activity_matches_a_rebuild(app, exam_ids):
+    now = datetime.utcnow()
+    for i in range(6):
+        candidate = Candidate(exam_id=exam_ids[i % 3], invitation_sent=True, last_invited_at=now)
+        db.session.add(candidate)
+        db.session.commit()
+        if i % 2:
+            candidate.test_start_time = now - timedelta(days=i)
+            db.session.commit()
+            candidate.test_end_time = now - timedelta(days=i - 1)
+            db.session.commit()
+    _, days = rollups()
+    assert days[now.date()]['invited'] == 6
+    assert days == rebuilt()[1]
+
+def test_dashboard_totals(app, exam_ids):
+    db.session.add_all([
+        Result(exam_id=exam_ids[0], score=40.0, passed=False),
+        Result(exam_id=exam_ids[0], score=80.0, passed=True),
+        Result(exam_id=exam_ids[1], score=90.0, passed=True),
+        Result(exam_id=exam_ids[1]),
+    ])
+    db.session.commit()
+    totals = dashboard_stats()['totals']
+    assert (totals['exams'], totals['graded'], totals['passed']) == (2, 3, 2)
+    assert (totals['average_score'], totals['pass_rate']) == (70.0, 66.67)
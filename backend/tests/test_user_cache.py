@@ -0,0 +1,71 @@
+"""
+User cache behind /me and /validate-token: hits, invalidation on changes,
+expiry and trusted token claims.
+"""
+from types import SimpleNamespace
+import pytest
+from app import db
+from app.models.user import User
+from app.utils import user_cache
+from app.utils.user_cache import UserCache, get_user_cache
+
+
+@pytest.fixture
+def user_id(app):
+    user = User('user@example.com', 'user', 'password')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+@pytest.fixture
+def headers(client, user_id):
+    response = client.post('/api/auth/login', json={'email': 'user@example.com', 'password': 'password'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+def me(client, headers):
+    return client.get('/api/auth/me', headers=headers)
+
+
+def test_repeated_lookups_are_served_from_the_cache(app, client, headers):
+    for _ in range(3):
+        assert me(client, headers).get_json()['username'] == 'user'
+    assert client.get('/api/auth/validate-token', headers=headers).get_json()['valid']
+    assert get_user_cache().stats() == {'size': 1, 'hits': 3, 'misses': 1}
+
+def test_update_invalidates(app, client, headers, user_id):
+    me(client, headers)
+    db.session.get(User, user_id).username = 'renamed'
+    db.session.commit()
+    assert me(client, headers).get_json()['username'] == 'renamed'
+
+def test_delete_invalidates(app, client, headers, user_id):
+    me(client, headers)
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+    assert me(client, headers).status_code == 404
+    assert client.get('/api/auth/validate-token', headers=headers).get_json() == \
+        {'valid': False, 'error': 'User not found'}
+
+def test_entries_expire_and_least_recently_used_are_evicted(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(user_cache, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    cache = UserCache(maxsize=2, ttl=60)
+    cache.set(1, {'id': 1})
+    cache.set(2, {'id': 2})
+    assert cache.get(1) == {'id': 1}
+    cache.set(3, {'id': 3})
+    assert cache.get(2) is None
+    assert cache.get(1) == {'id': 1}
+
+    clock.now += 61
+    assert cache.get(1) is None
+    assert cache.stats() == {'size': 1, 'hits': 2, 'misses': 2}
+
+@pytest.mark.parametrize('config', [{'JWT_TRUST_USER_CLAIMS': True}])
+def test_trusted_claims_skip_the_database(app, client, headers, user_id):
+    # Answered from the token alone, even once the row is gone
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+    response = client.get('/api/auth/validate-token', headers=headers)
+    assert response.get_json()['user']['username'] == 'user'
+    assert 'user_cache' not in app.extensions
@@ -0,0 +1,47 @@
+"""
+Keyset-paginated user listing.
+"""
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User
+
+
+def add_users(app):
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        user = User(f'user{i}@example.com', f'user{i}', 'password', is_admin=i % 2 == 0)
+        user.created_at = start + timedelta(minutes=i // 2)
+        db.session.add(user)
+    undated = [User(f'undated{i}@example.com', f'undated{i}', 'password') for i in range(2)]
+    db.session.add_all(undated)
+    db.session.flush()
+    for user in undated:
+        user.created_at = None
+    db.session.commit()
+
+def list_users(client, **params):
+    pages, cursor = [], None
+    while True:
+        if cursor:
+            params['cursor'] = cursor
+        body = client.get('/api/test/users', query_string=params).get_json()
+        pages.append([user['username'] for user in body['users']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_dated_user_once(app, client):
+    add_users(app)
+    pages = list_users(client, limit=2, fields='username')
+    assert pages == [['user4', 'user3'], ['user2', 'user1'], ['user0']]
+    # A page that would have ended on an undated user
+    assert list_users(client, limit=6, fields='username') == [['user4', 'user3', 'user2', 'user1', 'user0']]
+
+def test_filter_by_role(app, client):
+    add_users(app)
+    assert list_users(client, limit=2, fields='username', is_admin='true') == [['user4', 'user2'], ['user0']]
+    assert list_users(client, fields='username', is_admin='false') == [['user3', 'user1']]
+
+def test_invalid_cursor(app, client):
+    assert client.get('/api/test/users', query_string={'cursor': 'not-a-cursor'}).status_code == 400
@@ -1,3 +1,4 @@
 from app import create_app
+from app.config import get_config
 
-app = create_app()
+app = create_app(get_config())